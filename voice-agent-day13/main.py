@@ -1,4 +1,5 @@
 import os
+import asyncio
 import time
 import requests
 import aiofiles
@@ -9,6 +10,9 @@ from fastapi.responses import HTMLResponse
 from dotenv import load_dotenv
 from google import genai
 
+from chat_context import ConversationContext
+from semantic_cache import SemanticCache
+
 load_dotenv()
 
 app = FastAPI()
@@ -43,6 +47,25 @@ MURF_TTS_URL = "https://api.murf.ai/v1/speech/generate"
 
 chat_history_store = {}
 
+# Prompts keep the newest messages verbatim within LLM_CONTEXT_TOKENS; older ones
+# are folded into a summary in the background, so long sessions don't slow turns down
+chat_context = ConversationContext(
+    render=lambda msg: f"{'User' if msg['role'] == 'user' else 'AI'}: {msg['content']}",
+    recent_tokens=int(os.getenv("LLM_CONTEXT_TOKENS", 2000)),
+    summary_tokens=int(os.getenv("LLM_SUMMARY_TOKENS", 300)),
+)
+
+# Longest wait for one Gemini reply before the turn fails
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))
+
+# Near-duplicate questions are answered from earlier answers (and their audio) without Gemini
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+semantic_cache = SemanticCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.9)),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 2048)),
+    ttl=float(os.getenv("SEMANTIC_CACHE_TTL", 24 * 3600)),
+)
+
 async def upload_audio_to_assemblyai(file_path: str) -> str:
     headers = {"authorization": ASSEMBLYAI_API_KEY}
     async with aiofiles.open(file_path, "rb") as f:
@@ -68,17 +91,25 @@ def request_transcription(upload_url: str) -> str:
             raise Exception("AssemblyAI transcription failed: " + poll_resp.json().get("error", "Unknown error"))
         time.sleep(3)
 
-def get_gemini_response(chat_messages: list) -> str:
-    prompt = ""
-    for msg in chat_messages:
-        role = "User" if msg["role"] == "user" else "AI"
-        prompt += f"{role}: {msg['content']}\n"
-    prompt += "AI:"
-    response = genai_client.models.generate_content(
-        model="gemini-1.5-flash",
-        contents=prompt
-    )
-    return response.text.strip()
+async def generate_with_gemini(prompt: str) -> str:
+    # The SDK's async client: other requests keep being served while Gemini thinks
+    try:
+        response = await asyncio.wait_for(
+            genai_client.aio.models.generate_content(
+                model="gemini-1.5-flash",
+                contents=prompt
+            ),
+            timeout=LLM_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Gemini did not respond within {LLM_TIMEOUT:g}s")
+    return response.text or ""
+
+async def get_gemini_response(chat_messages: list, session_id: str) -> str:
+    summary, recent = chat_context.build(session_id, chat_messages, generate_with_gemini)
+    prompt = f"Summary of the earlier conversation:\n{summary}\n\n" if summary else ""
+    prompt += "\n".join(recent) + "\nAI:"
+    return (await generate_with_gemini(prompt)).strip()
 
 def generate_murf_tts(text: str) -> str:
     if len(text) > 3000:
@@ -98,6 +129,10 @@ def generate_murf_tts(text: str) -> str:
         raise Exception(f"Murf API error: {resp_json.get('errorMessage', 'No audioFile in response')}")
     return audio_url
 
+@app.get("/stats/semantic-cache")
+async def semantic_cache_stats():
+    return semantic_cache.stats()
+
 @app.post("/agent/chat/{session_id}")
 async def agent_chat(session_id: str, audio: UploadFile = File(...)):
     try:
@@ -111,11 +146,16 @@ async def agent_chat(session_id: str, audio: UploadFile = File(...)):
         history = chat_history_store.get(session_id, [])
         history.append({"role": "user", "content": transcript_text})
 
-        ai_response = get_gemini_response(history)
+        # A first question that nearly repeats an earlier one gets its answer (and audio);
+        # follow-ups depend on the conversation, so they always go to Gemini
+        hit = semantic_cache.lookup(transcript_text, MURF_VOICE_ID) if SEMANTIC_CACHE_ENABLED and len(history) == 1 else None
+        ai_response = hit.answer if hit else await get_gemini_response(history, session_id)
         history.append({"role": "assistant", "content": ai_response})
         chat_history_store[session_id] = history
 
-        murf_audio_url = generate_murf_tts(ai_response)
+        murf_audio_url = hit.audio_url if hit and hit.audio_url else generate_murf_tts(ai_response)
+        if SEMANTIC_CACHE_ENABLED and len(history) == 2:
+            semantic_cache.add(hit.question if hit else transcript_text, ai_response, murf_audio_url, MURF_VOICE_ID)
         os.remove(temp_file_path)
 
         return {
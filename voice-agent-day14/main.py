@@ -4,14 +4,15 @@ import logging
 from logging.handlers import RotatingFileHandler
 from typing import Dict, List
 
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 from dotenv import load_dotenv
 
 from models import ChatMessage, ChatTurnResponse
-from services.stt import AssemblyAITranscriber
+from services.stt import AssemblyAITranscriber, create_provider, transcribe
+from services.transcript_cache import TranscriptCache
 from services.llm import GeminiLLM
 from services.tts import MurfTTS
 
@@ -41,8 +42,27 @@ MURF_API_KEY = os.getenv("MURF_API_KEY")
 MURF_VOICE_ID = os.getenv("MURF_VOICE_ID")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Optional: ASSEMBLYAI_BASE_URL can point at assemblyai_standin.py for offline runs,
+# and ASSEMBLYAI_WEBHOOK_URL switches transcription from polling to completion callbacks
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com")
+ASSEMBLYAI_WEBHOOK_URL = os.getenv("ASSEMBLYAI_WEBHOOK_URL")
+ASSEMBLYAI_WEBHOOK_SECRET = os.getenv("ASSEMBLYAI_WEBHOOK_SECRET")
+
+# Content-addressed transcript cache (memory LRU + on-disk store with TTL)
+TRANSCRIPT_CACHE_MEMORY_BYTES = int(os.getenv("TRANSCRIPT_CACHE_MEMORY_BYTES", 8 * 1024 * 1024))
+TRANSCRIPT_CACHE_DIR = os.getenv("TRANSCRIPT_CACHE_DIR", ".transcript_cache")
+TRANSCRIPT_CACHE_TTL = float(os.getenv("TRANSCRIPT_CACHE_TTL", 7 * 24 * 3600))
+
+# Prompt budget: recent messages verbatim, older ones folded into a background summary
+LLM_CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", 2000))
+LLM_SUMMARY_TOKENS = int(os.getenv("LLM_SUMMARY_TOKENS", 300))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))  # seconds per Gemini call
+
+# Speech-to-text provider: "assemblyai", or "stub" to load-test without network access
+STT_PROVIDER = os.getenv("STT_PROVIDER", "assemblyai")
+
 missing = [k for k, v in {
-    "ASSEMBLYAI_API_KEY": ASSEMBLYAI_API_KEY,
+    "ASSEMBLYAI_API_KEY": ASSEMBLYAI_API_KEY or STT_PROVIDER != "assemblyai",
     "MURF_API_KEY": MURF_API_KEY,
     "MURF_VOICE_ID": MURF_VOICE_ID,
     "GEMINI_API_KEY": GEMINI_API_KEY,
@@ -51,8 +71,31 @@ missing = [k for k, v in {
 if missing:
     raise RuntimeError(f"Missing env vars: {', '.join(missing)}. Check your .env.")
 
-stt = AssemblyAITranscriber(api_key=ASSEMBLYAI_API_KEY)
-llm = GeminiLLM(api_key=GEMINI_API_KEY, model="gemini-1.5-flash")
+STT_OPTIONS = {
+    "assemblyai": dict(
+        api_key=ASSEMBLYAI_API_KEY,
+        base_url=ASSEMBLYAI_BASE_URL,
+        webhook_url=ASSEMBLYAI_WEBHOOK_URL,
+        webhook_secret=ASSEMBLYAI_WEBHOOK_SECRET,
+    ),
+    "stub": dict(
+        latency=float(os.getenv("STT_STUB_LATENCY", "0.3")),
+        text=os.getenv("STT_STUB_TEXT", "This is test question number 1."),
+    ),
+}
+stt = create_provider(STT_PROVIDER, **STT_OPTIONS.get(STT_PROVIDER, {}))
+transcript_cache = TranscriptCache(
+    max_memory_bytes=TRANSCRIPT_CACHE_MEMORY_BYTES,
+    cache_dir=TRANSCRIPT_CACHE_DIR,
+    ttl=TRANSCRIPT_CACHE_TTL,
+)
+llm = GeminiLLM(
+    api_key=GEMINI_API_KEY,
+    model="gemini-1.5-flash",
+    context_tokens=LLM_CONTEXT_TOKENS,
+    summary_tokens=LLM_SUMMARY_TOKENS,
+    timeout=LLM_TIMEOUT,
+)
 tts = MurfTTS(api_key=MURF_API_KEY, voice_id=MURF_VOICE_ID)
 
 # -------------------------
@@ -75,10 +118,33 @@ async def root():
     with open("static/index.html", "r", encoding="utf-8") as f:
         return HTMLResponse(content=f.read())
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if isinstance(stt, AssemblyAITranscriber):
+        await stt.poller.aclose()
+
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
+@app.get("/stats/transcript-cache")
+def transcript_cache_stats():
+    return transcript_cache.stats()
+
+@app.post("/assemblyai/webhook")
+async def assemblyai_webhook(request: Request, x_webhook_secret: str = Header(None)):
+    if ASSEMBLYAI_WEBHOOK_SECRET and x_webhook_secret != ASSEMBLYAI_WEBHOOK_SECRET:
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+    if not isinstance(stt, AssemblyAITranscriber):
+        raise HTTPException(status_code=404, detail="Webhooks are only used by the AssemblyAI provider")
+    payload = await request.json()
+    transcript_id = payload.get("transcript_id")
+    if not transcript_id:
+        raise HTTPException(status_code=400, detail="Missing transcript_id")
+    logger.info("Transcript webhook | id=%s | status=%s", transcript_id, payload.get("status"))
+    stt.poller.notify(transcript_id, payload.get("status"))
+    return {"status": "ok"}
+
 @app.post("/agent/chat/{session_id}", response_model=ChatTurnResponse)
 async def agent_chat(session_id: str, audio: UploadFile = File(...)):
     try:
@@ -86,7 +152,7 @@ async def agent_chat(session_id: str, audio: UploadFile = File(...)):
         audio_bytes = await audio.read()
 
         # 1) STT
-        user_text = stt.transcribe_from_audio_bytes(audio_bytes)
+        user_text = await transcribe(stt, audio_bytes, transcript_cache)
         logger.info("Transcription: %s", user_text)
 
         # 2) Load history and append user message
@@ -94,7 +160,7 @@ async def agent_chat(session_id: str, audio: UploadFile = File(...)):
         history.append(ChatMessage(role="user", content=user_text))
 
         # 3) LLM
-        ai_text = llm.generate(history)
+        ai_text = await llm.generate(history, session_id)
         logger.info("AI response: %s", ai_text)
 
         # 4) Append assistant message & persist
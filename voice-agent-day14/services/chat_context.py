@@ -0,0 +1,125 @@
+# services/chat_context.py
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token, plus per-message overhead)."""
+    return len(text) // 4 + 4
+
+
+def summary_prompt(summary: str, transcript: str, max_tokens: int) -> str:
+    earlier = f"Summary so far:\n{summary}\n\n" if summary else ""
+    return (
+        "Summarize the conversation below for the assistant that continues it. Keep names, "
+        "facts, decisions, open questions and the user's preferences; drop small talk. "
+        f"Reply with the summary only, in at most {max_tokens * 3 // 4} words.\n\n"
+        f"{earlier}New messages:\n{transcript}"
+    )
+
+
+class _SessionContext:
+    def __init__(self):
+        self.summary = ""
+        self.summarized = 0  # leading messages already folded into `summary`
+        self.pending: Optional[asyncio.Future] = None
+
+
+class ConversationContext:
+    """
+    Token-budgeted prompt context for chat sessions.
+
+    build() walks the history back from the newest message and keeps messages
+    verbatim until `recent_tokens` is used up, so a turn costs the same however
+    long the session is. Older messages are folded into a running summary of at
+    most `summary_tokens`. Folding is a call to the LLM, so it runs as a
+    background task after the turn that crossed the threshold, and the summary
+    normally catches up before the oldest recent messages fall out of the window;
+    until it does, messages it doesn't cover yet are sent verbatim.
+    `render` turns one message into its prompt line. Must be used from the event
+    loop thread.
+    """
+
+    def __init__(
+        self,
+        render: Callable[[Any], str],
+        recent_tokens: int = 2000,
+        summary_tokens: int = 300,
+        max_sessions: int = 1000,
+    ):
+        self.render = render
+        self.recent_tokens = recent_tokens
+        self.summary_tokens = summary_tokens
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, _SessionContext]" = OrderedDict()
+
+    def _state(self, session_id: str, length: int) -> _SessionContext:
+        state = self._sessions.get(session_id)
+        if state is None or state.summarized > length:
+            # New session, or the history was cleared or replaced
+            state = _SessionContext()
+            self._sessions[session_id] = state
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return state
+
+    def build(
+        self, session_id: str, messages: Sequence[Any], summarize: Callable[[str], Awaitable[str]]
+    ) -> Tuple[str, List[str]]:
+        """
+        The summary of older messages ("" if none) and the recent messages as
+        prompt lines, oldest first. `summarize(prompt)` returns the LLM's reply
+        and is awaited in the background when the summary should move forward.
+        """
+        state = self._state(session_id, len(messages))
+        lines: List[str] = []
+        tokens = 0
+        keep_from = len(messages)
+        # Everything before `fold_to` can be folded, leaving half the budget verbatim
+        fold_to = len(messages) - 1
+        for index in range(len(messages) - 1, state.summarized - 1, -1):
+            line = self.render(messages[index])
+            cost = estimate_tokens(line)
+            if lines and tokens + cost > self.recent_tokens:
+                break
+            lines.append(line)
+            tokens += cost
+            keep_from = index
+            if tokens <= self.recent_tokens // 2:
+                fold_to = min(fold_to, index)
+        lines.reverse()
+
+        if keep_from > state.summarized:
+            # The summary hasn't caught up with these yet; send them verbatim, over budget, rather than drop them
+            logger.warning("Chat summary is %d messages behind | session_id=%s", keep_from - state.summarized, session_id)
+            lines[:0] = [self.render(message) for message in messages[state.summarized:keep_from]]
+        if state.pending is None and fold_to > state.summarized and (
+            keep_from > state.summarized or tokens > self.recent_tokens * 3 // 4
+        ):
+            self._fold(session_id, state, messages[state.summarized:fold_to], fold_to, summarize)
+        return state.summary, lines
+
+    def _fold(self, session_id: str, state: _SessionContext, messages: Sequence[Any], end: int, summarize: Callable[[str], Awaitable[str]]):
+        transcript = "\n".join(self.render(message) for message in messages)
+        state.pending = asyncio.ensure_future(summarize(summary_prompt(state.summary, transcript, self.summary_tokens)))
+        state.pending.add_done_callback(lambda future: self._folded(session_id, state, end, future))
+
+    def _folded(self, session_id: str, state: _SessionContext, end: int, future: asyncio.Future):
+        state.pending = None
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            # Keep the old summary; the next turn tries again
+            logger.warning("Summarizing chat failed | session_id=%s | %s", session_id, future.exception())
+            return
+        if self._sessions.get(session_id) is state and future.result().strip():
+            state.summary = future.result().strip()
+            state.summarized = end
+
+    def forget(self, session_id: str):
+        self._sessions.pop(session_id, None)
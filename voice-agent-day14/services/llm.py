@@ -1,29 +1,47 @@
 # services/llm.py
+import asyncio
 import logging
 from typing import List
 from google import genai
 from models import ChatMessage
+from services.chat_context import ConversationContext
 
 logger = logging.getLogger(__name__)
 
+def _render(msg: ChatMessage) -> str:
+    role = "User" if msg.role == "user" else "AI"
+    return f"{role}: {msg.content}"
+
 class GeminiLLM:
-    def __init__(self, api_key: str, model: str = "gemini-1.5-flash"):
+    def __init__(self, api_key: str, model: str = "gemini-1.5-flash", context_tokens: int = 2000, summary_tokens: int = 300, timeout: float = 30.0):
         self.client = genai.Client(api_key=api_key)
         self.model = model
+        self.timeout = timeout
+        # Recent messages verbatim, older ones summarized in the background
+        self.context = ConversationContext(_render, recent_tokens=context_tokens, summary_tokens=summary_tokens)
+
+    async def _complete(self, prompt: str) -> str:
+        # Async client: the event loop keeps serving other turns while Gemini works
+        try:
+            resp = await asyncio.wait_for(
+                self.client.aio.models.generate_content(model=self.model, contents=prompt),
+                timeout=self.timeout,
+            )
+        except asyncio.TimeoutError:
+            raise RuntimeError(f"Gemini did not respond within {self.timeout:g}s") from None
+        return resp.text or ""
 
-    def generate(self, history: List[ChatMessage]) -> str:
+    async def generate(self, history: List[ChatMessage], session_id: str) -> str:
         """
-        Build a simple prompt from the chat history and get the next assistant response.
+        Build a token-budgeted prompt from the chat history and get the next assistant response.
         """
         logger.info("Generating LLM response with Gemini...")
-        prompt_lines = []
-        for msg in history:
-            role = "User" if msg.role == "user" else "AI"
-            prompt_lines.append(f"{role}: {msg.content}")
+        summary, prompt_lines = self.context.build(session_id, history, self._complete)
+        if summary:
+            prompt_lines.insert(0, f"Summary of the earlier conversation:\n{summary}\n")
         prompt_lines.append("AI:")
         prompt = "\n".join(prompt_lines)
 
-        resp = self.client.models.generate_content(model=self.model, contents=prompt)
-        text = (resp.text or "").strip()
+        text = (await self._complete(prompt)).strip()
         logger.info("LLM response generated.")
         return text
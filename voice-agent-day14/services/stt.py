@@ -1,50 +1,124 @@
 # services/stt.py
-import time
+import asyncio
+import hashlib
 import logging
 import requests
-from typing import Optional
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Protocol
+
+from services.transcript_cache import TranscriptCache
+from services.transcript_poller import TranscriptPoller
 
 logger = logging.getLogger(__name__)
 
-ASSEMBLYAI_UPLOAD_URL = "https://api.assemblyai.com/v2/upload"
-ASSEMBLYAI_TRANSCRIPT_URL = "https://api.assemblyai.com/v2/transcript"
+ASSEMBLYAI_BASE_URL = "https://api.assemblyai.com"
+
+
+@dataclass
+class TranscriptResult:
+    text: str
+    confidence: Optional[float] = None
+    duration: Optional[float] = None
+
+
+class STTProvider(Protocol):
+    """Async speech-to-text backend: submit() a clip, then await its result()."""
+    name: str
+
+    async def submit(self, audio_bytes: bytes) -> str: ...
+
+    async def result(self, job_id: str) -> TranscriptResult: ...
+
+
+# Provider name -> factory; main.py picks one with STT_PROVIDER
+PROVIDERS: Dict[str, Callable[..., STTProvider]] = {}
+
+
+def register_provider(name: str):
+    def decorator(factory):
+        PROVIDERS[name] = factory
+        return factory
+    return decorator
+
+
+def create_provider(name: str, **options) -> STTProvider:
+    if name not in PROVIDERS:
+        raise RuntimeError(f"Unknown STT provider '{name}'. Available: {', '.join(PROVIDERS)}")
+    logger.info("Using STT provider: %s", name)
+    return PROVIDERS[name](**options)
 
+
+async def transcribe(provider: STTProvider, audio_bytes: bytes, cache: Optional[TranscriptCache] = None) -> str:
+    """Transcribe a clip with any provider, reusing cached transcripts of identical audio."""
+    key = TranscriptCache.digest(audio_bytes)
+    if cache is not None:
+        cached = await cache.get(key)
+        if cached is not None:
+            logger.info("Transcript cache hit; skipping upload and transcription.")
+            return cached
+
+    job_id = await provider.submit(audio_bytes)
+    text = (await provider.result(job_id)).text
+    if text and cache is not None:
+        await cache.put(key, text)
+    return text
+
+
+@register_provider("assemblyai")
 class AssemblyAITranscriber:
-    def __init__(self, api_key: str):
+    name = "assemblyai"
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: str = ASSEMBLYAI_BASE_URL,
+        webhook_url: Optional[str] = None,
+        webhook_secret: Optional[str] = None,
+        poller: Optional[TranscriptPoller] = None,
+    ):
         self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
         self._headers_auth = {"authorization": self.api_key}
+        # With a webhook_url the poller waits for completion callbacks and only polls as a fallback
+        self.poller = poller or TranscriptPoller(
+            transcript_url=f"{self.base_url}/v2/transcript",
+            webhook_url=webhook_url,
+            webhook_secret=webhook_secret,
+        )
 
     def _upload_bytes(self, data: bytes) -> str:
         logger.info("Uploading audio to AssemblyAI...")
-        resp = requests.post(ASSEMBLYAI_UPLOAD_URL, headers=self._headers_auth, data=data)
+        resp = requests.post(f"{self.base_url}/v2/upload", headers=self._headers_auth, data=data)
         resp.raise_for_status()
         upload_url = resp.json()["upload_url"]
         logger.info("Upload successful. URL received.")
         return upload_url
 
-    def _request_transcription(self, upload_url: str) -> str:
+    async def submit(self, audio_bytes: bytes) -> str:
+        upload_url = await asyncio.to_thread(self._upload_bytes, audio_bytes)
         logger.info("Requesting transcription...")
-        headers = {**self._headers_auth, "content-type": "application/json"}
-        json_data = {"audio_url": upload_url}
-        resp = requests.post(ASSEMBLYAI_TRANSCRIPT_URL, json=json_data, headers=headers)
-        resp.raise_for_status()
-        transcript_id = resp.json()["id"]
-
-        # Poll until complete
-        while True:
-            poll = requests.get(f"{ASSEMBLYAI_TRANSCRIPT_URL}/{transcript_id}", headers=headers)
-            poll.raise_for_status()
-            status = poll.json()["status"]
-            if status == "completed":
-                text = poll.json().get("text", "")
-                logger.info("Transcription completed.")
-                return text
-            if status == "error":
-                err = poll.json().get("error", "Unknown transcription error.")
-                logger.error(f"AssemblyAI error: {err}")
-                raise RuntimeError(f"AssemblyAI transcription failed: {err}")
-            time.sleep(2)
-
-    def transcribe_from_audio_bytes(self, audio_bytes: bytes) -> str:
-        upload_url = self._upload_bytes(audio_bytes)
-        return self._request_transcription(upload_url)
+        return await self.poller.submit(upload_url, self.api_key)
+
+    async def result(self, job_id: str) -> TranscriptResult:
+        # The shared poller checks all in-flight transcripts from one task
+        text = await self.poller.wait_for(job_id, self.api_key)
+        logger.info("Transcription completed.")
+        return TranscriptResult(text=text)
+
+
+@register_provider("stub")
+class StubTranscriber:
+    """Offline provider for load tests: fixed text after a fixed latency, no network."""
+    name = "stub"
+
+    def __init__(self, latency: float = 0.3, text: str = "This is test question number 1."):
+        self.latency = latency
+        self.text = text
+
+    async def submit(self, audio_bytes: bytes) -> str:
+        # Same audio, same job id
+        return hashlib.blake2b(audio_bytes, digest_size=8).hexdigest()
+
+    async def result(self, job_id: str) -> TranscriptResult:
+        await asyncio.sleep(self.latency)
+        return TranscriptResult(text=self.text)
@@ -0,0 +1,162 @@
+# services/transcript_cache.py
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptCache:
+    """
+    Content-addressed transcript cache keyed by a BLAKE2b digest of the audio.
+
+    Lookups go to an in-memory LRU first (capped by total entry size in bytes) and
+    then to an on-disk store. Entries in both expire `ttl` seconds after they were
+    stored. Disk hits are promoted back into memory with the expiry of the disk
+    copy. Counters are exposed through `stats()`.
+
+    Disk I/O runs in worker threads. Expired files are deleted when a lookup finds
+    them, and a sweep at most every `sweep_interval` seconds deletes the rest.
+    """
+
+    def __init__(
+        self,
+        max_memory_bytes: int = 8 * 1024 * 1024,
+        cache_dir: Optional[str] = ".transcript_cache",
+        ttl: float = 7 * 24 * 3600,
+        sweep_interval: float = 3600.0,
+    ):
+        self.max_memory_bytes = max_memory_bytes
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = 0.0
+        self._sweep_task: Optional[asyncio.Task] = None
+        # key -> (value, expiry time)
+        self._memory: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._sizes = {}
+        self._memory_bytes = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def hasher():
+        return hashlib.blake2b(digest_size=32)
+
+    @classmethod
+    def digest(cls, audio_bytes: bytes) -> str:
+        h = cls.hasher()
+        h.update(audio_bytes)
+        return h.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def _remember(self, key: str, value: Any, expires_at: float):
+        size = len(key) + len(json.dumps(value))
+        if size > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= self._sizes[key]
+        self._memory[key] = (value, expires_at)
+        self._memory.move_to_end(key)
+        self._sizes[key] = size
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes:
+            old_key, _ = self._memory.popitem(last=False)
+            self._memory_bytes -= self._sizes.pop(old_key)
+
+    def _read_disk(self, key: str) -> Optional[Tuple[Any, float]]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            stored_at = os.path.getmtime(path)
+            if time.time() - stored_at > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)["value"], stored_at + self.ttl
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key: str, value: Any):
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"value": value, "created": time.time()}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Transcript cache write failed: %s", e)
+
+    def _sweep_disk(self):
+        """Delete expired entries that no lookup has come back for"""
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        if removed:
+            logger.info("Transcript cache sweep removed %d expired files", removed)
+
+    def _schedule_sweep(self):
+        now = time.time()
+        if not self.cache_dir or now - self._last_sweep < self.sweep_interval:
+            return
+        if self._sweep_task is not None and not self._sweep_task.done():
+            return
+        self._last_sweep = now
+        self._sweep_task = asyncio.create_task(asyncio.to_thread(self._sweep_disk))
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self._memory.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if time.time() <= expires_at:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return value
+            # Same expiry as the disk copy, which is gone by now too
+            del self._memory[key]
+            self._memory_bytes -= self._sizes.pop(key)
+        entry = await asyncio.to_thread(self._read_disk, key)
+        if entry is not None:
+            value, expires_at = entry
+            self.disk_hits += 1
+            self._remember(key, value, expires_at)
+            return value
+        self.misses += 1
+        return None
+
+    async def put(self, key: str, value: Any):
+        self._remember(key, value, time.time() + self.ttl)
+        self._schedule_sweep()
+        await asyncio.to_thread(self._write_disk, key, value)
+
+    def stats(self) -> dict:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+            "max_memory_bytes": self.max_memory_bytes,
+        }
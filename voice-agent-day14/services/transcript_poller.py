@@ -0,0 +1,211 @@
+# services/transcript_poller.py
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+ASSEMBLYAI_TRANSCRIPT_URL = "https://api.assemblyai.com/v2/transcript"
+WEBHOOK_SECRET_HEADER = "X-Webhook-Secret"
+MAX_EARLY_NOTIFICATIONS = 1000
+
+
+def _is_transient(error: Exception) -> bool:
+    """Network trouble or an AssemblyAI 5xx, which the next poll may get past"""
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+@dataclass
+class PendingTranscript:
+    transcript_id: str
+    api_key: str
+    future: asyncio.Future
+    interval: float
+    next_poll: float = field(default_factory=time.monotonic)
+    failures: int = 0
+
+
+class TranscriptPoller:
+    """
+    One background task that polls every in-flight AssemblyAI transcript.
+
+    Each turn awaits a future instead of sleeping in its own loop. Due transcripts
+    are checked together in batches, and each one backs off from ~200 ms up to
+    `max_interval` so short clips resolve quickly without hammering the API.
+    Network errors and 5xx responses are polled again on the same backoff, up to
+    `max_retries` times in a row, before the turn fails.
+
+    When `webhook_url` is set, jobs are submitted with a completion callback and
+    the webhook endpoint calls `notify()`, which makes the transcript due at once.
+    Polling then only runs every `fallback_interval` in case a callback is lost.
+    """
+
+    def __init__(
+        self,
+        transcript_url: str = ASSEMBLYAI_TRANSCRIPT_URL,
+        initial_interval: float = 0.2,
+        max_interval: float = 3.0,
+        backoff: float = 1.5,
+        batch_size: int = 50,
+        timeout: float = 300.0,
+        webhook_url: Optional[str] = None,
+        webhook_secret: Optional[str] = None,
+        fallback_interval: float = 10.0,
+        max_retries: int = 5,
+    ):
+        self.transcript_url = transcript_url
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.webhook_url = webhook_url
+        self.webhook_secret = webhook_secret
+        self.fallback_interval = fallback_interval
+        self.max_retries = max_retries
+        self.client: Optional[httpx.AsyncClient] = None
+        self._pending: Dict[str, PendingTranscript] = {}
+        self._notified: Dict[str, str] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _ensure_started(self):
+        if self.client is None:
+            self.client = httpx.AsyncClient(timeout=30.0)
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, upload_url: str, api_key: str) -> str:
+        """Start a transcription job and return its transcript id."""
+        self._ensure_started()
+        headers = {"authorization": api_key, "content-type": "application/json"}
+        json_data = {"audio_url": upload_url}
+        if self.webhook_url:
+            json_data["webhook_url"] = self.webhook_url
+            if self.webhook_secret:
+                json_data["webhook_auth_header_name"] = WEBHOOK_SECRET_HEADER
+                json_data["webhook_auth_header_value"] = self.webhook_secret
+        response = await self.client.post(self.transcript_url, json=json_data, headers=headers)
+        response.raise_for_status()
+        return response.json()["id"]
+
+    async def wait_for(self, transcript_id: str, api_key: str) -> str:
+        """Resolve once the scheduler sees the transcript completed (or errored)."""
+        self._ensure_started()
+        pending = self._pending.get(transcript_id)
+        if pending is None:
+            future = asyncio.get_running_loop().create_future()
+            interval = self.fallback_interval if self.webhook_url else self.initial_interval
+            if self._notified.pop(transcript_id, None):
+                # The callback beat us here; fetch the result straight away
+                interval = 0.0
+            pending = PendingTranscript(transcript_id, api_key, future, interval,
+                                        time.monotonic() + interval)
+            self._pending[transcript_id] = pending
+            self._wakeup.set()
+        try:
+            return await asyncio.wait_for(pending.future, timeout=self.timeout)
+        finally:
+            self._pending.pop(transcript_id, None)
+
+    def notify(self, transcript_id: str, status: str):
+        """Called by the webhook endpoint when AssemblyAI reports a job as finished."""
+        pending = self._pending.get(transcript_id)
+        if pending is None:
+            self._notified[transcript_id] = status
+            while len(self._notified) > MAX_EARLY_NOTIFICATIONS:
+                self._notified.pop(next(iter(self._notified)))
+            return
+        pending.next_poll = time.monotonic()
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def transcribe(self, upload_url: str, api_key: str) -> str:
+        transcript_id = await self.submit(upload_url, api_key)
+        return await self.wait_for(transcript_id, api_key)
+
+    async def _check(self, pending: PendingTranscript):
+        headers = {"authorization": pending.api_key}
+        try:
+            response = await self.client.get(f"{self.transcript_url}/{pending.transcript_id}", headers=headers)
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            if _is_transient(e) and pending.failures < self.max_retries:
+                pending.failures += 1
+                logger.warning("Polling transcript %s failed, retrying (%d/%d): %s",
+                               pending.transcript_id, pending.failures, self.max_retries, e)
+                self._poll_later(pending)
+                return
+            logger.error("Polling transcript %s failed: %s", pending.transcript_id, e)
+            if not pending.future.done():
+                pending.future.set_exception(e)
+            return
+        pending.failures = 0
+
+        status = data.get("status")
+        if status == "completed":
+            if not pending.future.done():
+                pending.future.set_result(data.get("text") or "")
+        elif status == "error":
+            err = data.get("error", "Unknown transcription error.")
+            logger.error(f"AssemblyAI error: {err}")
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError(f"AssemblyAI transcription failed: {err}"))
+        else:
+            self._poll_later(pending)
+
+    def _poll_later(self, pending: PendingTranscript):
+        ceiling = self.fallback_interval if self.webhook_url else self.max_interval
+        pending.interval = min(max(pending.interval, self.initial_interval) * self.backoff, ceiling)
+        pending.next_poll = time.monotonic() + pending.interval
+
+    async def _run(self):
+        while True:
+            # Drop turns that finished or whose caller gave up
+            for transcript_id in [t for t, p in self._pending.items() if p.future.done()]:
+                self._pending.pop(transcript_id, None)
+
+            if not self._pending:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = time.monotonic()
+            due = sorted((p for p in self._pending.values() if p.next_poll <= now),
+                         key=lambda p: p.next_poll)[:self.batch_size]
+            if due:
+                await asyncio.gather(*(self._check(p) for p in due))
+                continue
+
+            delay = min(p.next_poll for p in self._pending.values()) - now
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for pending in self._pending.values():
+            if not pending.future.done():
+                pending.future.cancel()
+        self._pending.clear()
+        self._notified.clear()
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
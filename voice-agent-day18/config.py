@@ -25,4 +25,34 @@ else:
     logging.warning("GEMINI_API_KEY not found in .env file.")
 
 if not MURF_API_KEY:
-    logging.warning("MURF_API_KEY not found in .env file.")
\ No newline at end of file
+    logging.warning("MURF_API_KEY not found in .env file.")
+
+# Speech-to-text provider: "assemblyai", or "stub" for offline load tests
+STT_PROVIDER = os.getenv("STT_PROVIDER", "assemblyai")
+STT_STUB_TEXT = os.getenv("STT_STUB_TEXT", "This is test question number {turn}.")
+STT_STUB_LATENCY = float(os.getenv("STT_STUB_LATENCY", "0.3"))
+STT_STUB_TURN_SECONDS = float(os.getenv("STT_STUB_TURN_SECONDS", "3.0"))
+STT_STUB_PARTIAL_SECONDS = float(os.getenv("STT_STUB_PARTIAL_SECONDS", "0.5"))
+
+# Streaming STT runs on an asyncio websocket per session
+ASSEMBLYAI_STREAMING_URL = os.getenv("ASSEMBLYAI_STREAMING_URL", "wss://streaming.assemblyai.com/v3/ws")
+# Browser audio is re-framed into frames this long (20-50 ms) before it goes upstream.
+# AssemblyAI v3 rejects frames under 50 ms; shorter ones are for other endpoints.
+STT_FRAME_MS = min(max(int(os.getenv("STT_FRAME_MS", "50")), 20), 50)
+# Frames buffered per session before send() waits for the socket to drain
+STT_SEND_BUFFER_FRAMES = int(os.getenv("STT_SEND_BUFFER_FRAMES", "64"))
+# Connected sessions kept ready for new /ws callers (0 disables the pool).
+# Idle sessions count as open streaming sessions on the AssemblyAI account.
+STT_POOL_SIZE = int(os.getenv("STT_POOL_SIZE", "2"))
+# Pooled sessions unused this long are replaced before the provider drops them
+STT_POOL_MAX_IDLE = float(os.getenv("STT_POOL_MAX_IDLE", "30"))
+STT_CLOSE_TIMEOUT = float(os.getenv("STT_CLOSE_TIMEOUT", "5.0"))
+
+# Live Gemini chat sessions kept between turns (least recently used go first),
+# dropped after LLM_CHAT_CACHE_TTL idle seconds or past LLM_CHAT_CACHE_MAX_CHARS of history
+LLM_CHAT_CACHE_SIZE = int(os.getenv("LLM_CHAT_CACHE_SIZE", "256"))
+LLM_CHAT_CACHE_TTL = float(os.getenv("LLM_CHAT_CACHE_TTL", "900"))
+LLM_CHAT_CACHE_MAX_CHARS = int(os.getenv("LLM_CHAT_CACHE_MAX_CHARS", "4000000"))
+
+# Longest wait for one non-streaming Gemini reply before the turn fails
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
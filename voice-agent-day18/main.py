@@ -3,7 +3,7 @@ from fastapi import FastAPI, Request, UploadFile, File, Path, WebSocket, WebSock
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from typing import Dict, List, Any, Type
+from typing import Dict, List, Any
 import logging
 from pathlib import Path as PathLib
 from uuid import uuid4
@@ -15,19 +15,6 @@ import config
 from services import stt, llm, tts
 from schemas import TTSRequest
 
-# AssemblyAI streaming imports
-import assemblyai as aai
-from assemblyai.streaming.v3 import (
-    BeginEvent,
-    StreamingClient,
-    StreamingClientOptions,
-    StreamingError,
-    StreamingEvents,
-    StreamingParameters,
-    TerminationEvent,
-    TurnEvent,
-)
-
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -46,6 +33,20 @@ UPLOADS_DIR = BASE_DIR / "uploads"
 UPLOADS_DIR.mkdir(exist_ok=True)
 
 
+@app.on_event("startup")
+async def warm_stt_streams():
+    """Opens streaming STT sessions ahead of the first /ws caller."""
+    if stt.is_configured():
+        await stt.get_provider().warm(sample_rate=16000)
+
+
+@app.on_event("shutdown")
+async def close_stt_streams():
+    """Closes pooled streaming STT sessions."""
+    if stt.is_configured():
+        await stt.get_provider().aclose()
+
+
 @app.get("/")
 async def home(request: Request):
     """Serves the main HTML page."""
@@ -64,18 +65,18 @@ async def agent_chat(
     fallback_audio_path = "static/fallback.mp3"
 
     # Check for keys by importing them from the config module
-    if not all([config.GEMINI_API_KEY, config.ASSEMBLYAI_API_KEY, config.MURF_API_KEY]):
+    if not all([config.GEMINI_API_KEY, config.MURF_API_KEY]) or not stt.is_configured():
         logging.warning("One or more API keys are not configured. Returning fallback audio.")
         return FileResponse(fallback_audio_path, media_type="audio/mpeg", headers={"X-Error": "true"})
 
     try:
         # Step 1: Transcribe audio to text
-        user_query_text = stt.transcribe_audio(audio_file)
+        user_query_text = await stt.transcribe_audio(audio_file)
         logging.info(f"User Query (session {session_id}): {user_query_text}")
 
         # Step 2: Retrieve history and get a response from the LLM
         session_history = chat_histories.get(session_id, [])
-        llm_response_text, updated_history = llm.get_llm_response(user_query_text, session_history)
+        llm_response_text, updated_history = await llm.get_llm_response(user_query_text, session_history, session_id=session_id)
         logging.info(f"LLM Response (session {session_id}): {llm_response_text}")
 
         # Step 3: Update the chat history
@@ -119,13 +120,13 @@ async def get_voices():
 
 @app.websocket("/ws")
 async def websocket_audio_streaming(websocket: WebSocket):
-    """Receive PCM audio chunks from client and transcribe in real-time using AssemblyAI with turn detection."""
+    """Receive PCM audio chunks from client and transcribe in real-time using the STT provider with turn detection."""
     await websocket.accept()
     file_id = uuid4().hex
     file_path = UPLOADS_DIR / f"streamed_{file_id}.pcm"
 
-    # Check if AssemblyAI API key is configured
-    if not config.ASSEMBLYAI_API_KEY:
+    # Check if the STT provider is configured (the stub needs no key)
+    if not stt.is_configured():
         logging.error("ASSEMBLYAI_API_KEY not configured")
         await websocket.send_text(json.dumps({
             "type": "error",
@@ -136,21 +137,15 @@ async def websocket_audio_streaming(websocket: WebSocket):
 
     # Create a queue for transcription messages
     transcription_queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
 
-    # Initialize AssemblyAI StreamingClient
-    client = StreamingClient(
-        StreamingClientOptions(
-            api_key=config.ASSEMBLYAI_API_KEY,
-            api_host="streaming.assemblyai.com",
-        )
-    )
+    def publish(message: dict):
+        """Queue a message for the client; safe to call from any thread"""
+        loop.call_soon_threadsafe(transcription_queue.put_nowait, message)
 
     # Define event handlers
-    def on_begin(self: Type[StreamingClient], event: BeginEvent):
-        logging.info(f"Transcription session started: {event.id}")
-
-    def on_turn(self: Type[StreamingClient], event: TurnEvent):
-        transcript_text = event.transcript
+    def on_turn(event: stt.TranscriptEvent):
+        transcript_text = event.text
         logging.info(f"Real-time transcript: {transcript_text}")
         print(f"TRANSCRIPTION: {transcript_text}")  # Print to console as requested
         
@@ -160,77 +155,56 @@ async def websocket_audio_streaming(websocket: WebSocket):
             print(f"END OF TURN - FINAL TRANSCRIPTION: {transcript_text}")
             
             # Put final transcription in queue for async sending
-            try:
-                transcription_queue.put_nowait({
-                    "type": "transcription",
-                    "text": transcript_text,
-                    "is_final": True,
-                    "end_of_turn": True
-                })
-                
-                # Send explicit end-of-turn notification
-                transcription_queue.put_nowait({
-                    "type": "turn_end",
-                    "message": "User stopped talking"
-                })
-            except asyncio.QueueFull:
-                logging.warning("Transcription queue is full")
-        
-        # Configure turn formatting if not already done
-        if event.end_of_turn and not event.turn_is_formatted:
-            params = StreamingParameters(
-                sample_rate=16000, 
-                format_turns=True,
-                enable_extra_session_information=True
-            )
-            self.set_params(params)
-
-    def on_terminated(self: Type[StreamingClient], event: TerminationEvent):
-        logging.info(f"Transcription session terminated: {event.audio_duration_seconds} seconds of audio processed")
-
-    def on_error(self: Type[StreamingClient], error: StreamingError):
-        logging.error(f"AssemblyAI streaming error: {error}")
-        try:
-            transcription_queue.put_nowait({
-                "type": "error",
-                "message": f"Transcription error: {error}"
+            publish({
+                "type": "transcription",
+                "text": transcript_text,
+                "is_final": True,
+                "end_of_turn": True
+            })
+            
+            # Send explicit end-of-turn notification
+            publish({
+                "type": "turn_end",
+                "message": "User stopped talking"
             })
-        except asyncio.QueueFull:
-            logging.warning("Transcription queue is full")
 
-    # Register event handlers
-    client.on(StreamingEvents.Begin, on_begin)
-    client.on(StreamingEvents.Turn, on_turn)
-    client.on(StreamingEvents.Termination, on_terminated)
-    client.on(StreamingEvents.Error, on_error)
+    def on_error(error: str):
+        logging.error(f"AssemblyAI streaming error: {error}")
+        publish({
+            "type": "error",
+            "message": f"Transcription error: {error}"
+        })
+
+    # Task to dispatch transcript events from the STT stream
+    async def receive_transcripts():
+        async for event in stream:
+            if event.error:
+                on_error(event.error)
+            else:
+                on_turn(event)
 
     # Task to send transcription messages to client
     async def send_transcriptions():
         while True:
+            # Sleeps until something is published; no periodic wake-ups while idle
+            message = await transcription_queue.get()
             try:
-                message = await asyncio.wait_for(transcription_queue.get(), timeout=0.1)
                 await websocket.send_text(json.dumps(message))
-                transcription_queue.task_done()
-            except asyncio.TimeoutError:
-                continue
             except Exception as e:
                 logging.error(f"Error sending transcription: {e}")
                 break
 
     # Start the transcription sender task
     sender_task = asyncio.create_task(send_transcriptions())
+    stream = None
+    receiver_task = None
 
-    # Connect to AssemblyAI streaming service
+    # Connect to the streaming STT service (turn formatting is enabled by the provider)
     try:
-        client.connect(
-            StreamingParameters(
-                sample_rate=16000,
-                format_turns=True,
-                enable_extra_session_information=True,
-            )
-        )
+        stream = await stt.get_provider().stream(sample_rate=16000)
+        receiver_task = asyncio.create_task(receive_transcripts())
         
-        logging.info("Connected to AssemblyAI streaming service with turn detection enabled")
+        logging.info("Connected to streaming STT service with turn detection enabled")
         await websocket.send_text(json.dumps({
             "type": "status",
             "message": "Connected to transcription service with turn detection"
@@ -245,7 +219,7 @@ async def websocket_audio_streaming(websocket: WebSocket):
                     pcm_data = message["bytes"]
                     logging.debug(f"Received audio chunk of size: {len(pcm_data)} bytes")
                     f.write(pcm_data)  # Save to file for debugging
-                    client.stream(pcm_data)  # Send to AssemblyAI for transcription
+                    await stream.send(pcm_data)  # Send to the STT provider for transcription
                     
                 elif message.get("text") == "EOF":
                     logging.info("Recording finished. Closing transcription session.")
@@ -259,11 +233,14 @@ async def websocket_audio_streaming(websocket: WebSocket):
         # Cancel the sender task
         sender_task.cancel()
         
-        # Clean up AssemblyAI connection
-        try:
-            client.disconnect(terminate=True)
-        except Exception as e:
-            logging.error(f"Error disconnecting from AssemblyAI: {e}")
+        # Clean up the STT connection
+        if stream is not None:
+            try:
+                await stream.close()
+            except Exception as e:
+                logging.error(f"Error disconnecting from STT provider: {e}")
+        if receiver_task is not None:
+            receiver_task.cancel()
         
         # Close WebSocket connection
         try:
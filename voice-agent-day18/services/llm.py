@@ -1,8 +1,13 @@
 # services/llm.py
 
 import google.generativeai as genai
+import asyncio
 import os
-from typing import List, Dict, Any, Tuple
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple, Optional
+
+import config
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
@@ -11,9 +16,85 @@ if GEMINI_API_KEY:
 else:
     print("Warning: GEMINI_API_KEY not found in .env file.")
 
-def get_llm_response(user_query: str, history: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
-    """Gets a response from the Gemini LLM and updates chat history."""
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    chat = model.start_chat(history=history)
-    response = chat.send_message(user_query)
-    return response.text, chat.history
\ No newline at end of file
+class ChatSessionCache:
+    """
+    Live Gemini ChatSessions by session id, so a turn doesn't rebuild the whole
+    history with start_chat().
+
+    A turn checks its session out and checks it back in when the reply is
+    complete; a session that is checked out (a concurrent or speculative turn)
+    or whose history no longer matches the caller's is rebuilt from the caller's
+    history. Least recently used sessions are evicted past `max_sessions` or
+    `max_chars` of history text, and any session idle for `ttl` seconds.
+    """
+
+    def __init__(self, max_sessions: int = 256, ttl: float = 900.0, max_chars: int = 4_000_000):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_chars = max_chars
+        # session id -> (chat, history chars, last used)
+        self._sessions: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._chars = 0
+
+    @staticmethod
+    def _history_chars(history) -> int:
+        return sum(len(getattr(part, "text", "") or "") for content in history for part in content.parts)
+
+    def checkout(self, session_id: str, history: List[Any]):
+        """The live chat for `history`, or a new one started from it."""
+        self._expire()
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            chat, chars, _ = entry
+            self._chars -= chars
+            current = chat.history
+            # Same length and same last message object: the chat is exactly where the caller is
+            if len(current) == len(history) and (not history or current[-1] is history[-1]):
+                return chat
+        return genai.GenerativeModel('gemini-1.5-flash').start_chat(history=history)
+
+    def checkin(self, session_id: str, chat):
+        """Keep `chat` for the session's next turn."""
+        self.discard(session_id)
+        chars = self._history_chars(chat.history)
+        self._sessions[session_id] = (chat, chars, time.monotonic())
+        self._chars += chars
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._chars > self.max_chars):
+            self._chars -= self._sessions.popitem(last=False)[1][1]
+
+    def discard(self, session_id: str):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._chars -= entry[1]
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            session_id, (_, chars, last_used) = next(iter(self._sessions.items()))
+            if last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self._chars -= chars
+
+
+chat_sessions = ChatSessionCache(
+    max_sessions=config.LLM_CHAT_CACHE_SIZE,
+    ttl=config.LLM_CHAT_CACHE_TTL,
+    max_chars=config.LLM_CHAT_CACHE_MAX_CHARS,
+)
+
+async def get_llm_response(user_query: str, history: List[Dict[str, Any]], session_id: Optional[str] = None) -> Tuple[str, List[Dict[str, Any]]]:
+    """Gets a response from the Gemini LLM and updates chat history.
+    With a session_id, the live chat is reused from chat_sessions between turns.
+    The request goes through the async client, so other sessions are served meanwhile;
+    it gives up after config.LLM_TIMEOUT seconds."""
+    if session_id is None:
+        chat = genai.GenerativeModel('gemini-1.5-flash').start_chat(history=history)
+        response = await asyncio.wait_for(chat.send_message_async(user_query), timeout=config.LLM_TIMEOUT)
+        return response.text, chat.history
+
+    chat = chat_sessions.checkout(session_id, history)
+    response = await asyncio.wait_for(chat.send_message_async(user_query), timeout=config.LLM_TIMEOUT)
+    chat_sessions.checkin(session_id, chat)
+    # A copy: the chat's own list keeps growing with later turns
+    return response.text, list(chat.history)
@@ -57,7 +57,7 @@ document.addEventListener("DOMContentLoaded", async () => {
                     source = audioContext.createMediaStreamSource(stream);
                     
                     // Create ScriptProcessorNode for processing audio chunks
-                    processor = audioContext.createScriptProcessor(4096, 1, 1); // Mono, 4096 buffer size
+                    processor = audioContext.createScriptProcessor(1024, 1, 1); // Mono, 64 ms at 16 kHz; the server re-frames it
 
                     processor.onaudioprocess = (event) => {
                         const inputData = event.inputBuffer.getChannelData(0);
@@ -9,6 +9,7 @@ from app.services.stt_service import stt_service
 from app.services.llm_service import llm_service
 from app.services.tts_service import tts_service
 from app.services.session_service import session_service
+from app.services.semantic_cache_service import semantic_cache_service
 from app.services.health_service import health_service
 from app.core.config import settings
 from app.core.logging import get_logger
@@ -56,6 +57,7 @@ async def agent_chat(
         user_message = ""
         assistant_message = ""
         audio_url = None
+        trimmed_seconds = None
         errors = ServiceErrors()
         
         # Step 1: Transcribe audio (STT)
@@ -65,6 +67,7 @@ async def agent_chat(
             
             transcription_result = await stt_service.transcribe_audio(audio_data)
             user_message = transcription_result.text
+            trimmed_seconds = transcription_result.trimmed_seconds
             
             logger.info(f"Transcription successful: '{user_message[:100]}...'")
             
@@ -76,10 +79,19 @@ async def agent_chat(
         # Add user message to session
         session_service.add_message(session_id, "user", user_message)
         
-        # Step 2: Generate AI response (LLM)
+        # Step 2: Generate AI response (LLM), or reuse the answer to a near-duplicate question
+        hit = None
+        first_turn = False
         try:
             chat_history = session_service.get_messages_for_llm(session_id)
-            assistant_message = await llm_service.generate_chat_response(chat_history)
+            first_turn = len(chat_history) == 1
+            # Follow-ups depend on the conversation, so only first questions use the semantic cache
+            if first_turn and not errors.transcription_error:
+                hit = semantic_cache_service.lookup(user_message, settings.default_voice_id)
+            if hit:
+                assistant_message = hit.answer
+            else:
+                assistant_message = await llm_service.generate_chat_response(chat_history, session_id)
             
             logger.info(f"LLM response generated: '{assistant_message[:100]}...'")
             
@@ -98,9 +110,12 @@ async def agent_chat(
         
         # Step 3: Generate speech (TTS)
         try:
-            speech_request = SpeechRequest(text=assistant_message)
-            speech_response = await tts_service.generate_speech(speech_request)
-            audio_url = speech_response.audio_url
+            if hit and hit.audio_url:
+                audio_url = hit.audio_url
+            else:
+                speech_request = SpeechRequest(text=assistant_message)
+                speech_response = await tts_service.generate_speech(speech_request)
+                audio_url = speech_response.audio_url
             
             logger.info(f"TTS successful: {audio_url}")
             
@@ -109,6 +124,11 @@ async def agent_chat(
             logger.error(f"TTS generation failed: {str(e)}")
             audio_url = None
         
+        if first_turn and not errors.transcription_error and not errors.llm_error:
+            semantic_cache_service.add(
+                hit.question if hit else user_message, assistant_message, audio_url, settings.default_voice_id
+            )
+        
         # Get current chat history length
         chat_history = session_service.get_chat_history(session_id)
         
@@ -119,6 +139,7 @@ async def agent_chat(
             audio_url=audio_url,
             chat_history_length=len(chat_history.messages),
             input_type="audio",
+            trimmed_seconds=trimmed_seconds,
             errors=errors
         )
         
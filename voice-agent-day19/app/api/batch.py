@@ -0,0 +1,105 @@
+"""Batch transcription endpoints"""
+import asyncio
+import io
+from fastapi import APIRouter, HTTPException, File, UploadFile
+from fastapi.responses import StreamingResponse
+from typing import BinaryIO, List
+from app.models.schemas import BatchTranscriptionResult
+from app.services.stt_service import stt_service
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter(prefix="/transcribe", tags=["batch"])
+
+
+def detach_upload(file: UploadFile) -> BinaryIO:
+    """Take over an upload's spooled file, which FastAPI would close when the handler returns"""
+    spooled = file.file
+    file.file = io.BytesIO()
+    return spooled
+
+
+async def transcribe_one(index: int, filename: str, content_type: str, spooled: BinaryIO,
+                         limit: asyncio.Semaphore) -> BatchTranscriptionResult:
+    """Transcribe one file of a batch, reporting failures in the result instead of raising"""
+    main_content_type = content_type.split(";")[0] if content_type else ""
+    if main_content_type not in settings.allowed_audio_types:
+        return BatchTranscriptionResult(index=index, filename=filename, error=f"Invalid file type: {content_type}")
+    
+    async with limit:
+        # Read only when a slot is free, so at most batch_concurrency files are in memory
+        audio_data = await asyncio.to_thread(spooled.read, settings.max_file_size + 1)
+        if len(audio_data) > settings.max_file_size:
+            return BatchTranscriptionResult(
+                index=index,
+                filename=filename,
+                error=f"File too large. Maximum size is {settings.max_file_size // (1024 * 1024)}MB"
+            )
+        if not audio_data:
+            return BatchTranscriptionResult(index=index, filename=filename, error="Uploaded audio file is empty")
+        try:
+            result = await stt_service.transcribe_audio(audio_data)
+        except Exception as e:
+            logger.error(f"Batch transcription of {filename} failed: {str(e)}")
+            return BatchTranscriptionResult(index=index, filename=filename, file_size=len(audio_data), error=str(e))
+    return BatchTranscriptionResult(
+        index=index,
+        filename=filename,
+        transcription=result.text,
+        confidence=result.confidence,
+        duration=result.duration,
+        trimmed_seconds=result.trimmed_seconds,
+        file_size=len(audio_data)
+    )
+
+
+@router.post("/batch")
+async def transcribe_batch(files: List[UploadFile] = File(...)):
+    """
+    Transcribe many audio files in one request
+    
+    Files are transcribed concurrently (at most batch_concurrency at a time)
+    and each result is streamed back as an NDJSON line as soon as it is ready,
+    so lines arrive in completion order; use `index` to match them to files.
+    
+    Args:
+        files: Audio file uploads
+        
+    Returns:
+        application/x-ndjson stream of BatchTranscriptionResult lines
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files provided")
+    if len(files) > settings.batch_max_files:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many files: {len(files)}. Maximum per batch is {settings.batch_max_files}"
+        )
+    if not stt_service.is_available():
+        raise HTTPException(status_code=503, detail=f"STT provider '{settings.stt_provider}' not configured")
+    
+    logger.info(f"Batch transcription requested for {len(files)} files")
+    
+    # Files are read lazily by their tasks, after this handler has returned
+    uploads = [(file.filename, file.content_type, detach_upload(file)) for file in files]
+    
+    async def results():
+        limit = asyncio.Semaphore(settings.batch_concurrency)
+        tasks = [
+            asyncio.create_task(transcribe_one(index, filename, content_type, spooled, limit))
+            for index, (filename, content_type, spooled) in enumerate(uploads)
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                yield result.model_dump_json() + "\n"
+        finally:
+            # Client went away: don't keep transcribing for nobody
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for _, _, spooled in uploads:
+                spooled.close()
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
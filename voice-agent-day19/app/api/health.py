@@ -1,7 +1,10 @@
 """Health check API endpoints"""
 from fastapi import APIRouter
-from app.models.schemas import HealthStatus, ErrorTestResponse
+from app.models.schemas import HealthStatus, ErrorTestResponse, TranscriptCacheStats, ResponseCacheStats, SemanticCacheStats
 from app.services.health_service import health_service
+from app.services.transcript_cache_service import transcript_cache_service
+from app.services.response_cache_service import response_cache_service
+from app.services.semantic_cache_service import semantic_cache_service
 from app.core.logging import get_logger
 
 logger = get_logger(__name__)
@@ -46,3 +49,21 @@ async def test_error_scenarios():
         overall_status=overall_status,
         fallback_message=fallback_message
     )
+
+
+@router.get("/transcript-cache", response_model=TranscriptCacheStats)
+async def transcript_cache_stats():
+    """Get transcript cache hit/miss counters"""
+    return transcript_cache_service.stats()
+
+
+@router.get("/response-cache", response_model=ResponseCacheStats)
+async def response_cache_stats():
+    """Get LLM response cache hit/miss counters"""
+    return response_cache_service.stats()
+
+
+@router.get("/semantic-cache", response_model=SemanticCacheStats)
+async def semantic_cache_stats():
+    """Get semantic cache hit/miss counters, threshold and size limit"""
+    return semantic_cache_service.stats()
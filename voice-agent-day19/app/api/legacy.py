@@ -64,6 +64,8 @@ async def upload_file(file: UploadFile = File(...)):
             "transcription": transcription_result.text,
             "confidence": transcription_result.confidence,
             "duration": transcription_result.duration,
+            "trimmed_seconds": transcription_result.trimmed_seconds,
+            "segments": transcription_result.segments,
             "file_size": len(audio_data)
         }
         
@@ -94,6 +96,7 @@ async def llm_query(
     try:
         final_prompt = ""
         transcription = None
+        trimmed_seconds = None
         
         # Handle audio input
         if file:
@@ -110,6 +113,7 @@ async def llm_query(
             transcription_result = await stt_service.transcribe_audio(audio_data)
             final_prompt = transcription_result.text
             transcription = transcription_result.text
+            trimmed_seconds = transcription_result.trimmed_seconds
             
         elif prompt:
             final_prompt = prompt
@@ -129,7 +133,8 @@ async def llm_query(
             prompt=final_prompt,
             response=response_text,
             input_type="audio" if file else "text",
-            transcription=transcription
+            transcription=transcription,
+            trimmed_seconds=trimmed_seconds
         )
         
     except HTTPException:
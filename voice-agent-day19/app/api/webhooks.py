@@ -0,0 +1,37 @@
+"""AssemblyAI webhook endpoints"""
+from fastapi import APIRouter, HTTPException, Header, Request
+from typing import Optional
+from app.services.webhook_service import webhook_service
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+router = APIRouter(prefix="/assemblyai", tags=["webhooks"])
+
+
+@router.post("/webhook")
+async def assemblyai_webhook(
+    request: Request,
+    x_webhook_secret: Optional[str] = Header(None)
+):
+    """
+    Receive AssemblyAI transcript completion callbacks
+    
+    Args:
+        request: Callback with transcript_id and status
+        x_webhook_secret: Shared secret configured with the transcription job
+        
+    Returns:
+        Acknowledgement for AssemblyAI
+    """
+    if settings.assemblyai_webhook_secret and x_webhook_secret != settings.assemblyai_webhook_secret:
+        logger.warning("Rejected webhook with invalid secret")
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+    
+    payload = await request.json()
+    transcript_id = payload.get("transcript_id")
+    if not transcript_id:
+        raise HTTPException(status_code=400, detail="Missing transcript_id")
+    
+    webhook_service.resolve(transcript_id, payload.get("status", ""))
+    return {"status": "ok"}
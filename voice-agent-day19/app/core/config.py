@@ -14,6 +14,51 @@ class Settings(BaseSettings):
     assemblyai_api_key: str
     google_api_key: str
 
+    # Speech-to-text provider: "assemblyai", or "stub" for offline load tests
+    stt_provider: str = "assemblyai"
+    stt_stub_latency: float = 0.3
+    stt_stub_text: str = "This is test question number {turn}."
+    stt_stub_turn_seconds: float = 3.0
+    stt_stub_partial_seconds: float = 0.5
+
+    # AssemblyAI transcription settings
+    assemblyai_base_url: str = "https://api.assemblyai.com"  # point at assemblyai_standin.py offline
+    assemblyai_webhook_url: Optional[str] = None  # public URL of /assemblyai/webhook
+    assemblyai_webhook_secret: Optional[str] = None
+    transcript_fallback_poll_interval: float = 10.0
+    transcription_timeout: float = 300.0
+
+    # Transcript cache settings
+    transcript_cache_memory_bytes: int = 8 * 1024 * 1024
+    transcript_cache_dir: Optional[str] = ".transcript_cache"
+    transcript_cache_ttl: float = 7 * 24 * 3600
+
+    # Response cache for stateless LLM prompts (the legacy /llm/query path)
+    response_cache_enabled: bool = True
+    response_cache_size: int = 1024
+    response_cache_ttl: float = 3600.0
+
+    # Near-duplicate questions reuse an earlier answer (and its audio) without an LLM call
+    semantic_cache_enabled: bool = True
+    semantic_cache_threshold: float = 0.9  # cosine similarity of hashed n-gram vectors
+    semantic_cache_max_entries: int = 2048
+    semantic_cache_ttl: float = 24 * 3600  # keep under the lifetime of TTS audio URLs
+
+    # WAV input is downmixed to mono and resampled before anything else
+    audio_target_sample_rate: int = 16000  # 0 disables normalization
+
+    # Silence trimming (VAD) settings
+    vad_trim_enabled: bool = True
+    vad_max_pause_ms: Optional[int] = None  # shorten internal pauses longer than this
+
+    # Long recordings are split at pauses and the segments transcribed in parallel
+    transcription_segment_seconds: float = 60.0  # 0 disables splitting
+    transcription_concurrency: int = 4
+
+    # Batch transcription settings
+    batch_max_files: int = 100
+    batch_concurrency: int = 8
+
     # Server Settings
     host: str = "0.0.0.0"
     port: int = 8000
@@ -33,6 +78,11 @@ class Settings(BaseSettings):
     default_language: str = "en-IN"
     max_prompt_length: int = 10000
     max_response_tokens: int = 1000
+    llm_timeout: float = 30.0  # seconds per Gemini call
+
+    # Chat context: recent messages verbatim within this budget, older ones summarized
+    llm_context_tokens: int = 2000
+    llm_summary_tokens: int = 300
 
     class Config:
         env_file = ".env"  # ensure .env is in your project root
@@ -29,11 +29,31 @@ class SpeechResponse(BaseModel):
     audio_url: str = Field(..., description="URL of generated audio file")
 
 
+class TranscriptSegment(BaseModel):
+    """Transcript of one segment of a long recording"""
+    offset: float = Field(..., description="Segment start in the recording, in seconds")
+    text: str = Field(..., description="Transcribed text of the segment")
+
+
 class TranscriptionResponse(BaseModel):
     """Response model for speech-to-text transcription"""
     text: str = Field(..., description="Transcribed text")
     confidence: Optional[float] = Field(None, description="Transcription confidence score")
     duration: Optional[float] = Field(None, description="Audio duration in seconds")
+    trimmed_seconds: Optional[float] = Field(None, description="Seconds of silence trimmed before upload")
+    segments: Optional[List[TranscriptSegment]] = Field(None, description="Per-segment transcripts when the recording was split")
+
+
+class BatchTranscriptionResult(BaseModel):
+    """One NDJSON line of a batch transcription response"""
+    index: int = Field(..., description="Position of the file in the request")
+    filename: Optional[str] = Field(None, description="Uploaded file name")
+    transcription: Optional[str] = Field(None, description="Transcribed text")
+    confidence: Optional[float] = Field(None, description="Transcription confidence score")
+    duration: Optional[float] = Field(None, description="Audio duration in seconds")
+    trimmed_seconds: Optional[float] = Field(None, description="Seconds of silence trimmed before upload")
+    file_size: Optional[int] = Field(None, description="Uploaded file size in bytes")
+    error: Optional[str] = Field(None, description="Error message if this file failed")
 
 
 class LLMRequest(BaseModel):
@@ -49,6 +69,39 @@ class LLMResponse(BaseModel):
     response: str = Field(..., description="LLM generated response")
     input_type: str = Field(..., description="Type of input (text/audio)")
     transcription: Optional[str] = Field(None, description="Transcribed text if input was audio")
+    trimmed_seconds: Optional[float] = Field(None, description="Seconds of silence trimmed before upload")
+
+
+class TranscriptCacheStats(BaseModel):
+    """Transcript cache counters"""
+    memory_hits: int = Field(..., description="Lookups served from the in-memory LRU")
+    disk_hits: int = Field(..., description="Lookups served from the on-disk store")
+    misses: int = Field(..., description="Lookups that required a new transcription")
+    hit_rate: float = Field(..., description="Fraction of lookups served from cache")
+    memory_entries: int = Field(..., description="Entries held in memory")
+    memory_bytes: int = Field(..., description="Bytes held in memory")
+    max_memory_bytes: int = Field(..., description="In-memory byte cap")
+
+
+class ResponseCacheStats(BaseModel):
+    """LLM response cache counters"""
+    hits: int = Field(..., description="Requests served from the cache")
+    coalesced: int = Field(..., description="Requests that shared an identical in-flight call")
+    misses: int = Field(..., description="Requests that required a new LLM call")
+    hit_rate: float = Field(..., description="Fraction of requests that made no LLM call of their own")
+    entries: int = Field(..., description="Cached responses")
+    in_flight: int = Field(..., description="LLM calls currently in progress")
+
+
+class SemanticCacheStats(BaseModel):
+    """Semantic (near-duplicate question) cache counters"""
+    hits: int = Field(..., description="Questions answered from a similar earlier question")
+    audio_hits: int = Field(..., description="Hits that also reused the earlier audio")
+    misses: int = Field(..., description="Questions with no similar earlier question")
+    hit_rate: float = Field(..., description="Fraction of lookups answered from the cache")
+    entries: int = Field(..., description="Live cached answers")
+    max_entries: int = Field(..., description="Index capacity")
+    threshold: float = Field(..., description="Minimum cosine similarity for a hit")
 
 
 class ChatMessage(BaseModel):
@@ -74,6 +127,7 @@ class AgentChatResponse(BaseModel):
     audio_url: Optional[str] = Field(None, description="URL of assistant's audio response")
     chat_history_length: int = Field(..., description="Number of messages in chat history")
     input_type: str = Field(default="audio", description="Type of input")
+    trimmed_seconds: Optional[float] = Field(None, description="Seconds of silence trimmed before upload")
     errors: ServiceErrors = Field(default_factory=ServiceErrors, description="Any errors that occurred")
 
 
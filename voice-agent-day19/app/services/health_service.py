@@ -35,7 +35,7 @@ class HealthService:
         if not settings.murf_api_url:
             missing_keys.append("MURF_API_URL")
             
-        if not settings.assemblyai_api_key:
+        if settings.stt_provider == "assemblyai" and not settings.assemblyai_api_key:
             missing_keys.append("ASSEMBLYAI_API_KEY")
         
         return missing_keys
@@ -1,12 +1,21 @@
 """Large Language Model service using Google Gemini"""
+import asyncio
 import google.generativeai as genai
 from typing import List, Optional
 from app.core.config import settings
 from app.core.logging import get_logger
 from app.models.schemas import LLMRequest, LLMResponse, ChatMessage
+from app.services.chat_context_service import ConversationContext
+from app.services.response_cache_service import response_cache_service
 
 logger = get_logger(__name__)
 
+RESPONSE_INSTRUCTIONS = (
+    "You are a helpful assistant. You need to respond formally and straightforwardly. "
+    "Provide informative and concise answers to user questions. "
+    "If a question is not clear or appropriate, politely ask for clarification."
+)
+
 
 class LLMService:
     """Large Language Model service using Google Gemini"""
@@ -21,11 +30,43 @@ class LLMService:
             genai.configure(api_key=self.api_key)
             self._model = genai.GenerativeModel(settings.default_llm_model)
             logger.info(f"LLM service initialized with {settings.default_llm_model}")
+
+        # Recent messages verbatim, older ones folded into a summary in the background
+        self.context = ConversationContext(
+            render=lambda message: f"{message.role.title()}: {message.content}",
+            recent_tokens=settings.llm_context_tokens,
+            summary_tokens=settings.llm_summary_tokens,
+        )
     
     def is_available(self) -> bool:
         """Check if LLM service is available"""
         return self._model is not None
     
+    async def _generate(self, prompt: str):
+        """Async Gemini call, bounded by settings.llm_timeout; the event loop stays free meanwhile"""
+        try:
+            return await asyncio.wait_for(self._model.generate_content_async(prompt), timeout=settings.llm_timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"no response within {settings.llm_timeout:g}s") from None
+    
+    async def _respond(self, prompt: str) -> str:
+        """Uncached LLM call for generate_response"""
+        logger.info(f"Generating LLM response for prompt: '{prompt[:100]}...'")
+        
+        # Add system prompt for better responses
+        system_prompt = f"{RESPONSE_INSTRUCTIONS}\n\nUser: {prompt}"
+        
+        response = await self._generate(system_prompt)
+        
+        if not response or not response.text:
+            logger.error("Empty response generated from LLM")
+            raise Exception("Empty response generated from LLM")
+        
+        response_text = response.text.strip()
+        logger.info(f"LLM response generated: '{response_text[:100]}...'")
+        
+        return response_text
+    
     async def generate_response(self, prompt: str, temperature: float = 0.7) -> str:
         """
         Generate response from prompt
@@ -44,37 +85,29 @@ class LLMService:
             raise Exception("Google Gemini API key not configured")
         
         try:
-            logger.info(f"Generating LLM response for prompt: '{prompt[:100]}...'")
+            if not settings.response_cache_enabled:
+                return await self._respond(prompt)
             
-            # Add system prompt for better responses
-            system_prompt = (
-                "You are a helpful assistant. You need to respond formally and straightforwardly. "
-                "Provide informative and concise answers to user questions. "
-                "If a question is not clear or appropriate, politely ask for clarification.\n\n"
-                f"User: {prompt}"
-            )
-            
-            response = self._model.generate_content(system_prompt)
-            
-            if not response or not response.text:
-                logger.error("Empty response generated from LLM")
-                raise Exception("Empty response generated from LLM")
-            
-            response_text = response.text.strip()
-            logger.info(f"LLM response generated: '{response_text[:100]}...'")
-            
-            return response_text
+            # Stateless prompt: identical questions share one cached (or in-flight) answer
+            key = response_cache_service.key(prompt, settings.default_llm_model, temperature, RESPONSE_INSTRUCTIONS)
+            return await response_cache_service.get_or_create(key, lambda: self._respond(prompt))
             
         except Exception as e:
             logger.error(f"LLM service error: {str(e)}")
             raise Exception(f"Language model failed: {str(e)}")
     
-    async def generate_chat_response(self, chat_history: List[ChatMessage]) -> str:
+    async def _summarize(self, prompt: str) -> str:
+        """Summary call; runs as a background task, off the request path"""
+        response = await self._generate(prompt)
+        return response.text or ""
+    
+    async def generate_chat_response(self, chat_history: List[ChatMessage], session_id: str) -> str:
         """
         Generate response based on chat history
         
         Args:
             chat_history: List of previous chat messages
+            session_id: Session the history belongs to (keys its running summary)
             
         Returns:
             Generated response text
@@ -86,24 +119,23 @@ class LLMService:
             raise Exception("Google Gemini API key not configured")
         
         try:
-            # Build conversation context
-            messages = []
-            for message in chat_history:
-                messages.append(f"{message.role.title()}: {message.content}")
-            
+            # Build conversation context within the token budget
+            summary, messages = self.context.build(session_id, chat_history, self._summarize)
             conversation_text = "\n".join(messages)
+            summary_text = f"Summary of the earlier conversation:\n{summary}\n\n" if summary else ""
             
             system_prompt = (
                 "You are a helpful assistant. You need to respond formally and straightforwardly. "
                 "Provide informative and concise answers based on the conversation context. "
                 "If a question is not clear or appropriate, politely ask for clarification.\n\n"
+                f"{summary_text}"
                 "Conversation history:\n"
                 f"{conversation_text}"
             )
             
-            logger.info(f"Generating chat response for {len(chat_history)} messages")
+            logger.info(f"Generating chat response for {len(chat_history)} messages ({len(messages)} verbatim)")
             
-            response = self._model.generate_content(system_prompt)
+            response = await self._generate(system_prompt)
             
             if not response or not response.text:
                 logger.error("Empty response generated from LLM")
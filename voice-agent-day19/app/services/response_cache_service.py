@@ -0,0 +1,118 @@
+"""Cache of LLM responses to stateless prompts, with single-flight for identical requests"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.schemas import ResponseCacheStats
+
+logger = get_logger(__name__)
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, spacing and trailing punctuation don't change the question"""
+    return " ".join(prompt.casefold().split()).rstrip(" .?!")
+
+
+class ResponseCacheService:
+    """Responses keyed by normalized prompt and generation settings: LRU capped by entry count, entries expire after `ttl`"""
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (response, time stored)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+        logger.info(f"Response cache initialized (max {max_entries} entries, ttl {ttl}s)")
+
+    @staticmethod
+    def key(prompt: str, model: str, temperature: Optional[float], system_prompt: str) -> str:
+        """
+        Compute the cache key for a request
+
+        Args:
+            prompt: User prompt (normalized here)
+            model: Model name
+            temperature: Generation temperature
+            system_prompt: Instructions sent along with the prompt
+
+        Returns:
+            Hex BLAKE2b digest of the normalized request
+        """
+        request = json.dumps([normalize_prompt(prompt), model, temperature, system_prompt])
+        return hashlib.blake2b(request.encode("utf-8"), digest_size=32).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        response, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def _store(self, key: str, response: str):
+        self._entries[key] = (response, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_create(self, key: str, generate: Callable[[], Awaitable[str]]) -> str:
+        """
+        Return the cached response, or generate it once for all concurrent callers
+
+        Args:
+            key: Digest returned by key()
+            generate: Makes the upstream call on a miss
+
+        Returns:
+            Response text
+        """
+        response = self._lookup(key)
+        if response is not None:
+            self.hits += 1
+            return response
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # A task of its own, so a caller that disconnects doesn't cancel it for the others
+            pending = asyncio.ensure_future(generate())
+            self._in_flight[key] = pending
+            pending.add_done_callback(lambda future: self._settle(key, future))
+        return await asyncio.shield(pending)
+
+    def _settle(self, key: str, future: asyncio.Future):
+        self._in_flight.pop(key, None)
+        # Failures are raised to the waiting callers and not cached
+        if not future.cancelled() and future.exception() is None:
+            self._store(key, future.result())
+
+    def stats(self) -> ResponseCacheStats:
+        """Get hit/miss counters"""
+        lookups = self.hits + self.coalesced + self.misses
+        return ResponseCacheStats(
+            hits=self.hits,
+            coalesced=self.coalesced,
+            misses=self.misses,
+            hit_rate=round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            entries=len(self._entries),
+            in_flight=len(self._in_flight),
+        )
+
+
+# Global response cache instance
+response_cache_service = ResponseCacheService(
+    max_entries=settings.response_cache_size,
+    ttl=settings.response_cache_ttl,
+)
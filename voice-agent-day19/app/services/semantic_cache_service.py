@@ -0,0 +1,173 @@
+"""Answers to past questions, found again by similarity of hashed n-gram vectors"""
+import re
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.models.schemas import SemanticCacheStats
+
+logger = get_logger(__name__)
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", text.casefold()).split())
+
+
+def _numbers(text: str) -> Tuple[str, ...]:
+    return tuple(re.findall(r"\d+", text))
+
+
+def embed(text: str, dim: int = 1024) -> np.ndarray:
+    """
+    Embed a question without a model call
+
+    Args:
+        text: Question text
+        dim: Number of hash buckets
+
+    Returns:
+        L2-normalized vector of hashed words, word pairs and character trigrams
+        (which absorb small transcription differences), each with a hashed sign
+    """
+    words = _normalize(text).split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    vector = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vector
+    hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % dim, signs)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@dataclass
+class SemanticHit:
+    """Cached answer to a past question similar to the current one"""
+    question: str
+    answer: str
+    audio_url: Optional[str]
+    similarity: float
+
+
+class SemanticCacheService:
+    """Question vectors in a preallocated matrix: cosine lookup, numbers must match, LRU capped by entry count, entries expire after `ttl`"""
+
+    def __init__(self, enabled: bool = True, threshold: float = 0.9, max_entries: int = 2048, ttl: float = 24 * 3600, dim: int = 1024):
+        self.enabled = enabled
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.dim = dim
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._stored_at = np.full(max_entries, -np.inf)
+        self._used_at = np.full(max_entries, -np.inf)
+        self._questions: List[Optional[str]] = [None] * max_entries
+        self._question_numbers: List[Tuple[str, ...]] = [()] * max_entries
+        self._answers: List[Optional[str]] = [None] * max_entries
+        # voice id -> audio URL, per entry
+        self._audio: List[Dict[str, str]] = [{} for _ in range(max_entries)]
+        self.hits = 0
+        self.audio_hits = 0
+        self.misses = 0
+        logger.info(f"Semantic cache initialized (max {max_entries} entries, threshold {threshold}, ttl {ttl}s)")
+
+    def _live(self, now: float) -> np.ndarray:
+        return self._stored_at >= now - self.ttl
+
+    def _best(self, question: str, vector: np.ndarray, now: float, threshold: float) -> Tuple[int, float]:
+        similarities = np.where(self._live(now), self._vectors @ vector, -1.0)
+        numbers = _numbers(_normalize(question))
+        candidates = np.flatnonzero(similarities >= threshold)
+        # "gate 12" is not "gate 21", though the numbers barely move the similarity
+        for slot in candidates[np.argsort(-similarities[candidates])].tolist():
+            if self._question_numbers[slot] == numbers:
+                return slot, float(similarities[slot])
+        return -1, 0.0
+
+    def lookup(self, question: str, voice_id: str) -> Optional[SemanticHit]:
+        """
+        Find the cached answer to the closest past question
+
+        Args:
+            question: Transcribed user question
+            voice_id: Voice the answer will be spoken in
+
+        Returns:
+            SemanticHit (with audio only if synthesized in the same voice), or None
+            below the similarity threshold or when the cache is disabled
+        """
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        slot, similarity = self._best(question, embed(question, self.dim), now, self.threshold)
+        if slot < 0:
+            self.misses += 1
+            return None
+        self._used_at[slot] = now
+        self.hits += 1
+        audio_url = self._audio[slot].get(voice_id)
+        if audio_url:
+            self.audio_hits += 1
+        logger.info(f"Semantic cache hit ({similarity:.3f}) for: '{self._questions[slot][:100]}'")
+        return SemanticHit(self._questions[slot], self._answers[slot], audio_url, similarity)
+
+    def add(self, question: str, answer: str, audio_url: Optional[str], voice_id: str):
+        """
+        Remember an answer; a near-identical question replaces its older entry
+
+        Args:
+            question: User question
+            answer: Assistant answer
+            audio_url: Synthesized answer, if any
+            voice_id: Voice of the audio
+        """
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        vector = embed(question, self.dim)
+        if not vector.any() or not answer:
+            return
+        slot, _ = self._best(question, vector, now, 0.999)
+        if slot < 0 or self._answers[slot] != answer:
+            if slot < 0:
+                # Prefer an expired or never-used slot, then the least recently used one
+                slot = int(np.argmin(np.where(self._live(now), self._used_at, -np.inf)))
+            # Only a new answer starts the clock; adding audio to an entry doesn't extend its life
+            self._audio[slot] = {}
+            self._stored_at[slot] = now
+        self._vectors[slot] = vector
+        self._used_at[slot] = now
+        self._questions[slot] = question
+        self._question_numbers[slot] = _numbers(_normalize(question))
+        self._answers[slot] = answer
+        if audio_url:
+            self._audio[slot][voice_id] = audio_url
+
+    def stats(self) -> SemanticCacheStats:
+        """Get hit/miss counters and index limits"""
+        lookups = self.hits + self.misses
+        return SemanticCacheStats(
+            hits=self.hits,
+            audio_hits=self.audio_hits,
+            misses=self.misses,
+            hit_rate=round(self.hits / lookups, 4) if lookups else 0.0,
+            entries=int(self._live(time.monotonic()).sum()),
+            max_entries=self.max_entries,
+            threshold=self.threshold,
+        )
+
+
+# Global semantic cache instance
+semantic_cache_service = SemanticCacheService(
+    enabled=settings.semantic_cache_enabled,
+    threshold=settings.semantic_cache_threshold,
+    max_entries=settings.semantic_cache_max_entries,
+    ttl=settings.semantic_cache_ttl,
+)
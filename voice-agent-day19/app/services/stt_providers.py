@@ -0,0 +1,286 @@
+"""Pluggable speech-to-text providers behind one async interface"""
+import asyncio
+import hashlib
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Dict, Optional, Protocol
+import assemblyai as aai
+from assemblyai.streaming.v3 import (
+    StreamingClient,
+    StreamingClientOptions,
+    StreamingEvents,
+    StreamingParameters,
+)
+from app.core.config import settings
+from app.core.logging import get_logger
+from app.services.webhook_service import webhook_service
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class TranscriptResult:
+    """A finished batch transcription"""
+    text: str
+    confidence: Optional[float] = None
+    duration: Optional[float] = None
+
+
+@dataclass
+class TranscriptEvent:
+    """One result from a streaming transcription session"""
+    text: str = ""
+    end_of_turn: bool = False
+    is_formatted: bool = False
+    error: Optional[str] = None
+
+
+class STTStream(Protocol):
+    """A live transcription session: push PCM in, iterate TranscriptEvents out"""
+
+    async def send(self, pcm: bytes) -> None: ...
+
+    async def close(self) -> None: ...
+
+    def __aiter__(self) -> AsyncIterator[TranscriptEvent]: ...
+
+
+class STTProvider(Protocol):
+    """Async speech-to-text backend: submit() then result() for files, stream() for live audio"""
+    name: str
+
+    async def submit(self, audio_data: bytes) -> str: ...
+
+    async def result(self, job_id: str) -> TranscriptResult: ...
+
+    async def stream(self, sample_rate: int = 16000) -> STTStream: ...
+
+
+# Provider name -> factory, selected with settings.stt_provider
+STT_PROVIDERS: Dict[str, Callable[[], STTProvider]] = {}
+
+
+def register_stt_provider(name: str):
+    """Class decorator that makes a provider selectable by name"""
+    def decorator(factory):
+        STT_PROVIDERS[name] = factory
+        return factory
+    return decorator
+
+
+def create_stt_provider(name: str) -> STTProvider:
+    """
+    Instantiate a registered provider
+
+    Args:
+        name: Registered provider name
+
+    Returns:
+        Provider instance
+
+    Raises:
+        ValueError: If no provider is registered under that name
+    """
+    if name not in STT_PROVIDERS:
+        raise ValueError(f"Unknown STT provider '{name}'. Available: {', '.join(STT_PROVIDERS)}")
+    return STT_PROVIDERS[name]()
+
+
+class _QueueStream:
+    """Events are handed to the consumer through an asyncio.Queue; None ends the stream"""
+
+    def __init__(self):
+        self._events: asyncio.Queue = asyncio.Queue()
+
+    async def __aiter__(self) -> AsyncIterator[TranscriptEvent]:
+        while True:
+            event = await self._events.get()
+            if event is None:
+                return
+            yield event
+
+
+class AssemblyAIStream(_QueueStream):
+    """Adapts the SDK's thread-based StreamingClient to STTStream"""
+
+    def __init__(self, sample_rate: int):
+        super().__init__()
+        self.sample_rate = sample_rate
+        self._loop = asyncio.get_running_loop()
+        self._client = StreamingClient(
+            StreamingClientOptions(
+                api_key=settings.assemblyai_api_key,
+                api_host="streaming.assemblyai.com",
+            )
+        )
+        # SDK callbacks run on its reader thread; hand events over to the loop
+        self._client.on(StreamingEvents.Turn, self._on_turn)
+        self._client.on(StreamingEvents.Termination, lambda client, event: self._put(None))
+        self._client.on(StreamingEvents.Error, lambda client, error: self._put(TranscriptEvent(error=str(error))))
+
+    def _put(self, event: Optional[TranscriptEvent]):
+        self._loop.call_soon_threadsafe(self._events.put_nowait, event)
+
+    def _on_turn(self, client, event):
+        self._put(TranscriptEvent(
+            text=event.transcript,
+            end_of_turn=event.end_of_turn,
+            is_formatted=event.turn_is_formatted,
+        ))
+
+    async def connect(self):
+        await asyncio.to_thread(
+            self._client.connect,
+            StreamingParameters(
+                sample_rate=self.sample_rate,
+                format_turns=True,
+                enable_extra_session_information=True,
+            )
+        )
+
+    async def send(self, pcm: bytes) -> None:
+        # Only enqueues; the SDK's writer thread does the network send
+        self._client.stream(pcm)
+
+    async def close(self) -> None:
+        try:
+            await asyncio.to_thread(self._client.disconnect, terminate=True)
+        finally:
+            self._events.put_nowait(None)
+
+
+@register_stt_provider("assemblyai")
+class AssemblyAIProvider:
+    """AssemblyAI batch (with optional completion webhooks) and streaming transcription"""
+    name = "assemblyai"
+
+    def __init__(self):
+        aai.settings.api_key = settings.assemblyai_api_key
+        aai.settings.base_url = settings.assemblyai_base_url
+        self._transcriber = aai.Transcriber()
+        self._http_client = aai.Client.get_default().http_client
+
+    def uses_webhooks(self) -> bool:
+        """Check if transcripts complete via webhook instead of polling"""
+        return bool(settings.assemblyai_webhook_url)
+
+    async def submit(self, audio_data: bytes) -> str:
+        config = aai.TranscriptionConfig()
+        if self.uses_webhooks():
+            config.set_webhook(
+                settings.assemblyai_webhook_url,
+                auth_header_name="X-Webhook-Secret" if settings.assemblyai_webhook_secret else None,
+                auth_header_value=settings.assemblyai_webhook_secret,
+            )
+        transcript = await asyncio.to_thread(self._transcriber.submit, audio_data, config)
+        logger.info(f"Submitted transcript {transcript.id}")
+        return transcript.id
+
+    async def result(self, job_id: str) -> TranscriptResult:
+        """
+        Wait for a submitted transcript to finish
+
+        With webhooks configured this waits for the completion callback and only
+        polls every transcript_fallback_poll_interval seconds in case it never
+        arrives; otherwise it polls at the SDK's polling interval.
+        """
+        interval = settings.transcript_fallback_poll_interval if self.uses_webhooks() else aai.settings.polling_interval
+        deadline = time.monotonic() + settings.transcription_timeout
+        try:
+            while True:
+                # One status fetch; Transcript.get_by_id would block until completion
+                transcript = await asyncio.to_thread(aai.api.get_transcript, self._http_client, job_id)
+                if transcript.status == aai.TranscriptStatus.error:
+                    raise Exception(f"Transcription failed: {transcript.error}")
+                if transcript.status == aai.TranscriptStatus.completed:
+                    return TranscriptResult(
+                        text=transcript.text or "",
+                        confidence=transcript.confidence,
+                        duration=transcript.audio_duration,
+                    )
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise Exception(f"Timed out waiting for transcript {job_id}")
+                if self.uses_webhooks():
+                    waiter = webhook_service.register(job_id)
+                    try:
+                        await asyncio.wait_for(asyncio.shield(waiter), timeout=min(interval, remaining))
+                    except asyncio.TimeoutError:
+                        logger.info(f"No webhook yet for {job_id}, polling")
+                    webhook_service.discard(job_id)
+                else:
+                    await asyncio.sleep(min(interval, remaining))
+        finally:
+            webhook_service.discard(job_id)
+
+    async def stream(self, sample_rate: int = 16000) -> STTStream:
+        stream = AssemblyAIStream(sample_rate)
+        await stream.connect()
+        return stream
+
+
+class StubStream(_QueueStream):
+    """
+    Deterministic live session: a partial every stt_stub_partial_seconds of audio
+    and an end-of-turn every stt_stub_turn_seconds, each delivered stt_stub_latency
+    seconds later. "{turn}" in the text is replaced by the turn number.
+    """
+
+    def __init__(self, sample_rate: int, text: str, latency: float, turn_seconds: float, partial_seconds: float):
+        super().__init__()
+        self.text = text
+        self.latency = latency
+        bytes_per_second = sample_rate * 2  # 16-bit mono PCM
+        self._turn_bytes = max(1, int(turn_seconds * bytes_per_second))
+        self._partial_bytes = max(1, int(partial_seconds * bytes_per_second))
+        self._received = 0
+        self._turn = 1
+        self._closed = False
+
+    def _emit(self, event: Optional[TranscriptEvent]):
+        asyncio.get_running_loop().call_later(self.latency, self._events.put_nowait, event)
+
+    async def send(self, pcm: bytes) -> None:
+        if self._closed:
+            return
+        start = self._received
+        self._received += len(pcm)
+        for mark in range(start // self._partial_bytes + 1, self._received // self._partial_bytes + 1):
+            text = self.text.replace("{turn}", str(self._turn))
+            words = text.split()
+            position = mark * self._partial_bytes % self._turn_bytes
+            if position < self._partial_bytes:
+                self._emit(TranscriptEvent(text=text, end_of_turn=True, is_formatted=True))
+                self._turn += 1
+            else:
+                shown = max(1, len(words) * position // self._turn_bytes)
+                self._emit(TranscriptEvent(text=" ".join(words[:shown]).lower()))
+
+    async def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._emit(None)
+
+
+@register_stt_provider("stub")
+class StubSTTProvider:
+    """Offline provider for load tests: fixed text after a fixed latency, no network"""
+    name = "stub"
+
+    async def submit(self, audio_data: bytes) -> str:
+        # Same audio, same job id
+        return hashlib.blake2b(audio_data, digest_size=8).hexdigest()
+
+    async def result(self, job_id: str) -> TranscriptResult:
+        await asyncio.sleep(settings.stt_stub_latency)
+        return TranscriptResult(text=settings.stt_stub_text.replace("{turn}", "1"))
+
+    async def stream(self, sample_rate: int = 16000) -> STTStream:
+        return StubStream(
+            sample_rate,
+            settings.stt_stub_text,
+            settings.stt_stub_latency,
+            settings.stt_stub_turn_seconds,
+            settings.stt_stub_partial_seconds,
+        )
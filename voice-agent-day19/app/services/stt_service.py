@@ -1,32 +1,82 @@
-"""Speech-to-Text service using AssemblyAI"""
-import assemblyai as aai
+"""Speech-to-Text service on top of the configured STT provider"""
+import asyncio
+from typing import List, Tuple
 from app.core.config import settings
 from app.core.logging import get_logger
-from app.models.schemas import TranscriptionResponse
+from app.models.schemas import TranscriptionResponse, TranscriptSegment
+from app.services.stt_providers import STTProvider, TranscriptResult, create_stt_provider
+from app.services.transcript_cache_service import transcript_cache_service
+from app.services.vad_service import vad_service
 
 logger = get_logger(__name__)
 
 
 class STTService:
-    """Speech-to-Text service using AssemblyAI"""
+    """Speech-to-Text service backed by the provider selected in settings.stt_provider"""
     
     def __init__(self):
-        if not settings.assemblyai_api_key:
+        if settings.stt_provider == "assemblyai" and not settings.assemblyai_api_key:
             logger.warning("AssemblyAI API key not found")
-            self._transcriber = None
+            self._provider = None
         else:
-            aai.settings.api_key = settings.assemblyai_api_key
-            self._transcriber = aai.Transcriber()
-            logger.info("STT service initialized with AssemblyAI")
+            self._provider = create_stt_provider(settings.stt_provider)
+            logger.info(f"STT service initialized with provider '{self._provider.name}'")
     
     def is_available(self) -> bool:
         """Check if STT service is available"""
-        return self._transcriber is not None
+        return self._provider is not None
+    
+    @property
+    def provider(self) -> STTProvider:
+        """The active STT provider, for streaming sessions"""
+        return self._provider
+    
+    async def _transcribe_segment(self, audio_data: bytes) -> Tuple[TranscriptResult, float]:
+        """Trim and transcribe one clip; returns the transcript and seconds trimmed"""
+        audio_data, trimmed_seconds = await asyncio.to_thread(vad_service.trim, audio_data)
+        logger.info(f"Starting transcription for {len(audio_data)} bytes of audio")
+        
+        job_id = await self._provider.submit(audio_data)
+        transcript = await self._provider.result(job_id)
+        return transcript, trimmed_seconds
+    
+    async def _transcribe_segments(self, segments: List[Tuple[bytes, float]]) -> TranscriptionResponse:
+        """
+        Transcribe segments of a long recording concurrently and stitch them in order
+        
+        At most transcription_concurrency segments are in flight at once, so wall
+        time tracks the longest segment rather than the whole recording.
+        """
+        limit = asyncio.Semaphore(settings.transcription_concurrency)
+        
+        async def run(audio_data: bytes):
+            async with limit:
+                return await self._transcribe_segment(audio_data)
+        
+        results = await asyncio.gather(*(run(audio_data) for audio_data, _ in segments))
+        
+        texts = [(transcript.text or "").strip() for transcript, _ in results]
+        confidences = [t.confidence for t, _ in results if t.confidence is not None]
+        durations = [t.duration for t, _ in results if t.duration is not None]
+        
+        return TranscriptionResponse(
+            text=" ".join(text for text in texts if text),
+            confidence=sum(confidences) / len(confidences) if confidences else None,
+            duration=sum(durations) if len(durations) == len(results) else None,
+            trimmed_seconds=round(sum(trimmed for _, trimmed in results), 3),
+            segments=[
+                TranscriptSegment(offset=round(offset, 3), text=text)
+                for (_, offset), text in zip(segments, texts)
+            ]
+        )
     
     async def transcribe_audio(self, audio_data: bytes) -> TranscriptionResponse:
         """
         Transcribe audio data to text
         
+        Recordings longer than transcription_segment_seconds are split at pauses
+        and the segments transcribed in parallel.
+        
         Args:
             audio_data: Audio data as bytes
             
@@ -37,28 +87,38 @@ class STTService:
             Exception: If transcription fails or service unavailable
         """
         if not self.is_available():
-            raise Exception("AssemblyAI API key not configured")
+            raise Exception("STT provider not configured")
+        
+        cache_key = transcript_cache_service.digest(audio_data)
+        cached = await transcript_cache_service.get(cache_key)
+        if cached is not None:
+            logger.info("Transcript cache hit, skipping transcription")
+            return TranscriptionResponse(**{**cached, "trimmed_seconds": 0.0})
         
         try:
-            logger.info(f"Starting transcription for {len(audio_data)} bytes of audio")
-            
-            transcript = self._transcriber.transcribe(audio_data)
+            # Cache keys use the original bytes; everything downstream sees mono 16 kHz
+            audio_data = await asyncio.to_thread(vad_service.normalize, audio_data)
+            segments = await asyncio.to_thread(vad_service.split, audio_data)
             
-            if transcript.status == aai.TranscriptStatus.error:
-                logger.error(f"Transcription failed: {transcript.error}")
-                raise Exception(f"Transcription failed: {transcript.error}")
+            if len(segments) > 1:
+                result = await self._transcribe_segments(segments)
+            else:
+                transcript, trimmed_seconds = await self._transcribe_segment(audio_data)
+                result = TranscriptionResponse(
+                    text=transcript.text or "",
+                    confidence=transcript.confidence,
+                    duration=transcript.duration,
+                    trimmed_seconds=trimmed_seconds
+                )
             
-            if not transcript.text or transcript.text.strip() == "":
+            if not result.text or result.text.strip() == "":
                 logger.warning("No speech detected in audio")
                 raise Exception("No speech detected in the audio")
             
-            logger.info(f"Transcription successful: '{transcript.text[:50]}...'")
+            logger.info(f"Transcription successful: '{result.text[:50]}...'")
+            await transcript_cache_service.put(cache_key, result.model_dump())
             
-            return TranscriptionResponse(
-                text=transcript.text,
-                confidence=getattr(transcript, 'confidence', None),
-                duration=getattr(transcript, 'duration', None)
-            )
+            return result
             
         except Exception as e:
             logger.error(f"STT service error: {str(e)}")
@@ -0,0 +1,346 @@
+"""Audio preprocessing before transcription: resampling and voice activity detection"""
+import io
+import wave
+from typing import List, Optional, Tuple
+import numpy as np
+from app.core.config import settings
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def is_wav(audio_bytes: bytes) -> bool:
+    return len(audio_bytes) >= 12 and audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE"
+
+
+def _frames(samples: np.ndarray, sample_rate: int, frame_ms: int) -> np.ndarray:
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    n_frames = len(samples) // frame_len
+    return samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+
+
+def _energy_db(frames: np.ndarray) -> np.ndarray:
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) + 1e-10
+    return 20 * np.log10(rms)
+
+
+def _decode(pcm: bytes, channels: int, sample_width: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Return (interleaved samples shaped [n, channels], normalised float mono mix)."""
+    dtype = _DTYPES[sample_width]
+    block = sample_width * channels
+    usable = len(pcm) - len(pcm) % block
+    samples = np.frombuffer(pcm[:usable], dtype=np.dtype(dtype).newbyteorder("<")).reshape(-1, channels)
+
+    mono = samples.astype(np.float32).mean(axis=1)
+    if dtype is np.uint8:
+        mono = (mono - 128.0) / 128.0
+    else:
+        mono /= float(np.iinfo(dtype).max)
+    return samples, mono
+
+
+def _lowpass_kernel(cutoff: float, taps: int = 63) -> np.ndarray:
+    """Windowed-sinc low-pass FIR; `cutoff` is a fraction of the sample rate (0-0.5)."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return kernel / kernel.sum()
+
+
+def resample(mono: np.ndarray, sample_rate: int, target_rate: int) -> np.ndarray:
+    """Resample float mono samples, band-limiting first when downsampling so nothing aliases."""
+    if sample_rate == target_rate or len(mono) == 0:
+        return mono
+    if target_rate < sample_rate:
+        mono = np.convolve(mono, _lowpass_kernel(0.5 * target_rate / sample_rate), mode="same")
+    n_out = int(len(mono) * target_rate / sample_rate)
+    positions = np.arange(n_out) * (sample_rate / target_rate)
+    return np.interp(positions, np.arange(len(mono)), mono)
+
+
+def _to_int16(mono: np.ndarray) -> bytes:
+    return np.clip(np.round(mono * 32767), -32768, 32767).astype("<i2").tobytes()
+
+
+def normalize_pcm(pcm: bytes, sample_rate: int, channels: int = 1, sample_width: int = 2,
+                  target_rate: int = 16000) -> Tuple[bytes, int]:
+    """
+    Downmix raw PCM to mono 16-bit at `target_rate`. Returns (pcm, sample_rate).
+
+    Audio already below `target_rate` keeps its rate; upsampling only adds bytes.
+    """
+    rate = min(sample_rate, target_rate)
+    if (sample_rate, channels, sample_width) == (rate, 1, 2) or sample_width not in _DTYPES or not pcm:
+        return pcm, sample_rate
+    _, mono = _decode(pcm, channels, sample_width)
+    return _to_int16(resample(mono, sample_rate, rate)), rate
+
+
+def normalize_wav(audio_bytes: bytes, target_rate: int = 16000) -> bytes:
+    """Convert a PCM WAV file to mono 16-bit at `target_rate`. Anything else is returned unchanged."""
+    wav = _read_wav(audio_bytes)
+    if wav is None:
+        return audio_bytes
+    params, pcm = wav
+
+    normalized, rate = normalize_pcm(pcm, params.framerate, params.nchannels, params.sampwidth, target_rate)
+    if normalized is pcm:
+        return audio_bytes
+    return _write_wav(params._replace(nchannels=1, sampwidth=2, framerate=rate), normalized)
+
+
+def detect_speech(
+    samples: np.ndarray,
+    sample_rate: int,
+    frame_ms: int = 20,
+    min_energy_db: float = -50.0,
+    noise_margin_db: float = 12.0,
+    zcr_threshold: float = 0.25,
+) -> np.ndarray:
+    """
+    Return a boolean speech flag per frame of mono float samples in [-1, 1].
+
+    A frame is speech when its RMS energy is `noise_margin_db` above the clip's
+    noise floor (10th percentile frame energy), or slightly quieter but with a
+    high zero-crossing rate, which keeps unvoiced consonants like "s" and "f".
+    """
+    frames = _frames(samples, sample_rate, frame_ms)
+    if len(frames) == 0:
+        return np.zeros(0, dtype=bool)
+
+    energy_db = _energy_db(frames)
+    zcr = np.mean(np.diff(np.signbit(frames), axis=1), axis=1)
+
+    noise_floor = np.percentile(energy_db, 10)
+    threshold = max(min_energy_db, noise_floor + noise_margin_db)
+    return (energy_db > threshold) | ((energy_db > threshold - 6) & (zcr > zcr_threshold))
+
+
+def _keep_mask(speech: np.ndarray, frame_ms: int, pad_ms: int, max_pause_ms: Optional[int]) -> np.ndarray:
+    keep = np.zeros_like(speech)
+    voiced = np.flatnonzero(speech)
+    if len(voiced) == 0:
+        return keep
+
+    pad = pad_ms // frame_ms
+    keep[max(voiced[0] - pad, 0):voiced[-1] + pad + 1] = True
+
+    if max_pause_ms is not None:
+        # Shorten internal pauses to max_pause_ms, keeping padding on both sides
+        max_pause = max(max_pause_ms // frame_ms, 2 * pad)
+        gaps = np.diff(voiced)
+        for i in np.flatnonzero(gaps - 1 > max_pause):
+            start, gap = voiced[i], gaps[i]
+            keep[start + 1 + max_pause // 2:start + gap - max_pause // 2] = False
+    return keep
+
+
+def trim_pcm(
+    pcm: bytes,
+    sample_rate: int,
+    channels: int = 1,
+    sample_width: int = 2,
+    frame_ms: int = 20,
+    pad_ms: int = 200,
+    max_pause_ms: Optional[int] = None,
+) -> Tuple[bytes, float]:
+    """Trim silence from raw little-endian PCM. Returns (pcm, seconds_removed)."""
+    if sample_width not in _DTYPES or not pcm:
+        return pcm, 0.0
+
+    # Analyse a normalised mono mix; cut the original interleaved samples
+    samples, mono = _decode(pcm, channels, sample_width)
+    speech = detect_speech(mono, sample_rate, frame_ms)
+    if len(speech) == 0:
+        return pcm, 0.0
+
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    keep = _keep_mask(speech, frame_ms, pad_ms, max_pause_ms)
+    if not keep.any():
+        # No speech found; leave the clip alone and let the STT decide
+        return pcm, 0.0
+
+    sample_keep = np.repeat(keep, frame_len)
+    tail = len(samples) - len(sample_keep)
+    sample_keep = np.concatenate([sample_keep, np.full(tail, keep[-1])])
+    trimmed = samples[sample_keep]
+
+    removed = (len(samples) - len(trimmed)) / sample_rate
+    return trimmed.tobytes(), round(removed, 3)
+
+
+def trim_wav(audio_bytes: bytes, frame_ms: int = 20, pad_ms: int = 200,
+             max_pause_ms: Optional[int] = None) -> Tuple[bytes, float]:
+    """Trim silence from a PCM WAV file. Anything else is returned unchanged."""
+    wav = _read_wav(audio_bytes)
+    if wav is None:
+        return audio_bytes, 0.0
+    params, pcm = wav
+
+    trimmed, removed = trim_pcm(pcm, params.framerate, params.nchannels, params.sampwidth,
+                                frame_ms, pad_ms, max_pause_ms)
+    if removed == 0.0:
+        return audio_bytes, 0.0
+    return _write_wav(params, trimmed), removed
+
+
+def _read_wav(audio_bytes: bytes):
+    if not is_wav(audio_bytes):
+        return None
+    try:
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav_in:
+            params = wav_in.getparams()
+            return params, wav_in.readframes(params.nframes)
+    except (wave.Error, EOFError):
+        # Compressed or malformed WAV; upload as-is
+        return None
+
+
+def _write_wav(params, pcm: bytes) -> bytes:
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav_out:
+        wav_out.setnchannels(params.nchannels)
+        wav_out.setsampwidth(params.sampwidth)
+        wav_out.setframerate(params.framerate)
+        wav_out.writeframes(pcm)
+    return out.getvalue()
+
+
+def plan_segments(speech: np.ndarray, energy_db: np.ndarray, max_frames: int) -> List[Tuple[int, int]]:
+    """
+    Split frames into [start, end) ranges of at most `max_frames`.
+
+    Each cut goes in the middle of the longest pause in the back half of the
+    window, so words are not split; with no pause there it falls back to the
+    quietest frame.
+    """
+    n_frames = len(speech)
+    ranges = []
+    start = 0
+    while n_frames - start > max_frames:
+        lo, hi = start + max(max_frames // 2, 1), start + max_frames
+        silent = ~speech[lo:hi]
+        if silent.any():
+            edges = np.flatnonzero(np.diff(np.concatenate([[0], silent.astype(np.int8), [0]])))
+            run_starts, run_ends = edges[::2], edges[1::2]
+            longest = np.argmax(run_ends - run_starts)
+            cut = lo + (run_starts[longest] + run_ends[longest]) // 2
+        else:
+            cut = lo + int(np.argmin(energy_db[lo:hi]))
+        ranges.append((start, cut))
+        start = cut
+    ranges.append((start, n_frames))
+    return ranges
+
+
+def split_pcm(
+    pcm: bytes,
+    sample_rate: int,
+    channels: int = 1,
+    sample_width: int = 2,
+    max_segment_seconds: float = 60.0,
+    frame_ms: int = 20,
+) -> List[Tuple[bytes, float]]:
+    """Split raw PCM at pauses into segments of at most max_segment_seconds. Returns [(pcm, offset_seconds)]."""
+    if sample_width not in _DTYPES or not pcm:
+        return [(pcm, 0.0)]
+
+    samples, mono = _decode(pcm, channels, sample_width)
+    frames = _frames(mono, sample_rate, frame_ms)
+    max_frames = max(1, int(max_segment_seconds * 1000) // frame_ms)
+    if len(frames) <= max_frames:
+        return [(pcm, 0.0)]
+
+    speech = detect_speech(mono, sample_rate, frame_ms)
+    frame_len = frames.shape[1]
+    segments = []
+    for start, end in plan_segments(speech, _energy_db(frames), max_frames):
+        # The last segment also takes the partial frame at the end of the clip
+        end_sample = len(samples) if end == len(frames) else end * frame_len
+        segments.append((samples[start * frame_len:end_sample].tobytes(), start * frame_len / sample_rate))
+    return segments
+
+
+def split_wav(audio_bytes: bytes, max_segment_seconds: float = 60.0,
+              frame_ms: int = 20) -> List[Tuple[bytes, float]]:
+    """Split a PCM WAV file at pauses into WAV segments. Anything else is one segment at offset 0."""
+    wav = _read_wav(audio_bytes)
+    if wav is None:
+        return [(audio_bytes, 0.0)]
+    params, pcm = wav
+
+    segments = split_pcm(pcm, params.framerate, params.nchannels, params.sampwidth,
+                         max_segment_seconds, frame_ms)
+    if len(segments) == 1:
+        return [(audio_bytes, 0.0)]
+    return [(_write_wav(params, segment), offset) for segment, offset in segments]
+
+
+class VADService:
+    """Resampling plus energy/zero-crossing VAD for WAV input"""
+    
+    def __init__(self):
+        self.enabled = settings.vad_trim_enabled
+        self.max_pause_ms = settings.vad_max_pause_ms
+        self.segment_seconds = settings.transcription_segment_seconds
+        self.target_sample_rate = settings.audio_target_sample_rate
+        logger.info(f"VAD service initialized (enabled={self.enabled}, max_pause_ms={self.max_pause_ms})")
+    
+    def normalize(self, audio_data: bytes) -> bytes:
+        """
+        Downmix to mono and resample to the target rate as 16-bit PCM
+        
+        Args:
+            audio_data: Audio bytes; only PCM WAV is converted
+            
+        Returns:
+            Audio bytes to upload
+        """
+        if self.target_sample_rate <= 0:
+            return audio_data
+        
+        normalized = normalize_wav(audio_data, self.target_sample_rate)
+        if normalized is not audio_data:
+            logger.info(f"Normalized audio to mono {self.target_sample_rate} Hz: {len(audio_data)} -> {len(normalized)} bytes")
+        return normalized
+    
+    def trim(self, audio_data: bytes) -> Tuple[bytes, float]:
+        """
+        Remove leading/trailing silence (and long pauses if configured)
+        
+        Args:
+            audio_data: Audio bytes; only PCM WAV is trimmed
+            
+        Returns:
+            Tuple of (audio bytes to upload, seconds of audio removed)
+        """
+        if not self.enabled:
+            return audio_data, 0.0
+        
+        trimmed, removed = trim_wav(audio_data, max_pause_ms=self.max_pause_ms)
+        if removed:
+            logger.info(f"Trimmed {removed:.2f}s of silence before transcription")
+        return trimmed, removed
+    
+    def split(self, audio_data: bytes) -> List[Tuple[bytes, float]]:
+        """
+        Split a long recording at pauses into bounded-length segments
+        
+        Args:
+            audio_data: Audio bytes; only PCM WAV is split
+            
+        Returns:
+            List of (segment audio bytes, offset in seconds), in order
+        """
+        if self.segment_seconds <= 0:
+            return [(audio_data, 0.0)]
+        
+        segments = split_wav(audio_data, self.segment_seconds)
+        if len(segments) > 1:
+            logger.info(f"Split audio into {len(segments)} segments of at most {self.segment_seconds}s")
+        return segments
+
+
+# Global VAD service instance
+vad_service = VADService()
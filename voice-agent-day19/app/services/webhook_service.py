@@ -0,0 +1,76 @@
+"""Registry of transcription jobs waiting for an AssemblyAI completion webhook"""
+import asyncio
+from typing import Dict, Optional
+from app.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Callbacks that arrive before their job is registered are remembered briefly
+MAX_EARLY_CALLBACKS = 1000
+
+
+class WebhookService:
+    """Maps transcript ids to futures resolved by the webhook endpoint"""
+    
+    def __init__(self):
+        self._waiters: Dict[str, asyncio.Future] = {}
+        self._early: Dict[str, str] = {}
+        logger.info("Webhook service initialized")
+    
+    def register(self, transcript_id: str) -> asyncio.Future:
+        """
+        Register a transcript id and return a future for its completion callback
+        
+        Args:
+            transcript_id: AssemblyAI transcript identifier
+            
+        Returns:
+            Future resolved with the reported status
+        """
+        future = self._waiters.get(transcript_id)
+        if future is None or future.done():
+            future = asyncio.get_running_loop().create_future()
+            self._waiters[transcript_id] = future
+        
+        status = self._early.pop(transcript_id, None)
+        if status is not None and not future.done():
+            future.set_result(status)
+        return future
+    
+    def resolve(self, transcript_id: str, status: str) -> bool:
+        """
+        Resolve the waiter for a transcript id
+        
+        Args:
+            transcript_id: AssemblyAI transcript identifier
+            status: Status reported by the webhook (completed/error)
+            
+        Returns:
+            True if a waiting request was resolved
+        """
+        future = self._waiters.get(transcript_id)
+        if future is None:
+            self._early[transcript_id] = status
+            while len(self._early) > MAX_EARLY_CALLBACKS:
+                self._early.pop(next(iter(self._early)))
+            logger.info(f"Webhook for unregistered transcript {transcript_id} stored")
+            return False
+        
+        if not future.done():
+            future.set_result(status)
+        logger.info(f"Webhook resolved transcript {transcript_id} with status {status}")
+        return True
+    
+    def discard(self, transcript_id: str) -> None:
+        """Forget a transcript id once its request has finished"""
+        future = self._waiters.pop(transcript_id, None)
+        if future is not None and not future.done():
+            future.cancel()
+    
+    def pending_count(self) -> int:
+        """Get the number of requests waiting for a callback"""
+        return len(self._waiters)
+
+
+# Global webhook service instance
+webhook_service = WebhookService()
@@ -8,7 +8,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.core.logging import setup_logging, get_logger
-from app.api import health, agent, legacy
+from app.api import health, agent, legacy, batch, webhooks
 
 # Setup logging
 setup_logging()
@@ -45,6 +45,8 @@ templates = Jinja2Templates(directory="templates")
 app.include_router(health.router)
 app.include_router(agent.router)
 app.include_router(legacy.router)
+app.include_router(batch.router)
+app.include_router(webhooks.router)
 
 logger.info("Voice Agent API initialized successfully")
 
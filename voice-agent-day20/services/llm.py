@@ -7,7 +7,11 @@ import asyncio
 import re
 import logging
 import os
-from typing import List, Dict, Any, Tuple
+import time
+from collections import OrderedDict
+from typing import List, Dict, Any, Tuple, Callable, Optional
+
+import config
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -23,12 +27,88 @@ else:
 if not MURF_API_KEY:
     print("Warning: MURF_API_KEY not found in .env file.")
 
-def get_llm_response(user_query: str, history: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
-    """Gets a response from the Gemini LLM and updates chat history."""
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    chat = model.start_chat(history=history)
-    response = chat.send_message(user_query)
-    return response.text, chat.history
+class ChatSessionCache:
+    """
+    Live Gemini ChatSessions by session id, so a turn doesn't rebuild the whole
+    history with start_chat().
+
+    A turn checks its session out and checks it back in when the reply is
+    complete; a session that is checked out (a concurrent or speculative turn)
+    or whose history no longer matches the caller's is rebuilt from the caller's
+    history. Least recently used sessions are evicted past `max_sessions` or
+    `max_chars` of history text, and any session idle for `ttl` seconds.
+    """
+
+    def __init__(self, max_sessions: int = 256, ttl: float = 900.0, max_chars: int = 4_000_000):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.max_chars = max_chars
+        # session id -> (chat, history chars, last used)
+        self._sessions: "OrderedDict[str, Tuple[Any, int, float]]" = OrderedDict()
+        self._chars = 0
+
+    @staticmethod
+    def _history_chars(history) -> int:
+        return sum(len(getattr(part, "text", "") or "") for content in history for part in content.parts)
+
+    def checkout(self, session_id: str, history: List[Any]):
+        """The live chat for `history`, or a new one started from it."""
+        self._expire()
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            chat, chars, _ = entry
+            self._chars -= chars
+            current = chat.history
+            # Same length and same last message object: the chat is exactly where the caller is
+            if len(current) == len(history) and (not history or current[-1] is history[-1]):
+                return chat
+        return genai.GenerativeModel('gemini-1.5-flash').start_chat(history=history)
+
+    def checkin(self, session_id: str, chat):
+        """Keep `chat` for the session's next turn."""
+        self.discard(session_id)
+        chars = self._history_chars(chat.history)
+        self._sessions[session_id] = (chat, chars, time.monotonic())
+        self._chars += chars
+        while self._sessions and (len(self._sessions) > self.max_sessions or self._chars > self.max_chars):
+            self._chars -= self._sessions.popitem(last=False)[1][1]
+
+    def discard(self, session_id: str):
+        entry = self._sessions.pop(session_id, None)
+        if entry is not None:
+            self._chars -= entry[1]
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.ttl
+        while self._sessions:
+            session_id, (_, chars, last_used) = next(iter(self._sessions.items()))
+            if last_used >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            self._chars -= chars
+
+
+chat_sessions = ChatSessionCache(
+    max_sessions=config.LLM_CHAT_CACHE_SIZE,
+    ttl=config.LLM_CHAT_CACHE_TTL,
+    max_chars=config.LLM_CHAT_CACHE_MAX_CHARS,
+)
+
+async def get_llm_response(user_query: str, history: List[Dict[str, Any]], session_id: Optional[str] = None) -> Tuple[str, List[Dict[str, Any]]]:
+    """Gets a response from the Gemini LLM and updates chat history.
+    With a session_id, the live chat is reused from chat_sessions between turns.
+    The request goes through the async client, so other sessions are served meanwhile;
+    it gives up after config.LLM_TIMEOUT seconds."""
+    if session_id is None:
+        chat = genai.GenerativeModel('gemini-1.5-flash').start_chat(history=history)
+        response = await asyncio.wait_for(chat.send_message_async(user_query), timeout=config.LLM_TIMEOUT)
+        return response.text, chat.history
+
+    chat = chat_sessions.checkout(session_id, history)
+    response = await asyncio.wait_for(chat.send_message_async(user_query), timeout=config.LLM_TIMEOUT)
+    chat_sessions.checkin(session_id, chat)
+    # A copy: the chat's own list keeps growing with later turns
+    return response.text, list(chat.history)
 
 async def receive_loop(ws):
     """Receive audio chunks from Murf WebSocket"""
@@ -78,10 +158,34 @@ def get_llm_streaming_response(user_query: str, history: List[Dict[str, Any]]) -
     
     return accumulated_response, chat.history
 
-async def get_llm_streaming_response_with_murf(user_query: str, history: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]], List[str]]:
+def _output_tokens(chunk, accumulated_response: str) -> int:
+    """Output tokens generated so far, estimated from the text if the chunk has no usage data."""
+    usage = getattr(chunk, "usage_metadata", None)
+    if usage is not None and usage.candidates_token_count:
+        return usage.candidates_token_count
+    return len(accumulated_response) // 4
+
+async def _pump_stream(chat, user_query: str, chunks: asyncio.Queue) -> None:
+    """Read the Gemini stream into `chunks`, then None. Cancelling this task cancels the gRPC call."""
+    try:
+        # Only ever suspended in the stream's read (the queue is unbounded), which is
+        # where grpc.aio cancels the underlying call when the task is cancelled
+        async for chunk in await chat.send_message_async(user_query, stream=True):
+            chunks.put_nowait(chunk)
+    finally:
+        chunks.put_nowait(None)
+
+async def get_llm_streaming_response_with_murf(
+    user_query: str,
+    history: List[Dict[str, Any]],
+    on_progress: Optional[Callable[[int], None]] = None,
+    session_id: Optional[str] = None,
+) -> Tuple[str, List[Dict[str, Any]], List[str]]:
     """
     Gets a streaming response from Gemini LLM, sends sentences to Murf via WebSocket,
     and returns the text response, updated history, and audio chunks.
+    `on_progress` is called with the output tokens generated so far after each chunk.
+    With a session_id, the live chat is reused from chat_sessions between turns.
     """
     if not GEMINI_API_KEY:
         raise ValueError("Gemini API key is missing.")
@@ -113,55 +217,75 @@ async def get_llm_streaming_response_with_murf(user_query: str, history: List[Di
             
             # Start the audio receiver task
             receiver_task = asyncio.create_task(receive_loop(ws))
+            gemini_task = None
+            try:
+                # Generate streaming response from Gemini. A task of our own reads the async
+                # stream, so Murf sends, the receiver task and other sessions all make
+                # progress while tokens arrive, and barge-in can cancel the read
+                if session_id is None:
+                    chat = genai.GenerativeModel('gemini-1.5-flash').start_chat(history=history)
+                else:
+                    chat = chat_sessions.checkout(session_id, history)
+                chunks: asyncio.Queue = asyncio.Queue()
+                gemini_task = asyncio.create_task(_pump_stream(chat, user_query, chunks))
             
-            # Generate streaming response from Gemini
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            chat = model.start_chat(history=history)
-            stream = chat.send_message(user_query, stream=True)
-            
-            sentence_buffer = ""
-            accumulated_response = ""
+                sentence_buffer = ""
+                accumulated_response = ""
             
-            print("\nGEMINI STREAMING RESPONSE \n")
-            for chunk in stream:
-                if chunk.text:
-                    accumulated_response += chunk.text
-                    sentence_buffer += chunk.text
-                    print(chunk.text, end="", flush=True)
-
-                    # Split into sentences using regex
-                    sentences = re.split(r'(?<=[.?!])\s+', sentence_buffer)
-
-                    if len(sentences) > 1:
-                        # Send complete sentences to Murf
-                        for sentence in sentences[:-1]:
-                            if sentence.strip():
-                                text_msg = {
-                                    "context_id": context_id,
-                                    "text": sentence.strip(),
-                                    "end": False
-                                }
-                                await ws.send(json.dumps(text_msg))
-                        sentence_buffer = sentences[-1]
-
-            # Send final sentence buffer if any
-            if sentence_buffer.strip():
-                text_msg = {
-                    "context_id": context_id,
-                    "text": sentence_buffer.strip(),
-                    "end": True
-                }
-                await ws.send(json.dumps(text_msg))
+                print("\nGEMINI STREAMING RESPONSE \n")
+                while (chunk := await chunks.get()) is not None:
+                    if chunk.text:
+                        accumulated_response += chunk.text
+                        sentence_buffer += chunk.text
+                        print(chunk.text, end="", flush=True)
+                        if on_progress is not None:
+                            on_progress(_output_tokens(chunk, accumulated_response))
+
+                        # Split into sentences using regex
+                        sentences = re.split(r'(?<=[.?!])\s+', sentence_buffer)
 
-            print("\nEND OF GEMINI STREAM\n")
+                        if len(sentences) > 1:
+                            # Send complete sentences to Murf
+                            for sentence in sentences[:-1]:
+                                if sentence.strip():
+                                    text_msg = {
+                                        "context_id": context_id,
+                                        "text": sentence.strip(),
+                                        "end": False
+                                    }
+                                    await ws.send(json.dumps(text_msg))
+                            sentence_buffer = sentences[-1]
 
-            # Wait for all audio chunks from Murf
-            audio_chunks = await receiver_task
+                # Send final sentence buffer if any
+                if sentence_buffer.strip():
+                    text_msg = {
+                        "context_id": context_id,
+                        "text": sentence_buffer.strip(),
+                        "end": True
+                    }
+                    await ws.send(json.dumps(text_msg))
 
-            if not accumulated_response:
-                raise ValueError("No response from Gemini LLM stream.")
+                # Raises whatever ended the Gemini stream early
+                await gemini_task
+                print("\nEND OF GEMINI STREAM\n")
 
-            return accumulated_response, chat.history, audio_chunks
+                # Wait for all audio chunks from Murf
+                audio_chunks = await receiver_task
+
+                if not accumulated_response:
+                    raise ValueError("No response from Gemini LLM stream.")
+
+                # Only a finished turn goes back; a cancelled one leaves the chat mid-exchange
+                if session_id is not None:
+                    chat_sessions.checkin(session_id, chat)
+                return accumulated_response, list(chat.history), audio_chunks
+            finally:
+                # Whatever ended the turn (barge-in, a Gemini error, an empty reply, Murf
+                # closing), neither upstream outlives it; leaving `async with` closes the Murf socket
+                tasks = [task for task in (receiver_task, gemini_task) if task is not None]
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
 
     except genai.types.generation_types.BlockedPromptException as e:
         logger.error(f"Gemini blocked prompt: {str(e)}")
@@ -174,4 +298,4 @@ async def get_llm_streaming_response_with_murf(user_query: str, history: List[Di
         raise
     except Exception as e:
         logger.error(f"Unexpected error: {str(e)}")
-        raise
\ No newline at end of file
+        raise
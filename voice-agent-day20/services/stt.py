@@ -1,13 +1,507 @@
 # services/stt.py
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Protocol, Set, Tuple
+from urllib.parse import urlencode
+
 import assemblyai as aai
 from fastapi import UploadFile
+from websockets.asyncio.client import connect as websocket_connect
+from websockets.exceptions import ConnectionClosed
+
+import config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TranscriptResult:
+    """A finished batch transcription."""
+    text: str
+    confidence: Optional[float] = None
+    duration: Optional[float] = None
+
+
+@dataclass
+class TranscriptEvent:
+    """One result from a streaming STT session."""
+    text: str = ""
+    end_of_turn: bool = False
+    is_formatted: bool = False
+    error: Optional[str] = None
+
+
+class STTStream(Protocol):
+    """A live transcription session: push PCM in, iterate TranscriptEvents out."""
+
+    async def send(self, pcm: bytes) -> None: ...
+
+    async def close(self) -> None: ...
+
+    def __aiter__(self) -> AsyncIterator[TranscriptEvent]: ...
+
+
+class STTProvider(Protocol):
+    """Async speech-to-text backend. Batch: submit() then result(). Live: stream()."""
+    name: str
+
+    async def submit(self, audio_bytes: bytes) -> str: ...
+
+    async def result(self, job_id: str) -> TranscriptResult: ...
+
+    async def stream(self, sample_rate: int = 16000) -> STTStream: ...
+
+    async def warm(self, sample_rate: int = 16000) -> None: ...
+
+    async def aclose(self) -> None: ...
+
+
+# Provider name -> factory; selected with STT_PROVIDER in config.py
+PROVIDERS: Dict[str, Callable[[], STTProvider]] = {}
+
+
+def register_provider(name: str):
+    """Class decorator that makes a provider selectable by name."""
+    def decorator(factory):
+        PROVIDERS[name] = factory
+        return factory
+    return decorator
+
+
+class _QueueStream:
+    """Shared plumbing: events go through an asyncio.Queue, None marks the end."""
+
+    def __init__(self):
+        self._events: asyncio.Queue = asyncio.Queue()
+
+    async def __aiter__(self) -> AsyncIterator[TranscriptEvent]:
+        while True:
+            event = await self._events.get()
+            if event is None:
+                return
+            yield event
+
+
+class PCMRingBuffer:
+    """
+    Fixed-capacity byte ring that re-frames PCM into `frame_bytes` frames.
+
+    The capacity is a whole number of frames and frames are always taken whole,
+    so a frame never wraps around the end of the ring: each one is handed out as
+    a memoryview into the ring without allocating. Writes copy into the ring in
+    at most two slices.
+    """
+
+    def __init__(self, frame_bytes: int, frames: int):
+        self.frame_bytes = frame_bytes
+        self._ring = bytearray(frame_bytes * frames)
+        self._view = memoryview(self._ring)
+        self._start = 0
+        self._size = 0
+
+    @property
+    def free(self) -> int:
+        return len(self._ring) - self._size
+
+    @property
+    def has_frame(self) -> bool:
+        return self._size >= self.frame_bytes
+
+    def write(self, data: memoryview) -> int:
+        """Copy as much of `data` as fits; returns the number of bytes written."""
+        data = data[:self.free]
+        end = (self._start + self._size) % len(self._ring)
+        first = min(len(data), len(self._ring) - end)
+        self._view[end:end + first] = data[:first]
+        self._view[:len(data) - first] = data[first:]
+        self._size += len(data)
+        return len(data)
+
+    def peek(self, partial: bool = False) -> memoryview:
+        """The next whole frame (or with `partial`, whatever is left) without consuming it."""
+        size = self.frame_bytes if self.has_frame else (self._size if partial else 0)
+        return self._view[self._start:self._start + size]
+
+    def consume(self, size: int):
+        self._start = (self._start + size) % len(self._ring)
+        self._size -= size
+
+
+class AssemblyAIStream(_QueueStream):
+    """
+    AssemblyAI v3 streaming session on an asyncio websocket.
+
+    Everything runs as tasks on the server's event loop, so sessions cost a
+    socket each rather than the SDK's reader and writer threads. Incoming audio
+    of any chunk size is copied into a PCMRingBuffer and the writer task sends
+    it on in fixed STT_FRAME_MS frames. When AssemblyAI reads slower than the
+    browser sends, the ring fills and send() waits instead of buffering
+    forever, which in turn stops /ws from reading more audio off the browser.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        frame_ms: int = config.STT_FRAME_MS,
+        buffer_frames: int = config.STT_SEND_BUFFER_FRAMES,
+    ):
+        super().__init__()
+        self.sample_rate = sample_rate
+        frame_bytes = sample_rate * 2 * frame_ms // 1000  # 16-bit mono PCM
+        self._buffer = PCMRingBuffer(frame_bytes, buffer_frames)
+        self._readable = asyncio.Event()
+        self._writable = asyncio.Event()
+        self._websocket = None
+        self._writer: Optional[asyncio.Task] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._closed = False
+
+    async def connect(self):
+        params = urlencode({
+            "sample_rate": self.sample_rate,
+            "format_turns": "true",
+            "enable_extra_session_information": "true",
+        })
+        self._websocket = await websocket_connect(
+            f"{config.ASSEMBLYAI_STREAMING_URL}?{params}",
+            additional_headers={"Authorization": config.ASSEMBLYAI_API_KEY},
+            open_timeout=15,
+        )
+        self._writer = asyncio.create_task(self._write())
+        self._reader = asyncio.create_task(self._read())
+
+    @property
+    def is_open(self) -> bool:
+        """Connected and not yet closed by either side."""
+        return self._reader is not None and not self._reader.done() and not self._closed
+
+    async def _write(self):
+        try:
+            while True:
+                await self._readable.wait()
+                while self._buffer.has_frame:
+                    # websockets copies the view into its frame before send() returns,
+                    # so the slot can be reused right after
+                    await self._websocket.send(self._buffer.peek())
+                    self._buffer.consume(self._buffer.frame_bytes)
+                    self._writable.set()
+                if self._closed:
+                    tail = self._buffer.peek(partial=True)
+                    if tail:
+                        await self._websocket.send(tail)
+                        self._buffer.consume(len(tail))
+                    # Ask for a clean Termination once the buffered audio is sent
+                    await self._websocket.send(json.dumps({"type": "Terminate"}))
+                    return
+                self._readable.clear()
+        except ConnectionClosed:
+            # The reader sees the same close and reports it
+            pass
+        finally:
+            # Don't leave send() waiting on a writer that is gone
+            self._writable.set()
+
+    async def _read(self):
+        try:
+            async for message in self._websocket:
+                data = json.loads(message)
+                if "error" in data:
+                    self._events.put_nowait(TranscriptEvent(error=data["error"]))
+                    continue
+                message_type = data.get("type")
+                if message_type == "Begin":
+                    logger.info(f"Transcription session started: {data.get('id')}")
+                elif message_type == "Turn":
+                    self._events.put_nowait(TranscriptEvent(
+                        text=data.get("transcript", ""),
+                        end_of_turn=data.get("end_of_turn", False),
+                        is_formatted=data.get("turn_is_formatted", False),
+                    ))
+                elif message_type == "Termination":
+                    logger.info(f"Session ended - {data.get('audio_duration_seconds', 0):.1f}s processed")
+                    break
+        except ConnectionClosed as e:
+            if e.rcvd is None or e.rcvd.code != 1000:
+                self._events.put_nowait(TranscriptEvent(error=f"Streaming connection closed: {e}"))
+        except json.JSONDecodeError as e:
+            self._events.put_nowait(TranscriptEvent(error=f"Bad message from streaming service: {e}"))
+        finally:
+            self._events.put_nowait(None)
+
+    async def send(self, pcm: bytes) -> None:
+        data = memoryview(pcm).cast("B")
+        while data and not (self._closed or self._writer.done()):
+            written = self._buffer.write(data)
+            data = data[written:]
+            if written:
+                self._readable.set()
+            if data:
+                # Ring is full: wait for the writer to free a frame; this is the backpressure
+                self._writable.clear()
+                await self._writable.wait()
+
+    async def close(self) -> None:
+        if self._closed:
+            return
+        self._closed = True
+        self._readable.set()
+        try:
+            # Let the last frames go out and the final turn and Termination arrive
+            await asyncio.wait_for(asyncio.shield(self._reader), timeout=config.STT_CLOSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Streaming session did not terminate in time; closing")
+        finally:
+            self._writer.cancel()
+            self._reader.cancel()
+            await self._websocket.close()
+
+
+class StreamPool:
+    """
+    Connected streaming sessions kept ready so a new /ws caller skips the handshake.
+
+    A background task keeps `size` idle sessions open. Sessions that are checked
+    out or drop are replaced right away; unused ones are renewed before they reach
+    `max_idle` seconds, since the provider closes idle sessions and a stale one
+    would fail on first use. When the pool is empty, acquire() connects directly,
+    as if there were no pool.
+    """
+
+    def __init__(self, connect: Callable[[], Awaitable[AssemblyAIStream]], size: int, max_idle: float,
+                 retry_seconds: float = 5.0):
+        self._connect = connect
+        self.size = size
+        self.max_idle = max_idle
+        self.retry_seconds = retry_seconds
+        self._idle: Deque[Tuple[float, AssemblyAIStream]] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._closing: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def start(self):
+        if self._task is None and self.size > 0:
+            self._task = asyncio.create_task(self._maintain())
+
+    async def acquire(self) -> AssemblyAIStream:
+        self.start()
+        now = time.monotonic()
+        while self._idle:
+            opened_at, stream = self._idle.popleft()
+            self._wakeup.set()
+            if stream.is_open and now - opened_at < self.max_idle:
+                self.hits += 1
+                return stream
+            self._discard(stream)
+        self.misses += 1
+        return await self._connect()
+
+    def _discard(self, stream: AssemblyAIStream):
+        # Closing waits for the provider's Termination; don't make anyone wait on it
+        task = asyncio.create_task(stream.close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _maintain(self):
+        while True:
+            self._wakeup.clear()
+            for entry in list(self._idle):
+                if not entry[1].is_open:
+                    self._idle.remove(entry)
+                    self._discard(entry[1])
+
+            # Replacements are connected before old sessions expire, so there's no gap
+            renew_after = self.max_idle * 0.8
+            now = time.monotonic()
+            expiring = [entry for entry in self._idle if now - entry[0] >= renew_after]
+            missing = self.size - len(self._idle) + len(expiring)
+            delay = None
+            if missing > 0:
+                results = await asyncio.gather(*(self._connect() for _ in range(missing)), return_exceptions=True)
+                fresh = [stream for stream in results if not isinstance(stream, BaseException)]
+                if len(fresh) < missing:
+                    logger.warning(f"Could not pre-connect {missing - len(fresh)} streaming session(s): "
+                                   f"{next(r for r in results if isinstance(r, BaseException))}")
+                    delay = self.retry_seconds
+                self._idle.extend((time.monotonic(), stream) for stream in fresh)
+                for entry in expiring[:len(fresh)]:
+                    if entry in self._idle:
+                        self._idle.remove(entry)
+                        self._discard(entry[1])
+
+            if delay is None:
+                delay = self._idle[0][0] + renew_after - time.monotonic() if self._idle else self.retry_seconds
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(delay, 0.05))
+            except asyncio.TimeoutError:
+                pass
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        while self._idle:
+            self._discard(self._idle.popleft()[1])
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+
+@register_provider("assemblyai")
+class AssemblyAIProvider:
+    name = "assemblyai"
+
+    def __init__(self):
+        # One pool of pre-connected sessions per sample rate
+        self._pools: Dict[int, StreamPool] = {}
+
+    async def submit(self, audio_bytes: bytes) -> str:
+        transcript = await asyncio.to_thread(aai.Transcriber().submit, audio_bytes)
+        return transcript.id
+
+    async def result(self, job_id: str) -> TranscriptResult:
+        while True:
+            # One status fetch; Transcript.get_by_id would block until completion
+            transcript = await asyncio.to_thread(aai.api.get_transcript, aai.Client.get_default().http_client, job_id)
+            if transcript.status == aai.TranscriptStatus.error:
+                raise Exception(f"Transcription failed: {transcript.error}")
+            if transcript.status == aai.TranscriptStatus.completed:
+                return TranscriptResult(
+                    text=transcript.text or "",
+                    confidence=transcript.confidence,
+                    duration=transcript.audio_duration,
+                )
+            await asyncio.sleep(aai.settings.polling_interval)
+
+    async def _connect(self, sample_rate: int) -> AssemblyAIStream:
+        stream = AssemblyAIStream(sample_rate)
+        await stream.connect()
+        return stream
+
+    def _pool(self, sample_rate: int) -> StreamPool:
+        if sample_rate not in self._pools:
+            self._pools[sample_rate] = StreamPool(
+                lambda: self._connect(sample_rate),
+                size=config.STT_POOL_SIZE,
+                max_idle=config.STT_POOL_MAX_IDLE,
+            )
+        return self._pools[sample_rate]
+
+    async def stream(self, sample_rate: int = 16000) -> STTStream:
+        return await self._pool(sample_rate).acquire()
+
+    async def warm(self, sample_rate: int = 16000) -> None:
+        """Start filling the session pool ahead of the first caller."""
+        self._pool(sample_rate).start()
+
+    async def aclose(self) -> None:
+        for pool in self._pools.values():
+            await pool.aclose()
+
+
+class StubStream(_QueueStream):
+    """
+    Deterministic stand-in for a live session. Emits a partial every
+    `partial_seconds` of received audio and an end-of-turn every `turn_seconds`,
+    each delivered `latency` seconds after the audio that triggered it.
+    "{turn}" in the text is replaced by the turn number so turns stay distinct.
+    """
+
+    def __init__(self, sample_rate: int, text: str, latency: float, turn_seconds: float, partial_seconds: float):
+        super().__init__()
+        self.text = text
+        self.latency = latency
+        bytes_per_second = sample_rate * 2  # 16-bit mono PCM
+        self._turn_bytes = max(1, int(turn_seconds * bytes_per_second))
+        self._partial_bytes = max(1, int(partial_seconds * bytes_per_second))
+        self._received = 0
+        self._turn = 1
+        self._closed = False
+
+    def _emit(self, event: Optional[TranscriptEvent]):
+        asyncio.get_running_loop().call_later(self.latency, self._events.put_nowait, event)
+
+    async def send(self, pcm: bytes) -> None:
+        if self._closed:
+            return
+        start = self._received
+        self._received += len(pcm)
+        for mark in range(start // self._partial_bytes + 1, self._received // self._partial_bytes + 1):
+            text = self.text.replace("{turn}", str(self._turn))
+            words = text.split()
+            position = mark * self._partial_bytes % self._turn_bytes
+            if position < self._partial_bytes:
+                self._emit(TranscriptEvent(text=text, end_of_turn=True, is_formatted=True))
+                self._turn += 1
+            else:
+                shown = max(1, len(words) * position // self._turn_bytes)
+                self._emit(TranscriptEvent(text=" ".join(words[:shown]).lower()))
+
+    async def close(self) -> None:
+        if not self._closed:
+            self._closed = True
+            self._emit(None)
+
+
+@register_provider("stub")
+class StubProvider:
+    """Offline provider for load tests: fixed text after a fixed latency, no network."""
+    name = "stub"
+
+    def __init__(self):
+        self.text = config.STT_STUB_TEXT
+        self.latency = config.STT_STUB_LATENCY
+        self.turn_seconds = config.STT_STUB_TURN_SECONDS
+        self.partial_seconds = config.STT_STUB_PARTIAL_SECONDS
+
+    async def submit(self, audio_bytes: bytes) -> str:
+        # Same audio, same job id
+        return hashlib.blake2b(audio_bytes, digest_size=8).hexdigest()
+
+    async def result(self, job_id: str) -> TranscriptResult:
+        await asyncio.sleep(self.latency)
+        return TranscriptResult(text=self.text.replace("{turn}", "1"))
+
+    async def stream(self, sample_rate: int = 16000) -> STTStream:
+        return StubStream(sample_rate, self.text, self.latency, self.turn_seconds, self.partial_seconds)
+
+    async def warm(self, sample_rate: int = 16000) -> None:
+        pass
+
+    async def aclose(self) -> None:
+        pass
+
+
+_provider: Optional[STTProvider] = None
+
+
+def get_provider() -> STTProvider:
+    """Returns the provider selected by config.STT_PROVIDER."""
+    global _provider
+    if _provider is None:
+        if config.STT_PROVIDER not in PROVIDERS:
+            raise Exception(f"Unknown STT provider '{config.STT_PROVIDER}'. Available: {', '.join(PROVIDERS)}")
+        _provider = PROVIDERS[config.STT_PROVIDER]()
+    return _provider
+
+
+def is_configured() -> bool:
+    """True when the selected provider has what it needs to run."""
+    return config.STT_PROVIDER != "assemblyai" or bool(config.ASSEMBLYAI_API_KEY)
+
 
-def transcribe_audio(audio_file: UploadFile) -> str:
-    """Transcribes audio to text using AssemblyAI."""
-    transcriber = aai.Transcriber()
-    transcript = transcriber.transcribe(audio_file.file)
+async def transcribe_audio(audio_file: UploadFile) -> str:
+    """Transcribes audio to text using the configured STT provider."""
+    provider = get_provider()
+    job_id = await provider.submit(await audio_file.read())
+    text = (await provider.result(job_id)).text
 
-    if transcript.status == aai.TranscriptStatus.error or not transcript.text:
-        raise Exception(f"Transcription failed: {transcript.error or 'No speech detected'}")
+    if not text:
+        raise Exception("Transcription failed: No speech detected")
 
-    return transcript.text
\ No newline at end of file
+    return text
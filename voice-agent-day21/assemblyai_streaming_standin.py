@@ -0,0 +1,101 @@
+"""
+Local stand-in for the AssemblyAI v3 streaming API, for testing /ws offline.
+
+Run it next to the agent and point the agent at it:
+
+    uvicorn assemblyai_streaming_standin:app --port 8002
+    ASSEMBLYAI_STREAMING_URL=ws://127.0.0.1:8002/v3/ws
+
+It speaks the same messages as the real service: Begin on connect, Turn events
+as audio arrives (a partial every STANDIN_PARTIAL_SECONDS of audio, an
+end-of-turn every STANDIN_TURN_SECONDS) and Termination after a Terminate
+message. The last STANDIN_ENDPOINT_SECONDS of each turn play the part of the
+silence before the end of turn is detected: partials there show the whole text. STANDIN_CONNECT_DELAY adds handshake latency so the session pool's
+effect is measurable; sessions that receive no audio for STANDIN_IDLE_TIMEOUT
+seconds are closed, like the real service does.
+"""
+import asyncio
+import json
+import os
+from uuid import uuid4
+
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+STANDIN_CONNECT_DELAY = float(os.getenv("STANDIN_CONNECT_DELAY", "0.3"))
+STANDIN_IDLE_TIMEOUT = float(os.getenv("STANDIN_IDLE_TIMEOUT", "60"))
+STANDIN_TURN_SECONDS = float(os.getenv("STANDIN_TURN_SECONDS", "3.0"))
+STANDIN_PARTIAL_SECONDS = float(os.getenv("STANDIN_PARTIAL_SECONDS", "0.5"))
+STANDIN_ENDPOINT_SECONDS = float(os.getenv("STANDIN_ENDPOINT_SECONDS", "0.5"))
+STANDIN_TEXT = os.getenv("STANDIN_TEXT", "This is streamed turn number {turn}.")
+
+app = FastAPI(title="AssemblyAI streaming stand-in")
+
+stats = {"sessions": 0, "active": 0}
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+@app.websocket("/v3/ws")
+async def stream(websocket: WebSocket, sample_rate: int = 16000):
+    if not websocket.headers.get("authorization"):
+        await websocket.close(code=1008, reason="Missing Authorization header")
+        return
+    await asyncio.sleep(STANDIN_CONNECT_DELAY)
+    await websocket.accept()
+    stats["sessions"] += 1
+    stats["active"] += 1
+    await websocket.send_text(json.dumps({"type": "Begin", "id": uuid4().hex, "expires_at": 0}))
+
+    bytes_per_second = sample_rate * 2
+    received = 0
+    turn = 1
+    try:
+        while True:
+            try:
+                message = await asyncio.wait_for(websocket.receive(), timeout=STANDIN_IDLE_TIMEOUT)
+            except asyncio.TimeoutError:
+                await websocket.close(code=1000, reason="Session idle for too long")
+                return
+            if message["type"] == "websocket.disconnect":
+                return
+
+            if message.get("text"):
+                if json.loads(message["text"]).get("type") == "Terminate":
+                    await websocket.send_text(json.dumps({
+                        "type": "Termination",
+                        "audio_duration_seconds": received / bytes_per_second,
+                        "session_duration_seconds": received / bytes_per_second,
+                    }))
+                    await websocket.close()
+                    return
+                continue
+
+            start = received
+            received += len(message.get("bytes") or b"")
+            partial_bytes = int(STANDIN_PARTIAL_SECONDS * bytes_per_second)
+            turn_bytes = int(STANDIN_TURN_SECONDS * bytes_per_second)
+            speech_bytes = max(1, turn_bytes - int(STANDIN_ENDPOINT_SECONDS * bytes_per_second))
+            for mark in range(start // partial_bytes + 1, received // partial_bytes + 1):
+                text = STANDIN_TEXT.replace("{turn}", str(turn))
+                position = mark * partial_bytes % turn_bytes
+                end_of_turn = position < partial_bytes
+                if not end_of_turn:
+                    words = text.split()
+                    shown = min(len(words), max(1, len(words) * position // speech_bytes))
+                    text = " ".join(words[:shown]).lower()
+                await websocket.send_text(json.dumps({
+                    "type": "Turn",
+                    "turn_order": turn,
+                    "transcript": text,
+                    "end_of_turn": end_of_turn,
+                    "turn_is_formatted": end_of_turn,
+                }))
+                if end_of_turn:
+                    turn += 1
+    except WebSocketDisconnect:
+        pass
+    finally:
+        stats["active"] -= 1
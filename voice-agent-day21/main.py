@@ -3,33 +3,19 @@ from fastapi import FastAPI, Request, UploadFile, File, Path, WebSocket, WebSock
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from typing import Dict, List, Any, Type
+from typing import Dict, List, Any
 import logging
 from pathlib import Path as PathLib
 from uuid import uuid4
 import json
 import asyncio
 import time
-import threading
 
 # Import the config file FIRST to load dotenv and configure APIs
 import config
-from services import stt, llm, tts
+from services import speculation, stt, llm, tts
 from schemas import TTSRequest
 
-# AssemblyAI streaming imports
-import assemblyai as aai
-from assemblyai.streaming.v3 import (
-    BeginEvent,
-    StreamingClient,
-    StreamingClientOptions,
-    StreamingError,
-    StreamingEvents,
-    StreamingParameters,
-    TerminationEvent,
-    TurnEvent,
-)
-
 # Configure logging - Set to WARNING to reduce clutter
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -48,6 +34,20 @@ UPLOADS_DIR = BASE_DIR / "uploads"
 UPLOADS_DIR.mkdir(exist_ok=True)
 
 
+@app.on_event("startup")
+async def warm_stt_streams():
+    """Opens streaming STT sessions ahead of the first /ws caller."""
+    if stt.is_configured():
+        await stt.get_provider().warm(sample_rate=16000)
+
+
+@app.on_event("shutdown")
+async def close_stt_streams():
+    """Closes pooled streaming STT sessions."""
+    if stt.is_configured():
+        await stt.get_provider().aclose()
+
+
 @app.get("/")
 async def home(request: Request):
     """Serves the main HTML page."""
@@ -66,18 +66,18 @@ async def agent_chat(
     fallback_audio_path = "static/fallback.mp3"
 
     # Check for keys by importing them from the config module
-    if not all([config.GEMINI_API_KEY, config.ASSEMBLYAI_API_KEY, config.MURF_API_KEY]):
+    if not all([config.GEMINI_API_KEY, config.MURF_API_KEY]) or not stt.is_configured():
         print("API keys not configured. Returning fallback audio.")
         return FileResponse(fallback_audio_path, media_type="audio/mpeg", headers={"X-Error": "true"})
 
     try:
         # Step 1: Transcribe audio to text
-        user_query_text = stt.transcribe_audio(audio_file)
+        user_query_text = await stt.transcribe_audio(audio_file)
         print(f"User: {user_query_text}")
 
         # Step 2: Retrieve history and get a response from the LLM
         session_history = chat_histories.get(session_id, [])
-        llm_response_text, updated_history = llm.get_llm_response(user_query_text, session_history)
+        llm_response_text, updated_history = await llm.get_llm_response(user_query_text, session_history, session_id=session_id)
         print(f"Assistant: {llm_response_text}")
 
         # Step 3: Update the chat history
@@ -119,15 +119,21 @@ async def get_voices():
         return JSONResponse(status_code=500, content={"error": f"Failed to fetch voices: {e}"})
 
 
+@app.get("/stats/speculation")
+async def get_speculation_stats():
+    """Speculative LLM hits, misses and output tokens spent on discarded responses"""
+    return speculation.stats.as_dict()
+
+
 @app.websocket("/ws")
 async def websocket_audio_streaming(websocket: WebSocket):
-    """Receive PCM audio chunks from client and transcribe in real-time using AssemblyAI with turn detection."""
+    """Receive PCM audio chunks from client and transcribe in real-time using the STT provider with turn detection."""
     await websocket.accept()
     file_id = uuid4().hex
     file_path = UPLOADS_DIR / f"streamed_{file_id}.pcm"
 
-    # Check if AssemblyAI API key is configured
-    if not config.ASSEMBLYAI_API_KEY:
+    # Check if the STT provider is configured (the stub needs no key)
+    if not stt.is_configured():
         await websocket.send_text(json.dumps({
             "type": "error",
             "message": "AssemblyAI API key not configured"
@@ -155,6 +161,11 @@ async def websocket_audio_streaming(websocket: WebSocket):
 
     # Create a queue for transcription messages
     transcription_queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+
+    def publish(message: dict):
+        """Queue a message for the client; safe to call from any thread"""
+        loop.call_soon_threadsafe(transcription_queue.put_nowait, message)
     
     # Session history for WebSocket connection
     session_history = []
@@ -163,49 +174,66 @@ async def websocket_audio_streaming(websocket: WebSocket):
     processed_turns = set()
     last_turn_time = 0
 
-    # Initialize AssemblyAI StreamingClient
-    client = StreamingClient(
-        StreamingClientOptions(
-            api_key=config.ASSEMBLYAI_API_KEY,
-            api_host="streaming.assemblyai.com",
+    # Key for this connection's live chat in llm.chat_sessions
+    chat_session_id = f"ws-{uuid4().hex}"
+
+    # The turn's LLM/Murf responses that are still being produced
+    response_tasks = set()
+
+    def run_llm_with_murf(transcript_text: str, history: list, on_progress=None) -> asyncio.Task:
+        """Run the LLM/Murf pipeline as a task on this loop, owned by this connection"""
+        return asyncio.create_task(llm.get_llm_streaming_response_with_murf(
+            transcript_text, history, on_progress, session_id=chat_session_id
+        ))
+
+    # Starts the response from a stable partial transcript; the history length
+    # identifies the history it was started with, so replies in between invalidate it
+    speculator = None
+    if config.LLM_SPECULATION:
+        speculator = speculation.Speculator(
+            lambda text, report: run_llm_with_murf(text, list(session_history), report),
+            stable_after=config.LLM_SPECULATION_STABLE_MS / 1000,
         )
-    )
 
-    # Define async function to process LLM with Murf integration
-    async def process_llm_with_murf_async(transcript_text: str):
-        """Process LLM streaming response with Murf integration"""
+    async def finish_response(response: asyncio.Future):
+        """Wait for the turn's LLM/Murf response and add it to the session history"""
         nonlocal session_history
         try:
-            llm_response_text, updated_history, audio_chunks = await llm.get_llm_streaming_response_with_murf(transcript_text, session_history)
+            llm_response_text, updated_history, audio_chunks = await response
             session_history = updated_history
+            publish({
+                "type": "llm_response",
+                "text": llm_response_text
+            })
             print()  # New line after streaming response
             print(f"\nReceived {len(audio_chunks)} audio chunks from Murf")
+        except asyncio.CancelledError:
+            # The pipeline task is shared with the speculator, so cancel it explicitly
+            response.cancel()
+            print("\nResponse cancelled")
+            raise
         except Exception as e:
             print(f"\nError in LLM/Murf integration: {e}")
 
-    def process_llm_with_murf_sync(transcript_text: str):
-        """Synchronous wrapper that runs async function in new event loop"""
-        def run_in_thread():
-            new_loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(new_loop)
-            try:
-                new_loop.run_until_complete(process_llm_with_murf_async(transcript_text))
-            except Exception as e:
-                print(f"\nError in thread: {e}")
-            finally:
-                new_loop.close()
-        
-        thread = threading.Thread(target=run_in_thread)
-        thread.daemon = True
-        thread.start()
+    def respond(transcript_text: str):
+        """Use the speculative response if it was started from this transcript, else start one"""
+        if speculator is not None:
+            response = speculator.final(transcript_text, len(session_history))
+        else:
+            response = run_llm_with_murf(transcript_text, list(session_history))
+        task = asyncio.create_task(finish_response(response))
+        response_tasks.add(task)
+        task.add_done_callback(response_tasks.discard)
 
     # Define event handlers
-    def on_begin(self: Type[StreamingClient], event: BeginEvent):
-        print("Transcription session started")
-
-    def on_turn(self: Type[StreamingClient], event: TurnEvent):
+    def on_turn(event: stt.TranscriptEvent):
         nonlocal processed_turns, last_turn_time
-        transcript_text = event.transcript.strip()
+        if not event.end_of_turn:
+            if speculator is not None:
+                speculator.partial(event.text, len(session_history))
+            return
+
+        transcript_text = event.text.strip()
         current_time = time.time()
         
         # Normalize transcript for duplicate detection (lowercase, remove extra spaces)
@@ -223,72 +251,63 @@ async def websocket_audio_streaming(websocket: WebSocket):
             print(f"\nUser: {transcript_text}")
             
             # Put final transcription in queue for async sending
-            try:
-                transcription_queue.put_nowait({
-                    "type": "transcription",
-                    "text": transcript_text,
-                    "is_final": True,
-                    "end_of_turn": True
-                })
-                
-                # Send explicit end-of-turn notification
-                transcription_queue.put_nowait({
-                    "type": "turn_end",
-                    "message": "User stopped talking"
-                })
-                
-                # Process LLM streaming response with Murf integration
-                print("Assistant: ", end="", flush=True)
-                process_llm_with_murf_sync(transcript_text)
-                
-            except asyncio.QueueFull:
-                print("Transcription queue is full")
+            publish({
+                "type": "transcription",
+                "text": transcript_text,
+                "is_final": True,
+                "end_of_turn": True
+            })
+            
+            # Send explicit end-of-turn notification
+            publish({
+                "type": "turn_end",
+                "message": "User stopped talking"
+            })
+            
+            # Process LLM streaming response with Murf integration
+            print("Assistant: ", end="", flush=True)
+            respond(transcript_text)
 
-    def on_terminated(self: Type[StreamingClient], event: TerminationEvent):
-        print(f"Session ended - {event.audio_duration_seconds:.1f}s processed")
+        elif speculator is not None:
+            # Ignored turn; nothing will use a response started for it
+            speculator.cancel()
 
-    def on_error(self: Type[StreamingClient], error: StreamingError):
+    def on_error(error: str):
         print(f"Transcription error: {error}")
-        try:
-            transcription_queue.put_nowait({
-                "type": "error",
-                "message": f"Transcription error: {error}"
-            })
-        except asyncio.QueueFull:
-            pass
+        publish({
+            "type": "error",
+            "message": f"Transcription error: {error}"
+        })
 
-    # Register event handlers
-    client.on(StreamingEvents.Begin, on_begin)
-    client.on(StreamingEvents.Turn, on_turn)
-    client.on(StreamingEvents.Termination, on_terminated)
-    client.on(StreamingEvents.Error, on_error)
+    # Task to dispatch transcript events from the STT stream
+    async def receive_transcripts():
+        async for event in stream:
+            if event.error:
+                on_error(event.error)
+            else:
+                on_turn(event)
 
     # Task to send transcription messages to client
     async def send_transcriptions():
         while True:
+            # Sleeps until something is published; no periodic wake-ups while idle
+            message = await transcription_queue.get()
             try:
-                message = await asyncio.wait_for(transcription_queue.get(), timeout=0.1)
                 await websocket.send_text(json.dumps(message))
-                transcription_queue.task_done()
-            except asyncio.TimeoutError:
-                continue
             except Exception:
                 break
 
     # Start the transcription sender task
     sender_task = asyncio.create_task(send_transcriptions())
+    stream = None
+    receiver_task = None
 
-    # Connect to AssemblyAI streaming service
+    # Connect to the streaming STT service
     try:
-        client.connect(
-            StreamingParameters(
-                sample_rate=16000,
-                format_turns=True,
-                enable_extra_session_information=True,
-            )
-        )
+        stream = await stt.get_provider().stream(sample_rate=16000)
+        receiver_task = asyncio.create_task(receive_transcripts())
         
-        print("Connected to AssemblyAI streaming service")
+        print("Connected to streaming STT service")
         await websocket.send_text(json.dumps({
             "type": "status",
             "message": "Connected to transcription service with turn detection"
@@ -302,7 +321,7 @@ async def websocket_audio_streaming(websocket: WebSocket):
                 if "bytes" in message:
                     pcm_data = message["bytes"]
                     f.write(pcm_data)  # Save to file for debugging
-                    client.stream(pcm_data)  # Send to AssemblyAI for transcription
+                    await stream.send(pcm_data)  # Send to the STT provider for transcription
                     
                 elif message.get("text") == "EOF":
                     print("Recording finished")
@@ -313,14 +332,23 @@ async def websocket_audio_streaming(websocket: WebSocket):
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
     finally:
-        # Cancel the sender task
+        # Cancel the sender task and any speculative response
         sender_task.cancel()
+        if speculator is not None:
+            speculator.cancel()
+        # Nobody is left to hear the reply
+        for task in list(response_tasks):
+            task.cancel()
+        llm.chat_sessions.discard(chat_session_id)
         
-        # Clean up AssemblyAI connection
-        try:
-            client.disconnect(terminate=True)
-        except Exception as e:
-            print(f"Error disconnecting: {e}")
+        # Clean up the STT connection
+        if stream is not None:
+            try:
+                await stream.close()
+            except Exception as e:
+                print(f"Error disconnecting: {e}")
+        if receiver_task is not None:
+            receiver_task.cancel()
         
         # Close WebSocket connection
         try:
@@ -65,7 +65,7 @@ document.addEventListener("DOMContentLoaded", async () => {
                     source = audioContext.createMediaStreamSource(stream);
                     
                     // Create ScriptProcessorNode for processing audio chunks
-                    processor = audioContext.createScriptProcessor(4096, 1, 1); // Mono, 4096 buffer size
+                    processor = audioContext.createScriptProcessor(1024, 1, 1); // Mono, 64 ms at 16 kHz; the server re-frames it
 
                     processor.onaudioprocess = (event) => {
                         const inputData = event.inputBuffer.getChannelData(0);
@@ -143,6 +143,9 @@ document.addEventListener("DOMContentLoaded", async () => {
                             currentTranscript.classList.remove("final-transcript");
                         }, 2000);
                         
+                    } else if (data.type === "llm_response") {
+                        addToTranscriptionHistory(data.text, "assistant");
+
                     } else if (data.type === "error") {
                         console.error("Transcription error:", data.message);
                         statusDisplay.textContent = `Error: ${data.message}`;
@@ -175,11 +178,11 @@ document.addEventListener("DOMContentLoaded", async () => {
         }
     };
 
-    const addToTranscriptionHistory = (text) => {
+    const addToTranscriptionHistory = (text, role = "user") => {
         if (!transcriptionHistory) return;
         
         const historyItem = document.createElement("div");
-        historyItem.className = "transcription-history-item";
+        historyItem.className = role === "assistant" ? "transcription-history-item assistant" : "transcription-history-item";
         historyItem.innerHTML = `
             <div class="history-timestamp">${new Date().toLocaleTimeString()}</div>
             <div class="history-text">${text}</div>
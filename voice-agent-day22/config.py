@@ -25,4 +25,57 @@ else:
     logging.warning("GEMINI_API_KEY not found in .env file.")
 
 if not MURF_API_KEY:
-    logging.warning("MURF_API_KEY not found in .env file.")
\ No newline at end of file
+    logging.warning("MURF_API_KEY not found in .env file.")
+
+# Speech-to-text provider: "assemblyai", or "stub" for offline load tests
+STT_PROVIDER = os.getenv("STT_PROVIDER", "assemblyai")
+STT_STUB_TEXT = os.getenv("STT_STUB_TEXT", "This is test question number {turn}.")
+STT_STUB_LATENCY = float(os.getenv("STT_STUB_LATENCY", "0.3"))
+STT_STUB_TURN_SECONDS = float(os.getenv("STT_STUB_TURN_SECONDS", "3.0"))
+STT_STUB_PARTIAL_SECONDS = float(os.getenv("STT_STUB_PARTIAL_SECONDS", "0.5"))
+
+# Streaming STT runs on an asyncio websocket per session
+ASSEMBLYAI_STREAMING_URL = os.getenv("ASSEMBLYAI_STREAMING_URL", "wss://streaming.assemblyai.com/v3/ws")
+# Browser audio is re-framed into frames this long (20-50 ms) before it goes upstream.
+# AssemblyAI v3 rejects frames under 50 ms; shorter ones are for other endpoints.
+STT_FRAME_MS = min(max(int(os.getenv("STT_FRAME_MS", "50")), 20), 50)
+# Frames buffered per session before send() waits for the socket to drain
+STT_SEND_BUFFER_FRAMES = int(os.getenv("STT_SEND_BUFFER_FRAMES", "64"))
+# Connected sessions kept ready for new /ws callers; opt-in, 0 disables the pool.
+# Streaming is billed by session time, so each pooled session costs as much as
+# a live call around the clock (it is replaced every STT_POOL_MAX_IDLE seconds)
+# and counts against the account's concurrent-session limit.
+STT_POOL_SIZE = int(os.getenv("STT_POOL_SIZE", "0"))
+# Pooled sessions unused this long are replaced before the provider drops them
+STT_POOL_MAX_IDLE = float(os.getenv("STT_POOL_MAX_IDLE", "30"))
+STT_CLOSE_TIMEOUT = float(os.getenv("STT_CLOSE_TIMEOUT", "5.0"))
+
+# Live captions: partial transcripts are sent to /ws clients as they arrive, at most
+# one per STT_PARTIAL_DEBOUNCE_MS and only when at least STT_PARTIAL_MIN_DELTA characters changed
+STT_INTERIM_RESULTS = os.getenv("STT_INTERIM_RESULTS", "true").lower() in ("1", "true", "yes")
+STT_PARTIAL_DEBOUNCE_MS = int(os.getenv("STT_PARTIAL_DEBOUNCE_MS", "150"))
+STT_PARTIAL_MIN_DELTA = int(os.getenv("STT_PARTIAL_MIN_DELTA", "2"))
+
+# Streaming STT sessions run at this rate; /ws audio in any other format is converted to it
+STT_SAMPLE_RATE = int(os.getenv("STT_SAMPLE_RATE", "16000"))
+
+# Speculative LLM: start the response once a partial transcript has been stable this long,
+# keep it if the final transcript matches, otherwise cancel it and start over
+LLM_SPECULATION = os.getenv("LLM_SPECULATION", "true").lower() in ("1", "true", "yes")
+LLM_SPECULATION_STABLE_MS = int(os.getenv("LLM_SPECULATION_STABLE_MS", "400"))
+
+# Local end-of-speech detection on /ws audio. It decides which end-of-turn events
+# start a reply (only after new speech), and with VAD_ENDPOINTING it ends the turn
+# itself after VAD_ENDPOINT_SILENCE_MS of silence instead of waiting for the STT
+VAD_ENDPOINTING = os.getenv("VAD_ENDPOINTING", "true").lower() in ("1", "true", "yes")
+VAD_ENDPOINT_SILENCE_MS = int(os.getenv("VAD_ENDPOINT_SILENCE_MS", "700"))
+VAD_MIN_SPEECH_MS = int(os.getenv("VAD_MIN_SPEECH_MS", "200"))
+
+# Live Gemini chat sessions kept between turns (least recently used go first),
+# dropped after LLM_CHAT_CACHE_TTL idle seconds or past LLM_CHAT_CACHE_MAX_CHARS of history
+LLM_CHAT_CACHE_SIZE = int(os.getenv("LLM_CHAT_CACHE_SIZE", "256"))
+LLM_CHAT_CACHE_TTL = float(os.getenv("LLM_CHAT_CACHE_TTL", "900"))
+LLM_CHAT_CACHE_MAX_CHARS = int(os.getenv("LLM_CHAT_CACHE_MAX_CHARS", "4000000"))
+
+# Longest wait for one non-streaming Gemini reply before the turn fails
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))
@@ -3,33 +3,19 @@ from fastapi import FastAPI, Request, UploadFile, File, Path, WebSocket, WebSock
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from typing import Dict, List, Any, Type
+from typing import Dict, List, Any
 import logging
 from pathlib import Path as PathLib
 from uuid import uuid4
 import json
 import asyncio
 import time
-import threading
 
 # Import the config file FIRST to load dotenv and configure APIs
 import config
-from services import stt, llm, tts
+from services import audio, captions, speculation, stt, llm, tts
 from schemas import TTSRequest
 
-# AssemblyAI streaming imports
-import assemblyai as aai
-from assemblyai.streaming.v3 import (
-    BeginEvent,
-    StreamingClient,
-    StreamingClientOptions,
-    StreamingError,
-    StreamingEvents,
-    StreamingParameters,
-    TerminationEvent,
-    TurnEvent,
-)
-
 # Configure logging - Set to WARNING to reduce clutter
 logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -48,6 +34,20 @@ UPLOADS_DIR = BASE_DIR / "uploads"
 UPLOADS_DIR.mkdir(exist_ok=True)
 
 
+@app.on_event("startup")
+async def warm_stt_streams():
+    """Opens streaming STT sessions ahead of the first /ws caller."""
+    if stt.is_configured():
+        await stt.get_provider().warm(sample_rate=config.STT_SAMPLE_RATE)
+
+
+@app.on_event("shutdown")
+async def close_stt_streams():
+    """Closes pooled streaming STT sessions."""
+    if stt.is_configured():
+        await stt.get_provider().aclose()
+
+
 @app.get("/")
 async def home(request: Request):
     """Serves the main HTML page."""
@@ -66,18 +66,18 @@ async def agent_chat(
     fallback_audio_path = "static/fallback.mp3"
 
     # Check for keys by importing them from the config module
-    if not all([config.GEMINI_API_KEY, config.ASSEMBLYAI_API_KEY, config.MURF_API_KEY]):
+    if not all([config.GEMINI_API_KEY, config.MURF_API_KEY]) or not stt.is_configured():
         print("API keys not configured. Returning fallback audio.")
         return FileResponse(fallback_audio_path, media_type="audio/mpeg", headers={"X-Error": "true"})
 
     try:
         # Step 1: Transcribe audio to text
-        user_query_text = stt.transcribe_audio(audio_file)
+        user_query_text = await stt.transcribe_audio(audio_file)
         print(f"User: {user_query_text}")
 
         # Step 2: Retrieve history and get a response from the LLM
         session_history = chat_histories.get(session_id, [])
-        llm_response_text, updated_history = llm.get_llm_response(user_query_text, session_history)
+        llm_response_text, updated_history = await llm.get_llm_response(user_query_text, session_history, session_id=session_id)
         print(f"Assistant: {llm_response_text}")
 
         # Step 3: Update the chat history
@@ -119,15 +119,27 @@ async def get_voices():
         return JSONResponse(status_code=500, content={"error": f"Failed to fetch voices: {e}"})
 
 
+@app.get("/stats/speculation")
+async def get_speculation_stats():
+    """Speculative LLM hits, misses and output tokens spent on discarded responses"""
+    return speculation.stats.as_dict()
+
+
+@app.get("/stats/endpointing")
+async def get_endpointing_stats():
+    """End-of-speech to end-of-turn delay per turn, split by what ended the turn"""
+    return audio.endpoint_metrics.as_dict()
+
+
 @app.websocket("/ws")
 async def websocket_audio_streaming(websocket: WebSocket):
-    """Receive PCM audio chunks from client and transcribe in real-time using AssemblyAI with turn detection."""
+    """Receive PCM audio chunks from client and transcribe in real-time using the STT provider with turn detection."""
     await websocket.accept()
     file_id = uuid4().hex
     file_path = UPLOADS_DIR / f"streamed_{file_id}.pcm"
 
-    # Check if AssemblyAI API key is configured
-    if not config.ASSEMBLYAI_API_KEY:
+    # Check if the STT provider is configured (the stub needs no key)
+    if not stt.is_configured():
         await websocket.send_text(json.dumps({
             "type": "error",
             "message": "AssemblyAI API key not configured"
@@ -155,140 +167,194 @@ async def websocket_audio_streaming(websocket: WebSocket):
 
     # Create a queue for transcription messages
     transcription_queue = asyncio.Queue()
+    loop = asyncio.get_running_loop()
+
+    def publish(message: dict):
+        """Queue a message for the client; safe to call from any thread"""
+        loop.call_soon_threadsafe(transcription_queue.put_nowait, message)
     
     # Session history for WebSocket connection
     session_history = []
     
     # Track processed turns to prevent duplicates (normalize case and whitespace)
     processed_turns = set()
-    last_turn_time = 0
 
-    # Initialize AssemblyAI StreamingClient
-    client = StreamingClient(
-        StreamingClientOptions(
-            api_key=config.ASSEMBLYAI_API_KEY,
-            api_host="streaming.assemblyai.com",
-        )
+    # Local VAD over the incoming audio; a turn only counts if there was speech since the last one
+    endpointer = audio.EndpointDetector(
+        config.STT_SAMPLE_RATE,
+        silence_ms=config.VAD_ENDPOINT_SILENCE_MS,
+        min_speech_ms=config.VAD_MIN_SPEECH_MS,
     )
+    speech_frames_at_turn = 0
+    # endpointer.speech_frames when the VAD last forced an endpoint
+    forced_at_frames = -1
+
+    # Key for this connection's live chat in llm.chat_sessions
+    chat_session_id = f"ws-{uuid4().hex}"
+
+    # The turn's LLM/Murf responses that are still being produced; barge-in cancels them
+    response_tasks = set()
+
+    def run_llm_with_murf(transcript_text: str, history: list, on_progress=None) -> asyncio.Task:
+        """Run the LLM/Murf pipeline as a task on this loop, owned by this connection"""
+        return asyncio.create_task(llm.get_llm_streaming_response_with_murf(
+            transcript_text, history, on_progress, session_id=chat_session_id
+        ))
+
+    # Starts the response from a stable partial transcript; the history length
+    # identifies the history it was started with, so replies in between invalidate it
+    speculator = None
+    if config.LLM_SPECULATION:
+        speculator = speculation.Speculator(
+            lambda text, report: run_llm_with_murf(text, list(session_history), report),
+            stable_after=config.LLM_SPECULATION_STABLE_MS / 1000,
+        )
 
-    # Define async function to process LLM with Murf integration
-    async def process_llm_with_murf_async(transcript_text: str):
-        """Process LLM streaming response with Murf integration"""
+    async def finish_response(response: asyncio.Future):
+        """Wait for the turn's LLM/Murf response and add it to the session history"""
         nonlocal session_history
         try:
-            llm_response_text, updated_history, audio_chunks = await llm.get_llm_streaming_response_with_murf(transcript_text, session_history)
+            llm_response_text, updated_history, audio_chunks = await response
             session_history = updated_history
+            publish({
+                "type": "llm_response",
+                "text": llm_response_text
+            })
             print()  # New line after streaming response
             print(f"\nReceived {len(audio_chunks)} audio chunks from Murf")
+        except asyncio.CancelledError:
+            # The pipeline task is shared with the speculator, so cancel it explicitly
+            response.cancel()
+            print("\nResponse cancelled")
+            raise
         except Exception as e:
             print(f"\nError in LLM/Murf integration: {e}")
 
-    def process_llm_with_murf_sync(transcript_text: str):
-        """Synchronous wrapper that runs async function in new event loop"""
-        def run_in_thread():
-            new_loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(new_loop)
-            try:
-                new_loop.run_until_complete(process_llm_with_murf_async(transcript_text))
-            except Exception as e:
-                print(f"\nError in thread: {e}")
-            finally:
-                new_loop.close()
-        
-        thread = threading.Thread(target=run_in_thread)
-        thread.daemon = True
-        thread.start()
+    def barge_in():
+        """The user is talking again: drop the reply in progress (Murf audio stays server-side, so there's no playback to stop)"""
+        for task in list(response_tasks):
+            task.cancel()
 
-    # Define event handlers
-    def on_begin(self: Type[StreamingClient], event: BeginEvent):
-        print("Transcription session started")
+    def respond(transcript_text: str):
+        """Use the speculative response if it was started from this transcript, else start one"""
+        if speculator is not None:
+            response = speculator.final(transcript_text, len(session_history))
+        else:
+            response = run_llm_with_murf(transcript_text, list(session_history))
+        task = asyncio.create_task(finish_response(response))
+        response_tasks.add(task)
+        task.add_done_callback(response_tasks.discard)
+
+    # Live captions from partial transcripts, when enabled
+    caption_debouncer = None
+    if config.STT_INTERIM_RESULTS:
+        caption_debouncer = captions.PartialDebouncer(
+            lambda text: publish({
+                "type": "transcription",
+                "text": text,
+                "is_final": False,
+                "end_of_turn": False
+            }),
+            debounce=config.STT_PARTIAL_DEBOUNCE_MS / 1000,
+            min_delta=config.STT_PARTIAL_MIN_DELTA,
+        )
 
-    def on_turn(self: Type[StreamingClient], event: TurnEvent):
-        nonlocal processed_turns, last_turn_time
-        transcript_text = event.transcript.strip()
-        current_time = time.time()
+    # Define event handlers
+    def on_turn(event: stt.TranscriptEvent):
+        nonlocal processed_turns, speech_frames_at_turn
+        if not event.end_of_turn:
+            if caption_debouncer is not None:
+                caption_debouncer.partial(event.text)
+            if speculator is not None:
+                speculator.partial(event.text, len(session_history))
+            return
+        if caption_debouncer is not None:
+            caption_debouncer.reset()
+
+        transcript_text = event.text.strip()
         
-        # Normalize transcript for duplicate detection (lowercase, remove extra spaces)
-        normalized_transcript = ' '.join(transcript_text.lower().split())
+        # Normalize transcript for duplicate detection (case, punctuation and extra spaces)
+        normalized_transcript = speculation.normalize(transcript_text)
         
-        # Only process end-of-turn events, avoid duplicates, and prevent rapid-fire duplicates
+        # Only process end-of-turn events, avoid duplicates, and skip repeats of a turn
+        # (e.g. its formatted copy) that arrive before the user has spoken again
         if (event.end_of_turn and 
             transcript_text and 
             len(transcript_text) > 3 and  # Ignore very short transcripts
             normalized_transcript not in processed_turns and
-            current_time - last_turn_time > 2.0):  # Increase to 2 seconds between turns
+            endpointer.speech_frames > speech_frames_at_turn):
             
             processed_turns.add(normalized_transcript)
-            last_turn_time = current_time
+            speech_frames_at_turn = endpointer.speech_frames
+            endpointer.reset_turn()
+            endpoint_delay = None
+            if endpointer.speech_ended_at is not None:
+                endpoint_delay = time.monotonic() - endpointer.speech_ended_at
+                source = "vad" if forced_at_frames == endpointer.speech_frames else "stt"
+                audio.endpoint_metrics.record(endpoint_delay, source)
             print(f"\nUser: {transcript_text}")
             
             # Put final transcription in queue for async sending
-            try:
-                transcription_queue.put_nowait({
-                    "type": "transcription",
-                    "text": transcript_text,
-                    "is_final": True,
-                    "end_of_turn": True
-                })
-                
-                # Send explicit end-of-turn notification
-                transcription_queue.put_nowait({
-                    "type": "turn_end",
-                    "message": "User stopped talking"
-                })
-                
-                # Process LLM streaming response with Murf integration
-                print("Assistant: ", end="", flush=True)
-                process_llm_with_murf_sync(transcript_text)
-                
-            except asyncio.QueueFull:
-                print("Transcription queue is full")
+            publish({
+                "type": "transcription",
+                "text": transcript_text,
+                "is_final": True,
+                "end_of_turn": True
+            })
+            
+            # Send explicit end-of-turn notification
+            publish({
+                "type": "turn_end",
+                "message": "User stopped talking",
+                "endpoint_delay_ms": round(endpoint_delay * 1000) if endpoint_delay is not None else None
+            })
+            
+            # Process LLM streaming response with Murf integration
+            print("Assistant: ", end="", flush=True)
+            respond(transcript_text)
 
-    def on_terminated(self: Type[StreamingClient], event: TerminationEvent):
-        print(f"Session ended - {event.audio_duration_seconds:.1f}s processed")
+        elif speculator is not None:
+            # Ignored turn; nothing will use a response started for it
+            speculator.cancel()
 
-    def on_error(self: Type[StreamingClient], error: StreamingError):
+    def on_error(error: str):
         print(f"Transcription error: {error}")
-        try:
-            transcription_queue.put_nowait({
-                "type": "error",
-                "message": f"Transcription error: {error}"
-            })
-        except asyncio.QueueFull:
-            pass
+        publish({
+            "type": "error",
+            "message": f"Transcription error: {error}"
+        })
 
-    # Register event handlers
-    client.on(StreamingEvents.Begin, on_begin)
-    client.on(StreamingEvents.Turn, on_turn)
-    client.on(StreamingEvents.Termination, on_terminated)
-    client.on(StreamingEvents.Error, on_error)
+    # Task to dispatch transcript events from the STT stream
+    async def receive_transcripts():
+        async for event in stream:
+            if event.error:
+                on_error(event.error)
+            else:
+                on_turn(event)
 
     # Task to send transcription messages to client
     async def send_transcriptions():
         while True:
+            # Sleeps until something is published; no periodic wake-ups while idle
+            message = await transcription_queue.get()
             try:
-                message = await asyncio.wait_for(transcription_queue.get(), timeout=0.1)
                 await websocket.send_text(json.dumps(message))
-                transcription_queue.task_done()
-            except asyncio.TimeoutError:
-                continue
             except Exception:
                 break
 
     # Start the transcription sender task
     sender_task = asyncio.create_task(send_transcriptions())
+    stream = None
+    receiver_task = None
+    # Set when the client reports a format other than mono 16-bit at STT_SAMPLE_RATE
+    normalizer = None
 
-    # Connect to AssemblyAI streaming service
+    # Connect to the streaming STT service
     try:
-        client.connect(
-            StreamingParameters(
-                sample_rate=16000,
-                format_turns=True,
-                enable_extra_session_information=True,
-            )
-        )
+        stream = await stt.get_provider().stream(sample_rate=config.STT_SAMPLE_RATE)
+        receiver_task = asyncio.create_task(receive_transcripts())
         
-        print("Connected to AssemblyAI streaming service")
+        print("Connected to streaming STT service")
         await websocket.send_text(json.dumps({
             "type": "status",
             "message": "Connected to transcription service with turn detection"
@@ -301,26 +367,64 @@ async def websocket_audio_streaming(websocket: WebSocket):
                 
                 if "bytes" in message:
                     pcm_data = message["bytes"]
+                    if normalizer is not None:
+                        # Downmix/resample so the capture and the STT get mono 16-bit PCM
+                        pcm_data = normalizer.process(pcm_data)
+                        if not pcm_data:
+                            continue
                     f.write(pcm_data)  # Save to file for debugging
-                    client.stream(pcm_data)  # Send to AssemblyAI for transcription
+                    await stream.send(pcm_data)  # Send to the STT provider for transcription
+                    was_speaking = endpointer.in_speech
+                    if endpointer.process(pcm_data) and config.VAD_ENDPOINTING:
+                        # Trailing silence: end the turn now instead of waiting for the STT's turn detection
+                        forced_at_frames = endpointer.speech_frames
+                        stream.force_endpoint()
+                    elif endpointer.in_speech and not was_speaking:
+                        barge_in()
                     
                 elif message.get("text") == "EOF":
                     print("Recording finished")
                     break
 
+                elif message.get("text"):
+                    # {"type": "audio_format", "sample_rate": 48000, "channels": 1} before the audio
+                    try:
+                        control = json.loads(message["text"])
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(control, dict) and control.get("type") == "audio_format":
+                        normalizer = audio.PCMStreamNormalizer(
+                            int(control.get("sample_rate", config.STT_SAMPLE_RATE)),
+                            int(control.get("channels", 1)),
+                            target_rate=config.STT_SAMPLE_RATE,
+                        )
+                        if normalizer.passthrough:
+                            normalizer = None
+
     except WebSocketDisconnect:
         print("Client disconnected")
     except Exception as e:
         print(f"WebSocket error: {str(e)}")
     finally:
-        # Cancel the sender task
+        # Cancel the sender task and any caption still waiting to go out
         sender_task.cancel()
+        if caption_debouncer is not None:
+            caption_debouncer.reset()
+        if speculator is not None:
+            speculator.cancel()
+        # Nobody is left to hear the reply
+        for task in list(response_tasks):
+            task.cancel()
+        llm.chat_sessions.discard(chat_session_id)
         
-        # Clean up AssemblyAI connection
-        try:
-            client.disconnect(terminate=True)
-        except Exception as e:
-            print(f"Error disconnecting: {e}")
+        # Clean up the STT connection
+        if stream is not None:
+            try:
+                await stream.close()
+            except Exception as e:
+                print(f"Error disconnecting: {e}")
+        if receiver_task is not None:
+            receiver_task.cancel()
         
         # Close WebSocket connection
         try:
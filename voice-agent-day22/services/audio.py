@@ -0,0 +1,212 @@
+# services/audio.py
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import numpy as np
+
+_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def _decode_mono(pcm: bytes, channels: int, sample_width: int) -> np.ndarray:
+    """Little-endian PCM to a float mono mix in [-1, 1]."""
+    dtype = _DTYPES[sample_width]
+    block = sample_width * channels
+    usable = len(pcm) - len(pcm) % block
+    samples = np.frombuffer(pcm[:usable], dtype=np.dtype(dtype).newbyteorder("<")).reshape(-1, channels)
+
+    mono = samples.astype(np.float32).mean(axis=1)
+    if dtype is np.uint8:
+        return (mono - 128.0) / 128.0
+    return mono / float(np.iinfo(dtype).max)
+
+
+def _to_int16(mono: np.ndarray) -> bytes:
+    return np.clip(np.round(mono * 32767), -32768, 32767).astype("<i2").tobytes()
+
+
+def _lowpass_kernel(cutoff: float, taps: int = 63) -> np.ndarray:
+    """Windowed-sinc low-pass FIR; `cutoff` is a fraction of the sample rate (0-0.5)."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return kernel / kernel.sum()
+
+
+class PCMStreamNormalizer:
+    """
+    Downmixes and resamples a live PCM stream to mono 16-bit at `target_rate`,
+    one chunk at a time.
+
+    Filter history and the interpolation phase carry over between chunks, so the
+    output is the same as converting the whole capture at once (minus the
+    filter's fixed delay). The output rate is always `target_rate`, since a
+    streaming STT session is opened at one fixed rate.
+    """
+
+    def __init__(self, sample_rate: int, channels: int = 1, sample_width: int = 2, target_rate: int = 16000):
+        if sample_width not in _DTYPES:
+            raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.target_rate = target_rate
+        self._step = sample_rate / target_rate
+        self._kernel: Optional[np.ndarray] = None
+        if target_rate < sample_rate:
+            # Band-limit to the new Nyquist frequency so high frequencies don't alias
+            self._kernel = _lowpass_kernel(0.5 * target_rate / sample_rate)
+            self._history = np.zeros(len(self._kernel) - 1, dtype=np.float32)
+        self._pending = b""
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._position = 0.0
+
+    @property
+    def passthrough(self) -> bool:
+        return (self.sample_rate, self.channels, self.sample_width) == (self.target_rate, 1, 2)
+
+    def process(self, pcm: bytes) -> bytes:
+        """Convert the next chunk; may return fewer (or no) bytes while the filter fills."""
+        if self.passthrough:
+            return pcm
+
+        # Keep partial sample frames for the next chunk
+        block = self.sample_width * self.channels
+        pcm = self._pending + pcm
+        usable = len(pcm) - len(pcm) % block
+        self._pending = pcm[usable:]
+        mono = _decode_mono(pcm[:usable], self.channels, self.sample_width)
+
+        if self._kernel is not None:
+            padded = np.concatenate([self._history, mono])
+            mono = np.convolve(padded, self._kernel, mode="valid")
+            self._history = padded[len(padded) - len(self._history):]
+
+        buffer = np.concatenate([self._buffer, mono])
+        if len(buffer) < 2 or self._position > len(buffer) - 1:
+            self._buffer = buffer
+            return b""
+
+        # Output samples that fall between buffered input samples
+        count = int((len(buffer) - 1 - self._position) // self._step) + 1
+        positions = self._position + np.arange(count) * self._step
+        out = np.interp(positions, np.arange(len(buffer)), buffer)
+
+        next_position = self._position + count * self._step
+        consumed = min(int(next_position), len(buffer))
+        self._buffer = buffer[consumed:]
+        self._position = next_position - consumed
+        return _to_int16(out)
+
+
+class EndpointDetector:
+    """
+    Energy VAD over live 16-bit mono PCM that spots the end of an utterance.
+
+    A frame is speech when its RMS energy is `noise_margin_db` above the noise
+    floor, or a little quieter with a high zero-crossing rate (unvoiced
+    consonants). The floor is the quietest frame of the last `noise_window_ms`,
+    which the pauses between words keep close to the room's real noise. After at least `min_speech_ms` of speech, process() returns True
+    once `silence_ms` of silence has followed it; then the detector waits for
+    new speech. `speech_frames` counts every speech frame seen, so callers can
+    tell whether anyone spoke between two points in time.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        silence_ms: int = 700,
+        min_speech_ms: int = 200,
+        frame_ms: int = 20,
+        min_energy_db: float = -50.0,
+        noise_margin_db: float = 12.0,
+        zcr_threshold: float = 0.25,
+        noise_window_ms: int = 3000,
+    ):
+        self.frame_ms = frame_ms
+        self.silence_ms = silence_ms
+        self.min_speech_ms = min_speech_ms
+        self.min_energy_db = min_energy_db
+        self.noise_margin_db = noise_margin_db
+        self.zcr_threshold = zcr_threshold
+        self._frame_bytes = sample_rate * frame_ms // 1000 * 2
+        self._pending = b""
+        # Until real quiet frames arrive, the threshold is min_energy_db
+        self._recent_db: Deque[float] = deque([min_energy_db - noise_margin_db], maxlen=noise_window_ms // frame_ms)
+        self._speech_run = 0
+        self._silence_run = 0
+        self._armed = False
+        self.speech_frames = 0
+        # time.monotonic() when the last speech frame arrived
+        self.speech_ended_at: Optional[float] = None
+
+    def process(self, pcm: bytes) -> bool:
+        """Feed the next chunk; True when trailing silence has just crossed `silence_ms`."""
+        pcm = self._pending + pcm
+        usable = len(pcm) - len(pcm) % self._frame_bytes
+        self._pending = pcm[usable:]
+        if not usable:
+            return False
+
+        frames = np.frombuffer(pcm[:usable], dtype="<i2").reshape(-1, self._frame_bytes // 2) / 32768.0
+        energy_db = 20 * np.log10(np.sqrt(np.mean(frames * frames, axis=1)) + 1e-10)
+        zcr = np.mean(np.diff(np.signbit(frames), axis=1), axis=1)
+
+        now = time.monotonic()
+        endpoint = False
+        for energy, crossings in zip(energy_db.tolist(), zcr.tolist()):
+            self._recent_db.append(energy)
+            threshold = max(self.min_energy_db, min(self._recent_db) + self.noise_margin_db)
+            if energy > threshold or (energy > threshold - 6 and crossings > self.zcr_threshold):
+                self.speech_frames += 1
+                self.speech_ended_at = now
+                self._speech_run += self.frame_ms
+                self._silence_run = 0
+                if self._speech_run >= self.min_speech_ms:
+                    self._armed = True
+                continue
+
+            self._speech_run = 0
+            self._silence_run += self.frame_ms
+            if self._armed and self._silence_run >= self.silence_ms:
+                self._armed = False
+                endpoint = True
+        return endpoint
+
+    @property
+    def in_speech(self) -> bool:
+        """At least `min_speech_ms` of speech, and no endpoint since."""
+        return self._armed
+
+    def reset_turn(self):
+        """The turn ended some other way (e.g. the STT's own turn detection); wait for new speech."""
+        self._armed = False
+        self._speech_run = 0
+
+
+class EndpointMetrics:
+    """
+    End-of-speech to end-of-turn delay for each turn, to tune the VAD threshold.
+
+    `source` is "vad" when the local detector forced the endpoint and "stt" when
+    the provider's turn detection got there first.
+    """
+
+    def __init__(self, keep: int = 200):
+        self.turns: Deque[Dict[str, Any]] = deque(maxlen=keep)
+
+    def record(self, delay: float, source: str):
+        self.turns.append({"delay_ms": round(delay * 1000), "source": source, "at": time.time()})
+
+    def as_dict(self) -> Dict[str, Any]:
+        summary: Dict[str, Any] = {"turns": len(self.turns), "recent": list(self.turns)[-20:]}
+        for source in ("vad", "stt"):
+            delays = [turn["delay_ms"] for turn in self.turns if turn["source"] == source]
+            summary[source] = {
+                "turns": len(delays),
+                "p50_ms": float(np.percentile(delays, 50)) if delays else None,
+                "p90_ms": float(np.percentile(delays, 90)) if delays else None,
+            }
+        return summary
+
+
+endpoint_metrics = EndpointMetrics()
@@ -0,0 +1,68 @@
+# services/captions.py
+import asyncio
+import time
+from typing import Callable, Optional
+
+
+class PartialDebouncer:
+    """
+    Coalesces partial transcripts into live captions for one /ws session.
+
+    A caption goes out at most once every `debounce` seconds, and only when it
+    differs from the last one sent by at least `min_delta` characters. Partials
+    that arrive inside the window replace each other, and the newest is sent
+    when the window closes, so captions never trail the speech by more than
+    `debounce`. Must be used from the event loop thread.
+    """
+
+    def __init__(self, send: Callable[[str], None], debounce: float = 0.15, min_delta: int = 2):
+        self.send = send
+        self.debounce = debounce
+        self.min_delta = min_delta
+        self._sent = ""
+        self._sent_at = 0.0
+        self._pending: Optional[str] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    def _delta(self, text: str) -> int:
+        """Characters that changed since the last caption: everything after the common prefix."""
+        common = 0
+        for a, b in zip(text, self._sent):
+            if a != b:
+                break
+            common += 1
+        return max(len(text), len(self._sent)) - common
+
+    def partial(self, text: str):
+        text = text.strip()
+        if not text or self._delta(text) < self.min_delta:
+            # Too close to what the client already shows; also supersedes anything pending
+            self._pending = None
+            return
+
+        wait = self._sent_at + self.debounce - time.monotonic()
+        if wait <= 0:
+            self._emit(text)
+            return
+        self._pending = text
+        if self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(wait, self._flush)
+
+    def _flush(self):
+        self._timer = None
+        if self._pending is not None:
+            self._emit(self._pending)
+
+    def _emit(self, text: str):
+        self._pending = None
+        self._sent = text
+        self._sent_at = time.monotonic()
+        self.send(text)
+
+    def reset(self):
+        """Forget the current turn; the final transcript replaces any caption still pending."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending = None
+        self._sent = ""
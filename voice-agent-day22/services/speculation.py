@@ -0,0 +1,123 @@
+# services/speculation.py
+import asyncio
+import re
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+def normalize(text: str) -> str:
+    """Case, punctuation and spacing differ between partial and formatted final transcripts."""
+    return " ".join(re.sub(r"[^\w\s']", " ", text.lower()).split())
+
+
+class SpeculationStats:
+    """Counters shared by all sessions; progress reports arrive from worker threads, hence the lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started = 0
+        self.hits = 0
+        self.misses = 0
+        self.wasted_tokens = 0
+
+    def add(self, **counts: int):
+        with self._lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            settled = self.hits + self.misses
+            return {
+                "started": self.started,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / settled if settled else None,
+                "wasted_tokens": self.wasted_tokens,
+            }
+
+
+stats = SpeculationStats()
+
+
+class _Speculation:
+    def __init__(self, key: Tuple[str, Hashable]):
+        self.key = key
+        self.tokens = 0
+        self.discarded = False
+        self.task: Optional[asyncio.Future] = None
+
+    def report(self, tokens: int):
+        """Output tokens generated so far; tokens generated after a discard are wasted too."""
+        delta, self.tokens = tokens - self.tokens, tokens
+        if self.discarded and delta > 0:
+            stats.add(wasted_tokens=delta)
+
+
+class Speculator:
+    """
+    Starts the response to a turn before the turn has ended.
+
+    Once a partial transcript has stayed the same (after normalize()) for
+    `stable_after` seconds, `run(text, report)` is started with it. When the end
+    of turn arrives, final() hands back that run if the final transcript and the
+    `context` (e.g. the chat history version) match; otherwise the run is
+    cancelled and a new one started from the final text. `report` takes the
+    output tokens generated so far, so discarded work can be counted. Must be
+    used from the event loop thread.
+    """
+
+    def __init__(self, run: Callable[[str, Callable[[int], None]], Awaitable[Any]], stable_after: float = 0.4):
+        self.run = run
+        self.stable_after = stable_after
+        self._candidate: Optional[Tuple[str, Hashable]] = None
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._running: Optional[_Speculation] = None
+
+    def partial(self, text: str, context: Hashable = None):
+        key = (normalize(text), context)
+        if not key[0] or key == self._candidate or (self._running and self._running.key == key):
+            return
+        self._cancel_timer()
+        self._candidate = key
+        self._timer = asyncio.get_running_loop().call_later(self.stable_after, self._start, text, key)
+
+    def _start(self, text: str, key: Tuple[str, Hashable]):
+        self._timer = None
+        self._candidate = None
+        self._discard()
+        speculation = _Speculation(key)
+        speculation.task = asyncio.ensure_future(self.run(text, speculation.report))
+        # A discarded run's error has no one to report to
+        speculation.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        self._running = speculation
+        stats.add(started=1)
+
+    def final(self, text: str, context: Hashable = None) -> asyncio.Future:
+        """The response for the finished turn: the speculative run on a hit, a fresh one otherwise."""
+        self._cancel_timer()
+        if self._running is not None and self._running.key == (normalize(text), context):
+            speculation, self._running = self._running, None
+            stats.add(hits=1)
+            return speculation.task
+        self._discard()
+        return asyncio.ensure_future(self.run(text, lambda tokens: None))
+
+    def cancel(self):
+        """Drop any pending or running speculation, e.g. when the turn is ignored or the session ends."""
+        self._cancel_timer()
+        self._discard()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._candidate = None
+
+    def _discard(self):
+        speculation, self._running = self._running, None
+        if speculation is None:
+            return
+        speculation.discarded = True
+        speculation.task.cancel()
+        stats.add(misses=1, wasted_tokens=speculation.tokens)
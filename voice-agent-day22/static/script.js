@@ -62,10 +62,17 @@ document.addEventListener("DOMContentLoaded", async () => {
                         sampleRate: 16000 
                     });
                     
+                    // Browsers may ignore the requested rate; tell the server what we actually capture
+                    socket.send(JSON.stringify({
+                        type: "audio_format",
+                        sample_rate: audioContext.sampleRate,
+                        channels: 1
+                    }));
+
                     source = audioContext.createMediaStreamSource(stream);
                     
                     // Create ScriptProcessorNode for processing audio chunks
-                    processor = audioContext.createScriptProcessor(4096, 1, 1); // Mono, 4096 buffer size
+                    processor = audioContext.createScriptProcessor(1024, 1, 1); // Mono, 64 ms at 16 kHz; the server re-frames it
 
                     processor.onaudioprocess = (event) => {
                         const inputData = event.inputBuffer.getChannelData(0);
@@ -105,7 +112,12 @@ document.addEventListener("DOMContentLoaded", async () => {
                     const data = JSON.parse(event.data);
                     console.log("Parsed message data:", data);
                     
-                    if (data.type === "transcription" && data.end_of_turn) {
+                    if (data.type === "transcription" && !data.is_final) {
+                        // Live caption for the turn in progress; the final transcript replaces it
+                        currentTranscript.textContent = data.text;
+                        currentTranscript.classList.remove("final-transcript");
+
+                    } else if (data.type === "transcription" && data.end_of_turn) {
                         // Display transcription only at end of turn
                         console.log(`End of turn transcription: ${data.text}`);
                         
@@ -139,10 +151,16 @@ document.addEventListener("DOMContentLoaded", async () => {
                         
                         // Reset current transcript display for next turn
                         setTimeout(() => {
-                            currentTranscript.textContent = "Listening for next speech...";
-                            currentTranscript.classList.remove("final-transcript");
+                            // Unless captions for the next turn have already started
+                            if (currentTranscript.classList.contains("final-transcript")) {
+                                currentTranscript.textContent = "Listening for next speech...";
+                                currentTranscript.classList.remove("final-transcript");
+                            }
                         }, 2000);
                         
+                    } else if (data.type === "llm_response") {
+                        addToTranscriptionHistory(data.text, "assistant");
+
                     } else if (data.type === "error") {
                         console.error("Transcription error:", data.message);
                         statusDisplay.textContent = `Error: ${data.message}`;
@@ -175,11 +193,11 @@ document.addEventListener("DOMContentLoaded", async () => {
         }
     };
 
-    const addToTranscriptionHistory = (text) => {
+    const addToTranscriptionHistory = (text, role = "user") => {
         if (!transcriptionHistory) return;
         
         const historyItem = document.createElement("div");
-        historyItem.className = "transcription-history-item";
+        historyItem.className = role === "assistant" ? "transcription-history-item assistant" : "transcription-history-item";
         historyItem.innerHTML = `
             <div class="history-timestamp">${new Date().toLocaleTimeString()}</div>
             <div class="history-text">${text}</div>
@@ -0,0 +1,47 @@
+from services.stt import PCMRingBuffer
+
+
+def drain(buffer: PCMRingBuffer) -> bytes:
+    out = b""
+    while buffer.has_frame:
+        frame = buffer.peek()
+        assert len(frame) == buffer.frame_bytes
+        out += bytes(frame)
+        buffer.consume(len(frame))
+    return out
+
+
+def test_frames_whole_across_wrap_after_partial_flush():
+    buffer = PCMRingBuffer(frame_bytes=10, frames=4)
+    stream = bytes(range(256)) * 2
+    sent = b""
+
+    # A ForceEndpoint flush takes a partial frame
+    buffer.write(memoryview(stream[:5]))
+    tail = buffer.peek(partial=True)
+    sent += bytes(tail)
+    buffer.consume(len(tail))
+
+    position = 5
+    while position < len(stream) - 40:
+        position += buffer.write(memoryview(stream[position:position + 40]))
+        sent += drain(buffer)
+    assert sent == stream[:len(sent)]
+
+
+def test_frames_whole_when_audio_arrives_during_partial_flush():
+    buffer = PCMRingBuffer(frame_bytes=10, frames=4)
+    stream = bytes(range(200))
+    buffer.write(memoryview(stream[:5]))
+    tail = buffer.peek(partial=True)
+    sent = bytes(tail)
+    # More audio is written while the tail is still being sent
+    position = 5 + buffer.write(memoryview(stream[5:40]))
+    buffer.consume(len(tail))
+
+    while position < len(stream):
+        sent += drain(buffer)
+        position += buffer.write(memoryview(stream[position:position + 40]))
+    sent += drain(buffer)
+    assert sent == stream[:len(sent)]
+    assert len(sent) == 195
@@ -0,0 +1,90 @@
+import asyncio
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+from uuid import uuid4
+
+from transcript_cache import TranscriptCache
+
+
+class UploadOffsetError(Exception):
+    """A chunk started past the end of what the server has received."""
+
+    def __init__(self, expected: int):
+        super().__init__(f"Expected a chunk starting at offset {expected}")
+        self.expected = expected
+
+
+class ProgressiveUpload:
+    """
+    One recording that is forwarded to the STT upload while it is still being made.
+
+    Chunks are appended in order and each one carries the byte offset it starts at,
+    so a client whose connection dropped can simply resend: bytes the server already
+    has are skipped. The upload task consumes `chunks()` as the request body.
+    """
+
+    def __init__(self, upload_id: str, idle_timeout: float):
+        self.upload_id = upload_id
+        self.idle_timeout = idle_timeout
+        self.received = 0
+        self.finished = False
+        self.hasher = TranscriptCache.hasher()
+        self.last_activity = time.monotonic()
+        self.task: Optional[asyncio.Task] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    def append(self, offset: int, data: bytes) -> int:
+        """Add the bytes of a chunk that starts at `offset`; returns the total received."""
+        if self.finished:
+            raise ValueError("Upload is already finished")
+        if offset > self.received:
+            raise UploadOffsetError(self.received)
+        self.last_activity = time.monotonic()
+        data = data[self.received - offset:]
+        if data:
+            self.hasher.update(data)
+            self._queue.put_nowait(data)
+            self.received += len(data)
+        return self.received
+
+    def finish(self):
+        if not self.finished:
+            self.finished = True
+            self._queue.put_nowait(None)
+
+    async def chunks(self) -> AsyncIterator[bytes]:
+        while True:
+            # A client that stops sending without finishing aborts the upload
+            chunk = await asyncio.wait_for(self._queue.get(), timeout=self.idle_timeout)
+            if chunk is None:
+                return
+            yield chunk
+
+
+class ProgressiveUploads:
+    """In-flight progressive uploads by id; abandoned ones are dropped after `idle_timeout`."""
+
+    def __init__(self, idle_timeout: float = 30.0):
+        self.idle_timeout = idle_timeout
+        self._uploads: Dict[str, ProgressiveUpload] = {}
+
+    def start(self, upload: Callable[[AsyncIterator[bytes]], Awaitable[str]]) -> ProgressiveUpload:
+        """Open an upload; `upload` streams the chunks to the STT service and returns its URL."""
+        self._expire()
+        progressive = ProgressiveUpload(uuid4().hex, self.idle_timeout)
+        progressive.task = asyncio.create_task(upload(progressive.chunks()))
+        # Failures are reported to whoever finishes the upload; don't log them twice
+        progressive.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        self._uploads[progressive.upload_id] = progressive
+        return progressive
+
+    def get(self, upload_id: str) -> Optional[ProgressiveUpload]:
+        return self._uploads.get(upload_id)
+
+    def pop(self, upload_id: str) -> Optional[ProgressiveUpload]:
+        return self._uploads.pop(upload_id, None)
+
+    def _expire(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for upload_id in [u for u, p in self._uploads.items() if p.last_activity < cutoff]:
+            self._uploads.pop(upload_id).task.cancel()
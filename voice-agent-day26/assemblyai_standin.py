@@ -0,0 +1,83 @@
+"""
+Local stand-in for the AssemblyAI v2 REST API, for testing the agent offline.
+
+Run it next to the agent and point the agent at it:
+
+    uvicorn assemblyai_standin:app --port 8001
+    ASSEMBLYAI_BASE_URL=http://127.0.0.1:8001
+    ASSEMBLYAI_WEBHOOK_URL=http://127.0.0.1:8000/assemblyai/webhook
+
+It accepts uploads, "transcribes" them after STANDIN_LATENCY seconds and, when the
+job was submitted with a webhook_url, POSTs the completion callback just like the
+real service does. STANDIN_DROP_WEBHOOKS=1 skips the callback to exercise the
+polling fallback.
+"""
+import asyncio
+import os
+from uuid import uuid4
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+
+STANDIN_LATENCY = float(os.getenv("STANDIN_LATENCY", "1.0"))
+STANDIN_TEXT = os.getenv("STANDIN_TEXT", "Hello from the local AssemblyAI stand-in.")
+STANDIN_DROP_WEBHOOKS = os.getenv("STANDIN_DROP_WEBHOOKS", "0") == "1"
+
+app = FastAPI(title="AssemblyAI stand-in")
+
+uploads = {}
+transcripts = {}
+
+
+@app.post("/v2/upload")
+async def upload(request: Request):
+    upload_id = uuid4().hex
+    uploads[upload_id] = await request.body()
+    return {"upload_url": f"{str(request.base_url).rstrip('/')}/files/{upload_id}"}
+
+
+@app.post("/v2/transcript")
+async def create_transcript(request: Request):
+    body = await request.json()
+    transcript_id = uuid4().hex
+    transcripts[transcript_id] = {
+        "id": transcript_id,
+        "status": "queued",
+        "audio_url": body.get("audio_url"),
+        "webhook_url": body.get("webhook_url"),
+        "text": None,
+        "error": None,
+    }
+    asyncio.create_task(_complete(transcript_id, body))
+    return transcripts[transcript_id]
+
+
+@app.get("/v2/transcript/{transcript_id}")
+async def get_transcript(transcript_id: str):
+    if transcript_id not in transcripts:
+        raise HTTPException(status_code=404, detail="Transcript not found")
+    return transcripts[transcript_id]
+
+
+async def _complete(transcript_id: str, body: dict):
+    transcripts[transcript_id]["status"] = "processing"
+    await asyncio.sleep(STANDIN_LATENCY)
+
+    upload_id = (body.get("audio_url") or "").rsplit("/", 1)[-1]
+    if upload_id in uploads and not uploads[upload_id]:
+        transcripts[transcript_id].update(status="error", error="Audio file is empty")
+    else:
+        transcripts[transcript_id].update(status="completed", text=STANDIN_TEXT)
+
+    webhook_url = body.get("webhook_url")
+    if not webhook_url or STANDIN_DROP_WEBHOOKS:
+        return
+    headers = {}
+    if body.get("webhook_auth_header_name"):
+        headers[body["webhook_auth_header_name"]] = body.get("webhook_auth_header_value", "")
+    payload = {"transcript_id": transcript_id, "status": transcripts[transcript_id]["status"]}
+    try:
+        async with httpx.AsyncClient(timeout=10.0) as client:
+            await client.post(webhook_url, json=payload, headers=headers)
+    except Exception as e:
+        print(f"Stand-in webhook delivery failed: {e}")
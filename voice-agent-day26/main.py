@@ -1,15 +1,24 @@
 import os
-import time
+import asyncio
+from typing import AsyncIterator, Optional, Tuple
 import requests
-import aiofiles
+import httpx
 import webbrowser  # <-- Added for Day 26 skill
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import HTMLResponse
 from dotenv import load_dotenv
 from google import genai
 
+from audio_vad import trim_wav
+from chat_context import ConversationContext
+from multipart_stream import require_multipart_file
+from progressive_upload import ProgressiveUploads, UploadOffsetError
+from semantic_cache import SemanticCache
+from transcript_cache import TranscriptCache
+from transcript_poller import transcript_poller
+
 load_dotenv()
 
 app = FastAPI()
@@ -38,50 +47,183 @@ if not all([ASSEMBLYAI_API_KEY, MURF_API_KEY, MURF_VOICE_ID, GEMINI_API_KEY]):
 
 genai_client = genai.Client(api_key=GEMINI_API_KEY)
 
-ASSEMBLYAI_UPLOAD_URL = "https://api.assemblyai.com/v2/upload"
-ASSEMBLYAI_TRANSCRIPT_URL = "https://api.assemblyai.com/v2/transcript"
+# Point ASSEMBLYAI_BASE_URL at assemblyai_standin.py to run offline
+ASSEMBLYAI_BASE_URL = os.getenv("ASSEMBLYAI_BASE_URL", "https://api.assemblyai.com").rstrip("/")
+ASSEMBLYAI_UPLOAD_URL = f"{ASSEMBLYAI_BASE_URL}/v2/upload"
+ASSEMBLYAI_TRANSCRIPT_URL = f"{ASSEMBLYAI_BASE_URL}/v2/transcript"
 MURF_TTS_URL = "https://api.murf.ai/v1/speech/generate"
 
+# Completion callbacks replace polling when a public webhook URL is configured
+ASSEMBLYAI_WEBHOOK_URL = os.getenv("ASSEMBLYAI_WEBHOOK_URL")
+ASSEMBLYAI_WEBHOOK_SECRET = os.getenv("ASSEMBLYAI_WEBHOOK_SECRET")
+
+transcript_poller.transcript_url = ASSEMBLYAI_TRANSCRIPT_URL
+transcript_poller.webhook_url = ASSEMBLYAI_WEBHOOK_URL
+transcript_poller.webhook_secret = ASSEMBLYAI_WEBHOOK_SECRET
+
+# Repeat clips (client retries, duplicate submissions) are served from this cache
+transcript_cache = TranscriptCache(
+    max_memory_bytes=int(os.getenv("TRANSCRIPT_CACHE_MEMORY_BYTES", 8 * 1024 * 1024)),
+    cache_dir=os.getenv("TRANSCRIPT_CACHE_DIR", ".transcript_cache"),
+    ttl=float(os.getenv("TRANSCRIPT_CACHE_TTL", 7 * 24 * 3600)),
+)
+# Clips up to this size are buffered so the cache is checked before uploading
+CACHE_LOOKAHEAD_BYTES = 1024 * 1024
+
+# Leading/trailing silence is cut from WAV clips before upload
+VAD_TRIM_ENABLED = os.getenv("VAD_TRIM_ENABLED", "1") == "1"
+VAD_MAX_PAUSE_MS = int(os.getenv("VAD_MAX_PAUSE_MS")) if os.getenv("VAD_MAX_PAUSE_MS") else None
+
+# Recordings streamed in while the user is still talking; abandoned ones expire
+progressive_uploads = ProgressiveUploads(
+    idle_timeout=float(os.getenv("PROGRESSIVE_UPLOAD_IDLE_TIMEOUT", 30)),
+)
+
+# Shared async client for streaming uploads
+http_client = httpx.AsyncClient(timeout=60.0)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await transcript_poller.aclose()
+    await http_client.aclose()
+
 # In-memory chat history store: { session_id: [ {"role": "user"/"assistant", "content": "..."} ] }
 chat_history_store = {}
 
-async def upload_audio_to_assemblyai(file_path: str) -> str:
+# Prompts keep the newest messages verbatim within LLM_CONTEXT_TOKENS; older ones
+# are folded into a summary in the background, so long sessions don't slow turns down
+chat_context = ConversationContext(
+    render=lambda msg: f"{'User' if msg['role'] == 'user' else 'AI'}: {msg['content']}",
+    recent_tokens=int(os.getenv("LLM_CONTEXT_TOKENS", 2000)),
+    summary_tokens=int(os.getenv("LLM_SUMMARY_TOKENS", 300)),
+)
+
+# Longest wait for one Gemini reply before the turn fails
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))
+
+# Near-duplicate questions are answered from earlier answers (and their audio) without Gemini
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+semantic_cache = SemanticCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.9)),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 2048)),
+    ttl=float(os.getenv("SEMANTIC_CACHE_TTL", 24 * 3600)),
+)
+
+async def upload_audio_to_assemblyai(audio_chunks: AsyncIterator[bytes]) -> str:
     headers = {"authorization": ASSEMBLYAI_API_KEY}
-    async with aiofiles.open(file_path, "rb") as f:
-        data = await f.read()
-    response = requests.post(ASSEMBLYAI_UPLOAD_URL, headers=headers, data=data)
+    # Forward chunks as they arrive; the clip never touches disk or sits whole in memory
+    response = await http_client.post(ASSEMBLYAI_UPLOAD_URL, headers=headers, content=audio_chunks)
     response.raise_for_status()
     return response.json()["upload_url"]
 
-def request_transcription(upload_url: str) -> str:
-    headers = {"authorization": ASSEMBLYAI_API_KEY, "content-type": "application/json"}
-    json_data = {"audio_url": upload_url}
-    response = requests.post(ASSEMBLYAI_TRANSCRIPT_URL, json=json_data, headers=headers)
-    response.raise_for_status()
-    transcript_id = response.json()["id"]
-
-    # Poll transcription until done
-    while True:
-        poll_resp = requests.get(f"{ASSEMBLYAI_TRANSCRIPT_URL}/{transcript_id}", headers=headers)
-        poll_resp.raise_for_status()
-        status = poll_resp.json()["status"]
-        if status == "completed":
-            return poll_resp.json()["text"]
-        elif status == "error":
-            raise Exception("AssemblyAI transcription failed: " + poll_resp.json().get("error", "Unknown error"))
-        time.sleep(3)
-
-def get_gemini_response(chat_messages: list) -> str:
-    prompt = ""
-    for msg in chat_messages:
-        role = "User" if msg["role"] == "user" else "AI"
-        prompt += f"{role}: {msg['content']}\n"
-    prompt += "AI:"
-    response = genai_client.models.generate_content(
-        model="gemini-1.5-flash",
-        contents=prompt
-    )
-    return response.text.strip()
+async def request_transcription(upload_url: str) -> str:
+    # Submit the job, then let the shared poller resolve it without blocking the loop
+    return await transcript_poller.transcribe(upload_url, ASSEMBLYAI_API_KEY)
+
+async def transcribe_audio_stream(audio_chunks: AsyncIterator[bytes]) -> Tuple[str, float]:
+    """
+    Upload and transcribe streamed audio, reusing cached transcripts of identical clips.
+    Returns the transcript and the seconds of silence trimmed before upload.
+    """
+    hasher = TranscriptCache.hasher()
+    trimmed_seconds = 0.0
+    head = []
+    head_size = 0
+    complete = True
+    async for chunk in audio_chunks:
+        hasher.update(chunk)
+        head.append(chunk)
+        head_size += len(chunk)
+        if head_size > CACHE_LOOKAHEAD_BYTES:
+            complete = False
+            break
+
+    if complete:
+        # Whole clip is in memory: a hit skips the upload as well
+        key = hasher.hexdigest()
+        cached = await transcript_cache.get(key)
+        if cached is not None:
+            return cached, 0.0
+        if VAD_TRIM_ENABLED:
+            audio_bytes, trimmed_seconds = await asyncio.to_thread(
+                trim_wav, b"".join(head), max_pause_ms=VAD_MAX_PAUSE_MS
+            )
+            head = [audio_bytes]
+
+    async def replay():
+        for chunk in head:
+            yield chunk
+        if not complete:
+            async for chunk in audio_chunks:
+                hasher.update(chunk)
+                yield chunk
+
+    upload_url = await upload_audio_to_assemblyai(replay())
+    if not complete:
+        # Long clip: the digest is only known once the upload has streamed through
+        key = hasher.hexdigest()
+        cached = await transcript_cache.get(key)
+        if cached is not None:
+            return cached, 0.0
+
+    transcript_text = await request_transcription(upload_url)
+    if transcript_text:
+        await transcript_cache.put(key, transcript_text)
+    return transcript_text, trimmed_seconds
+
+def get_progressive_upload(upload_id: str):
+    upload = progressive_uploads.get(upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired upload")
+    return upload
+
+async def transcribe_progressive_upload(upload_id: str, upload_size: Optional[int]) -> Tuple[str, float]:
+    """
+    Finish an upload streamed in during recording and transcribe it.
+    The bytes are already at AssemblyAI, so only the transcription is left.
+    """
+    upload = get_progressive_upload(upload_id)
+    if upload_size is not None and upload_size != upload.received:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Upload is incomplete", "received": upload.received},
+        )
+    progressive_uploads.pop(upload_id)
+    if not upload.received:
+        upload.task.cancel()
+        raise HTTPException(status_code=400, detail="Uploaded audio file is empty")
+
+    upload.finish()
+    upload_url = await upload.task
+    key = upload.hasher.hexdigest()
+    cached = await transcript_cache.get(key)
+    if cached is not None:
+        return cached, 0.0
+
+    transcript_text = await request_transcription(upload_url)
+    if transcript_text:
+        await transcript_cache.put(key, transcript_text)
+    return transcript_text, 0.0
+
+async def generate_with_gemini(prompt: str) -> str:
+    # The SDK's async client: other requests keep being served while Gemini thinks
+    try:
+        response = await asyncio.wait_for(
+            genai_client.aio.models.generate_content(
+                model="gemini-1.5-flash",
+                contents=prompt
+            ),
+            timeout=LLM_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Gemini did not respond within {LLM_TIMEOUT:g}s")
+    return response.text or ""
+
+async def get_gemini_response(chat_messages: list, session_id: str) -> str:
+    summary, recent = chat_context.build(session_id, chat_messages, generate_with_gemini)
+    prompt = f"Summary of the earlier conversation:\n{summary}\n\n" if summary else ""
+    prompt += "\n".join(recent) + "\nAI:"
+    return (await generate_with_gemini(prompt)).strip()
 
 def generate_murf_tts(text: str) -> str:
     if len(text) > 3000:
@@ -108,18 +250,69 @@ def generate_murf_tts(text: str) -> str:
 
     return audio_url
 
+@app.get("/stats/transcript-cache")
+async def transcript_cache_stats():
+    return transcript_cache.stats()
+
+@app.get("/stats/semantic-cache")
+async def semantic_cache_stats():
+    return semantic_cache.stats()
+
+@app.post("/assemblyai/webhook")
+async def assemblyai_webhook(request: Request, x_webhook_secret: str = Header(None)):
+    if ASSEMBLYAI_WEBHOOK_SECRET and x_webhook_secret != ASSEMBLYAI_WEBHOOK_SECRET:
+        raise HTTPException(status_code=401, detail="Invalid webhook secret")
+    payload = await request.json()
+    transcript_id = payload.get("transcript_id")
+    if not transcript_id:
+        raise HTTPException(status_code=400, detail="Missing transcript_id")
+    transcript_poller.notify(transcript_id, payload.get("status"))
+    return {"status": "ok"}
+
+@app.post("/agent/upload")
+async def start_progressive_upload():
+    # The AssemblyAI upload opens now and is fed by the PUTs below
+    upload = progressive_uploads.start(upload_audio_to_assemblyai)
+    return {"upload_id": upload.upload_id, "received": 0}
+
+@app.put("/agent/upload/{upload_id}")
+async def append_progressive_upload(upload_id: str, request: Request, offset: int = 0):
+    upload = get_progressive_upload(upload_id)
+    try:
+        # A resent chunk (offset before `received`) only contributes its new bytes
+        received = upload.append(offset, await request.body())
+    except UploadOffsetError as e:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": str(e), "received": e.expected},
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"upload_id": upload_id, "received": received}
+
+@app.get("/agent/upload/{upload_id}")
+async def progressive_upload_status(upload_id: str):
+    # Lets a reconnecting client find out where to resume from
+    upload = get_progressive_upload(upload_id)
+    return {"upload_id": upload_id, "received": upload.received, "finished": upload.finished}
+
 @app.post("/agent/chat/{session_id}")
-async def agent_chat(session_id: str, audio: UploadFile = File(...)):
+async def agent_chat(
+    session_id: str,
+    request: Request,
+    upload_id: Optional[str] = None,
+    upload_size: Optional[int] = None,
+):
     try:
-        # Save temp audio file
-        temp_file_path = f"temp_{audio.filename}"
-        async with aiofiles.open(temp_file_path, "wb") as out_file:
-            content = await audio.read()
-            await out_file.write(content)
+        if upload_id:
+            # Audio was uploaded while the user talked; go straight to transcription
+            transcript_text, trimmed_seconds = await transcribe_progressive_upload(upload_id, upload_size)
+        else:
+            # Stream the "audio" form field straight into the upload
+            audio_chunks = await require_multipart_file(request, "audio")
 
-        # Upload and transcribe
-        upload_url = await upload_audio_to_assemblyai(temp_file_path)
-        transcript_text = request_transcription(upload_url)
+            # Upload and transcribe (or reuse the transcript of an identical clip)
+            transcript_text, trimmed_seconds = await transcribe_audio_stream(audio_chunks)
 
         # ---------------- DAY 26: Special Skill 2 ----------------
         if "open youtube" in transcript_text.lower():
@@ -127,9 +320,9 @@ async def agent_chat(session_id: str, audio: UploadFile = File(...)):
             ai_response = "Opening YouTube for you!"
             murf_audio_url = generate_murf_tts(ai_response)
 
-            os.remove(temp_file_path)
             return {
                 "transcription": transcript_text,
+                "trimmed_seconds": trimmed_seconds,
                 "llm_response": ai_response,
                 "murf_audio_url": murf_audio_url,
                 "chat_history": chat_history_store.get(session_id, [])
@@ -139,19 +332,25 @@ async def agent_chat(session_id: str, audio: UploadFile = File(...)):
         # Normal flow for other queries
         history = chat_history_store.get(session_id, [])
         history.append({"role": "user", "content": transcript_text})
-        ai_response = get_gemini_response(history)
+        # A first question that nearly repeats an earlier one gets its answer (and audio);
+        # follow-ups depend on the conversation, so they always go to Gemini
+        hit = semantic_cache.lookup(transcript_text, MURF_VOICE_ID) if SEMANTIC_CACHE_ENABLED and len(history) == 1 else None
+        ai_response = hit.answer if hit else await get_gemini_response(history, session_id)
         history.append({"role": "assistant", "content": ai_response})
         chat_history_store[session_id] = history
-        murf_audio_url = generate_murf_tts(ai_response)
-
-        os.remove(temp_file_path)
+        murf_audio_url = hit.audio_url if hit and hit.audio_url else generate_murf_tts(ai_response)
+        if SEMANTIC_CACHE_ENABLED and len(history) == 2:
+            semantic_cache.add(hit.question if hit else transcript_text, ai_response, murf_audio_url, MURF_VOICE_ID)
 
         return {
             "transcription": transcript_text,
+            "trimmed_seconds": trimmed_seconds,
             "llm_response": ai_response,
             "murf_audio_url": murf_audio_url,
             "chat_history": history
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
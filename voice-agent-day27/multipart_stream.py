@@ -0,0 +1,92 @@
+from typing import AsyncIterator
+
+from fastapi import HTTPException, Request
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+
+async def iter_multipart_file(request: Request, field_name: str) -> AsyncIterator[bytes]:
+    """
+    Yield the bytes of one file field from a multipart request as they arrive.
+
+    Unlike UploadFile, nothing is spooled to memory or disk: each network chunk is
+    parsed and handed on straight away, so memory per request stays bounded by the
+    chunk size. Raises HTTPException(400) if the field is missing.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    chunks = []
+    state = {"header_field": b"", "header_value": b"", "in_field": False, "found": False, "done": False}
+
+    def on_part_begin():
+        state["in_field"] = False
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        if state["header_field"].lower() == b"content-disposition":
+            _, options = parse_options_header(state["header_value"])
+            if options.get(b"name", b"").decode() == field_name:
+                state["in_field"] = state["found"] = True
+        state["header_field"] = b""
+        state["header_value"] = b""
+
+    def on_part_data(data, start, end):
+        if state["in_field"]:
+            chunks.append(bytes(data[start:end]))
+
+    def on_part_end():
+        if state["in_field"]:
+            state["done"] = True
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    async for body in request.stream():
+        parser.write(body)
+        for chunk in chunks:
+            yield chunk
+        chunks.clear()
+        if state["done"]:
+            return
+
+    if not state["found"]:
+        raise HTTPException(status_code=400, detail=f"Missing '{field_name}' file in upload")
+
+
+async def require_multipart_file(request: Request, field_name: str) -> AsyncIterator[bytes]:
+    """
+    Like iter_multipart_file, but waits for the first non-empty chunk before
+    returning, so a missing or empty file fails before any upstream request starts.
+    """
+    stream = iter_multipart_file(request, field_name)
+    first = b""
+    async for chunk in stream:
+        if chunk:
+            first = chunk
+            break
+    if not first:
+        raise HTTPException(status_code=400, detail="Uploaded audio file is empty")
+
+    async def chained():
+        yield first
+        async for chunk in stream:
+            yield chunk
+
+    return chained()
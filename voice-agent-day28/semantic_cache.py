@@ -0,0 +1,147 @@
+import hashlib
+import re
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def _normalize(text: str) -> str:
+    return " ".join(re.sub(r"[^\w\s']", " ", text.casefold()).split())
+
+
+def _numbers(text: str) -> Tuple[str, ...]:
+    return tuple(re.findall(r"\d+", text))
+
+
+def embed(text: str, dim: int = 1024) -> np.ndarray:
+    """
+    Hashed n-gram vector of `text`, L2-normalized: words, word pairs and
+    character trigrams (which absorb small transcription differences), each
+    hashed into one of `dim` buckets with a hashed sign.
+    """
+    words = _normalize(text).split()
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    for word in words:
+        padded = f" {word} "
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    vector = np.zeros(dim, dtype=np.float32)
+    if not features:
+        return vector
+    hashes = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % dim, signs)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@dataclass
+class SemanticHit:
+    question: str
+    answer: str
+    audio_url: Optional[str]
+    similarity: float
+
+
+class SemanticCache:
+    """
+    Answers to past questions, found again by similarity instead of exact text.
+
+    Questions are embedded with embed() into rows of a preallocated matrix, so a
+    lookup is one matrix-vector product over at most `max_entries` rows. A
+    question whose cosine similarity to a stored one reaches `threshold` gets
+    the stored answer, and the stored audio when it was synthesized with the
+    same voice. Numbers must match exactly ("gate 12" is not "gate 21"), since
+    they barely move the similarity. Entries expire after `ttl` seconds (keep
+    it under the lifetime of the TTS audio URLs); when the index is full, the
+    least recently used entry is replaced. Entries belong to a `tenant` (e.g.
+    the caller's API keys, stored hashed) and are only found again by the same
+    tenant. Counters are exposed through `stats()`.
+    """
+
+    def __init__(self, threshold: float = 0.9, max_entries: int = 2048, ttl: float = 24 * 3600, dim: int = 1024):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.dim = dim
+        self._vectors = np.zeros((max_entries, dim), dtype=np.float32)
+        self._stored_at = np.full(max_entries, -np.inf)
+        self._used_at = np.full(max_entries, -np.inf)
+        self._questions: List[Optional[str]] = [None] * max_entries
+        self._question_numbers: List[Tuple[str, ...]] = [()] * max_entries
+        self._answers: List[Optional[str]] = [None] * max_entries
+        self._tenants: List[str] = [""] * max_entries
+        # voice id -> audio URL, per entry
+        self._audio: List[Dict[str, str]] = [{} for _ in range(max_entries)]
+        self.hits = 0
+        self.audio_hits = 0
+        self.misses = 0
+
+    def _live(self, now: float) -> np.ndarray:
+        return self._stored_at >= now - self.ttl
+
+    @staticmethod
+    def _tenant(tenant: str) -> str:
+        return hashlib.blake2b(tenant.encode("utf-8"), digest_size=16).hexdigest() if tenant else ""
+
+    def _best(self, question: str, vector: np.ndarray, now: float, threshold: float, tenant: str):
+        """Slot and similarity of the closest live entry of `tenant` with the same numbers, or (-1, 0.0)."""
+        similarities = np.where(self._live(now), self._vectors @ vector, -1.0)
+        numbers = _numbers(_normalize(question))
+        candidates = np.flatnonzero(similarities >= threshold)
+        for slot in candidates[np.argsort(-similarities[candidates])].tolist():
+            if self._question_numbers[slot] == numbers and self._tenants[slot] == tenant:
+                return slot, float(similarities[slot])
+        return -1, 0.0
+
+    def lookup(self, question: str, voice: str = "", tenant: str = "") -> Optional[SemanticHit]:
+        """The cached answer to the closest past question, if it is similar enough."""
+        now = time.monotonic()
+        slot, similarity = self._best(question, embed(question, self.dim), now, self.threshold, self._tenant(tenant))
+        if slot < 0:
+            self.misses += 1
+            return None
+        self._used_at[slot] = now
+        self.hits += 1
+        audio_url = self._audio[slot].get(voice)
+        if audio_url:
+            self.audio_hits += 1
+        return SemanticHit(self._questions[slot], self._answers[slot], audio_url, similarity)
+
+    def add(self, question: str, answer: str, audio_url: Optional[str] = None, voice: str = "", tenant: str = ""):
+        """Remember an answer; a near-identical question replaces its older entry."""
+        now = time.monotonic()
+        vector = embed(question, self.dim)
+        if not vector.any() or not answer:
+            return
+        tenant = self._tenant(tenant)
+        slot, _ = self._best(question, vector, now, 0.999, tenant)
+        if slot < 0 or self._answers[slot] != answer:
+            if slot < 0:
+                # Prefer an expired or never-used slot, then the least recently used one
+                slot = int(np.argmin(np.where(self._live(now), self._used_at, -np.inf)))
+            # Only a new answer starts the clock; adding audio to an entry doesn't extend its life
+            self._audio[slot] = {}
+            self._stored_at[slot] = now
+        self._vectors[slot] = vector
+        self._used_at[slot] = now
+        self._questions[slot] = question
+        self._question_numbers[slot] = _numbers(_normalize(question))
+        self._answers[slot] = answer
+        self._tenants[slot] = tenant
+        if audio_url:
+            self._audio[slot][voice] = audio_url
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "audio_hits": self.audio_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": int(self._live(time.monotonic()).sum()),
+            "max_entries": self.max_entries,
+            "threshold": self.threshold,
+        }
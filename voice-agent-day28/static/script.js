@@ -10,6 +10,11 @@ const chatHistoryDiv = document.getElementById("history-messages");
 
 let mediaRecorder;
 let audioChunks = [];
+let upload = null;
+
+// Audio is sent to the server in slices this long while recording
+const UPLOAD_TIMESLICE_MS = 250;
+const UPLOAD_RETRIES = 3;
 
 // ---------------- 1. Load API Keys from localStorage ----------------
 const assemblyAIKey = localStorage.getItem("assemblyai_key");
@@ -21,6 +26,12 @@ if (!assemblyAIKey || !murfKey || !googleKey) {
   window.location.href = "/static/config.html";
 }
 
+const apiHeaders = {
+  "x-assemblyai-key": assemblyAIKey,
+  "x-murf-key": murfKey,
+  "x-google-key": googleKey
+};
+
 // ---------------- 2. Session Management ----------------
 function getSessionId() {
   const params = new URLSearchParams(window.location.search);
@@ -44,6 +55,82 @@ function appendChatMessage(role, text) {
   chatHistoryDiv.scrollTop = chatHistoryDiv.scrollHeight;
 }
 
+// ---------------- Progressive Upload: stream while the user talks ----------------
+async function startUpload() {
+  try {
+    const response = await fetch("/agent/upload", { method: "POST", headers: apiHeaders });
+    if (!response.ok) return null;
+    const data = await response.json();
+    return { id: data.upload_id, offset: 0, sending: Promise.resolve(), failed: false };
+  } catch (error) {
+    return null;
+  }
+}
+
+async function sendUploadChunk(upload, chunk) {
+  for (let attempt = 0; attempt < UPLOAD_RETRIES; attempt++) {
+    try {
+      // Resending the same offset after a dropped connection is safe:
+      // the server skips bytes it already has
+      const response = await fetch(`/agent/upload/${upload.id}?offset=${upload.offset}`, {
+        method: "PUT",
+        body: chunk
+      });
+      if (response.ok) {
+        upload.offset = (await response.json()).received;
+        return;
+      }
+      if (response.status !== 409) break;
+      // Out of sync: resume from what the server actually received
+      const status = await fetch(`/agent/upload/${upload.id}`);
+      if (!status.ok) break;
+      const received = (await status.json()).received;
+      if (received !== upload.offset + chunk.size) break;
+      upload.offset = received;
+      return;
+    } catch (error) {
+      await new Promise(resolve => setTimeout(resolve, 200 * (attempt + 1)));
+    }
+  }
+  upload.failed = true;
+}
+
+function queueUploadChunk(upload, chunk) {
+  // Chunks must go out in order, so each send waits for the previous one
+  upload.sending = upload.sending.then(() => upload.failed ? null : sendUploadChunk(upload, chunk));
+}
+
+async function postRecording() {
+  if (upload) {
+    const current = await upload;
+    if (current) {
+      await current.sending;
+      if (!current.failed && current.offset > 0) {
+        const response = await fetch(
+          `/agent/chat/${sessionId}?upload_id=${current.id}&upload_size=${current.offset}`,
+          { method: "POST", headers: apiHeaders }
+        );
+        // Only an unusable upload (unknown/expired or incomplete) is worth resending.
+        // Any other error came after the server took the turn; resending would repeat it
+        if (![404, 409].includes(response.status)) return response;
+      }
+    }
+  }
+
+  // Fall back to sending the whole recording at once
+  const audioBlob = new Blob(audioChunks, { type: "audio/webm" });
+  const file = new File([audioBlob], "voice.webm", { type: "audio/webm" });
+
+  const formData = new FormData();
+  formData.append("audio", file);
+
+  return fetch(`/agent/chat/${sessionId}`, {
+    method: "POST",
+    headers: apiHeaders,
+    body: formData
+  });
+}
+
 // ---------------- 4. Start Recording ----------------
 startBtn.addEventListener("click", async () => {
   audioChunks = [];
@@ -56,35 +143,23 @@ startBtn.addEventListener("click", async () => {
   try {
     const stream = await navigator.mediaDevices.getUserMedia({ audio: true });
     mediaRecorder = new MediaRecorder(stream);
-    mediaRecorder.start();
+    upload = startUpload();
+    mediaRecorder.start(UPLOAD_TIMESLICE_MS);
     statusDiv.textContent = "Recording... 🎙️";
     startBtn.disabled = true;
     stopBtn.disabled = false;
 
     mediaRecorder.ondataavailable = e => {
       audioChunks.push(e.data);
+      upload.then(current => current && queueUploadChunk(current, e.data));
     };
 
     mediaRecorder.onstop = async () => {
       statusDiv.textContent = "Processing audio... ⏳";
 
-      const audioBlob = new Blob(audioChunks, { type: "audio/webm" });
-      const file = new File([audioBlob], "voice.webm", { type: "audio/webm" });
-
-      const formData = new FormData();
-      formData.append("audio", file);
-
       try {
         // ---------------- 5. Send audio + headers to backend ----------------
-        const response = await fetch(`/agent/chat/${sessionId}`, {
-          method: "POST",
-          headers: {
-            "x-assemblyai-key": assemblyAIKey,
-            "x-murf-key": murfKey,
-            "x-google-key": googleKey
-          },
-          body: formData
-        });
+        const response = await postRecording();
 
         const data = await response.json();
 
@@ -0,0 +1,131 @@
+import io
+import wave
+from typing import Optional, Tuple
+
+import numpy as np
+
+_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def is_wav(audio_bytes: bytes) -> bool:
+    return len(audio_bytes) >= 12 and audio_bytes[:4] == b"RIFF" and audio_bytes[8:12] == b"WAVE"
+
+
+def detect_speech(
+    samples: np.ndarray,
+    sample_rate: int,
+    frame_ms: int = 20,
+    min_energy_db: float = -50.0,
+    noise_margin_db: float = 12.0,
+    zcr_threshold: float = 0.25,
+) -> np.ndarray:
+    """
+    Return a boolean speech flag per frame of mono float samples in [-1, 1].
+
+    A frame is speech when its RMS energy is `noise_margin_db` above the clip's
+    noise floor (10th percentile frame energy), or slightly quieter but with a
+    high zero-crossing rate, which keeps unvoiced consonants like "s" and "f".
+    """
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    n_frames = len(samples) // frame_len
+    if n_frames == 0:
+        return np.zeros(0, dtype=bool)
+
+    frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames * frames, axis=1)) + 1e-10
+    energy_db = 20 * np.log10(rms)
+    zcr = np.mean(np.diff(np.signbit(frames), axis=1), axis=1)
+
+    noise_floor = np.percentile(energy_db, 10)
+    threshold = max(min_energy_db, noise_floor + noise_margin_db)
+    return (energy_db > threshold) | ((energy_db > threshold - 6) & (zcr > zcr_threshold))
+
+
+def _keep_mask(speech: np.ndarray, frame_ms: int, pad_ms: int, max_pause_ms: Optional[int]) -> np.ndarray:
+    keep = np.zeros_like(speech)
+    voiced = np.flatnonzero(speech)
+    if len(voiced) == 0:
+        return keep
+
+    pad = pad_ms // frame_ms
+    keep[max(voiced[0] - pad, 0):voiced[-1] + pad + 1] = True
+
+    if max_pause_ms is not None:
+        # Shorten internal pauses to max_pause_ms, keeping padding on both sides
+        max_pause = max(max_pause_ms // frame_ms, 2 * pad)
+        gaps = np.diff(voiced)
+        for i in np.flatnonzero(gaps - 1 > max_pause):
+            start, gap = voiced[i], gaps[i]
+            keep[start + 1 + max_pause // 2:start + gap - max_pause // 2] = False
+    return keep
+
+
+def trim_pcm(
+    pcm: bytes,
+    sample_rate: int,
+    channels: int = 1,
+    sample_width: int = 2,
+    frame_ms: int = 20,
+    pad_ms: int = 200,
+    max_pause_ms: Optional[int] = None,
+) -> Tuple[bytes, float]:
+    """Trim silence from raw little-endian PCM. Returns (pcm, seconds_removed)."""
+    dtype = _DTYPES.get(sample_width)
+    if dtype is None or not pcm:
+        return pcm, 0.0
+
+    block = sample_width * channels
+    usable = len(pcm) - len(pcm) % block
+    samples = np.frombuffer(pcm[:usable], dtype=np.dtype(dtype).newbyteorder("<")).reshape(-1, channels)
+
+    # Analyse a normalised mono mix; cut the original interleaved samples
+    mono = samples.astype(np.float32).mean(axis=1)
+    if dtype is np.uint8:
+        mono = (mono - 128.0) / 128.0
+    else:
+        mono /= float(np.iinfo(dtype).max)
+
+    speech = detect_speech(mono, sample_rate, frame_ms)
+    if len(speech) == 0:
+        return pcm, 0.0
+
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    keep = _keep_mask(speech, frame_ms, pad_ms, max_pause_ms)
+    if not keep.any():
+        # No speech found; leave the clip alone and let the STT decide
+        return pcm, 0.0
+
+    sample_keep = np.repeat(keep, frame_len)
+    tail = len(samples) - len(sample_keep)
+    sample_keep = np.concatenate([sample_keep, np.full(tail, keep[-1])])
+    trimmed = samples[sample_keep]
+
+    removed = (len(samples) - len(trimmed)) / sample_rate
+    return trimmed.tobytes(), round(removed, 3)
+
+
+def trim_wav(audio_bytes: bytes, frame_ms: int = 20, pad_ms: int = 200,
+             max_pause_ms: Optional[int] = None) -> Tuple[bytes, float]:
+    """Trim silence from a PCM WAV file. Anything else is returned unchanged."""
+    if not is_wav(audio_bytes):
+        return audio_bytes, 0.0
+    try:
+        with wave.open(io.BytesIO(audio_bytes), "rb") as wav_in:
+            params = wav_in.getparams()
+            pcm = wav_in.readframes(params.nframes)
+    except (wave.Error, EOFError):
+        # Compressed or malformed WAV; upload as-is
+        return audio_bytes, 0.0
+
+    trimmed, removed = trim_pcm(pcm, params.framerate, params.nchannels, params.sampwidth,
+                                frame_ms, pad_ms, max_pause_ms)
+    if removed == 0.0:
+        return audio_bytes, 0.0
+
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wav_out:
+        wav_out.setnchannels(params.nchannels)
+        wav_out.setsampwidth(params.sampwidth)
+        wav_out.setframerate(params.framerate)
+        wav_out.writeframes(trimmed)
+    return out.getvalue(), removed
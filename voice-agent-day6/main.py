@@ -2,9 +2,10 @@ from fastapi import FastAPI, UploadFile, File, Request
 from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-import shutil, os
+import shutil, os, asyncio
 import assemblyai as aai
 from dotenv import load_dotenv
+from audio_vad import normalize_wav, trim_wav, split_wav
 
 load_dotenv()
 aai.settings.api_key = os.getenv("ASSEMBLYAI_API_KEY")
@@ -17,6 +18,27 @@ templates = Jinja2Templates(directory="templates")
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Long recordings are split at pauses and the pieces transcribed in parallel
+SEGMENT_SECONDS = float(os.getenv("TRANSCRIBE_SEGMENT_SECONDS", "60"))
+TRANSCRIBE_CONCURRENCY = int(os.getenv("TRANSCRIBE_CONCURRENCY", "4"))
+
+# WAV uploads are downmixed and resampled to this rate before transcription
+TARGET_SAMPLE_RATE = int(os.getenv("TARGET_SAMPLE_RATE", "16000"))
+
+def prepare_segments(audio_bytes: bytes):
+    """Split the recording at pauses and trim each segment. Offsets stay relative to the upload."""
+    # STT only needs mono 16 kHz; 44.1/48 kHz stereo recordings are ~6x larger
+    audio_bytes = normalize_wav(audio_bytes, TARGET_SAMPLE_RATE)
+
+    segments = []
+    trimmed_seconds = 0.0
+    for segment, offset in split_wav(audio_bytes, SEGMENT_SECONDS):
+        # Cut leading/trailing silence so we don't pay to upload and transcribe dead air
+        segment, removed = trim_wav(segment)
+        segments.append((segment, offset))
+        trimmed_seconds += removed
+    return segments, round(trimmed_seconds, 3)
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
@@ -34,9 +56,27 @@ async def transcribe_audio():
     if not os.path.exists(audio_path):
         return JSONResponse(status_code=404, content={"error": "Audio file not found."})
     
+    with open(audio_path, "rb") as f:
+        audio_bytes = f.read()
+
+    # NumPy work on the whole recording; keep it off the event loop
+    segments, trimmed_seconds = await asyncio.to_thread(prepare_segments, audio_bytes)
     transcriber = aai.Transcriber()
+    limit = asyncio.Semaphore(TRANSCRIBE_CONCURRENCY)
+
+    async def transcribe_segment(segment):
+        async with limit:
+            transcript = await asyncio.to_thread(transcriber.transcribe, segment)
+        if transcript.status == aai.TranscriptStatus.error:
+            raise Exception(transcript.error)
+        return transcript.text or ""
+
     try:
-        transcript = transcriber.transcribe(audio_path)
-        return {"transcript": transcript.text}
+        texts = await asyncio.gather(*(transcribe_segment(segment) for segment, _ in segments))
+        return {
+            "transcript": " ".join(text for text in texts if text),
+            "trimmed_seconds": trimmed_seconds,
+            "segments": [{"offset": round(offset, 3), "text": text} for (_, offset), text in zip(segments, texts)],
+        }
     except Exception as e:
         return JSONResponse(status_code=500, content={"error": f"Transcription failed: {str(e)}"})
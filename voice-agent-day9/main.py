@@ -1,4 +1,5 @@
 import os
+import asyncio
 import time
 import requests
 import aiofiles
@@ -9,6 +10,9 @@ from fastapi.responses import HTMLResponse
 from dotenv import load_dotenv
 from google import genai
 
+from response_cache import ResponseCache
+from semantic_cache import SemanticCache
+
 load_dotenv()
 
 app = FastAPI()
@@ -42,6 +46,23 @@ if not all([ASSEMBLYAI_API_KEY, MURF_API_KEY, MURF_VOICE_ID, GEMINI_API_KEY]):
 
 genai_client = genai.Client(api_key=GEMINI_API_KEY)
 
+# Longest wait for one Gemini reply before the request fails
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", 30))
+
+# Answers to repeated questions (compared after normalizing) are reused until they expire
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("LLM_RESPONSE_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("LLM_RESPONSE_CACHE_TTL", 3600)),
+)
+
+# Near-duplicate questions are answered from earlier answers (and their audio) without Gemini
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE_ENABLED", "1") == "1"
+semantic_cache = SemanticCache(
+    threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.9)),
+    max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 2048)),
+    ttl=float(os.getenv("SEMANTIC_CACHE_TTL", 24 * 3600)),
+)
+
 ASSEMBLYAI_UPLOAD_URL = "https://api.assemblyai.com/v2/upload"
 ASSEMBLYAI_TRANSCRIPT_URL = "https://api.assemblyai.com/v2/transcript"
 MURF_TTS_URL = "https://api.murf.ai/v1/speech/generate"
@@ -75,13 +96,25 @@ def request_transcription(upload_url: str) -> str:
             raise Exception("AssemblyAI transcription failed: " + poll_resp.json().get("error", "Unknown error"))
         time.sleep(3)
 
-def get_gemini_response(prompt: str) -> str:
-    response = genai_client.models.generate_content(
-        model="gemini-1.5-flash",
-        contents=prompt
-    )
+async def generate_with_gemini(prompt: str) -> str:
+    # The SDK's async client: other requests keep being served while Gemini thinks
+    try:
+        response = await asyncio.wait_for(
+            genai_client.aio.models.generate_content(
+                model="gemini-1.5-flash",
+                contents=prompt
+            ),
+            timeout=LLM_TIMEOUT,
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail=f"Gemini did not respond within {LLM_TIMEOUT:g}s")
     return response.text.strip()
 
+async def get_gemini_response(prompt: str) -> str:
+    # Stateless, so a repeat question is answered from the cache (or shares the call in progress)
+    key = ResponseCache.key(prompt, model="gemini-1.5-flash")
+    return await response_cache.get_or_create(key, lambda: generate_with_gemini(prompt))
+
 def generate_murf_tts(text: str) -> str:
     if len(text) > 3000:
         text = text[:3000]
@@ -115,6 +148,14 @@ def generate_murf_tts(text: str) -> str:
 
 
 
+@app.get("/llm/cache")
+async def llm_cache_stats():
+    return response_cache.stats()
+
+@app.get("/llm/semantic-cache")
+async def llm_semantic_cache_stats():
+    return semantic_cache.stats()
+
 @app.post("/llm/query")
 async def llm_query(audio: UploadFile = File(...)):
     try:
@@ -125,8 +166,12 @@ async def llm_query(audio: UploadFile = File(...)):
 
         upload_url = await upload_audio_to_assemblyai(temp_file_path)
         transcript_text = request_transcription(upload_url)
-        llm_response = get_gemini_response(transcript_text)
-        murf_audio_url = generate_murf_tts(llm_response)
+        # A near-duplicate of an earlier question gets the earlier answer (and its audio)
+        hit = semantic_cache.lookup(transcript_text, MURF_VOICE_ID) if SEMANTIC_CACHE_ENABLED else None
+        llm_response = hit.answer if hit else await get_gemini_response(transcript_text)
+        murf_audio_url = hit.audio_url if hit and hit.audio_url else generate_murf_tts(llm_response)
+        if SEMANTIC_CACHE_ENABLED:
+            semantic_cache.add(hit.question if hit else transcript_text, llm_response, murf_audio_url, MURF_VOICE_ID)
 
         os.remove(temp_file_path)
 
@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case, spacing and trailing punctuation don't change the question."""
+    return " ".join(prompt.casefold().split()).rstrip(" .?!")
+
+
+class ResponseCache:
+    """
+    LLM responses to stateless prompts, keyed by the normalized prompt plus the
+    generation settings.
+
+    Entries live in an LRU capped at `max_entries` and expire after `ttl`
+    seconds. Identical requests that arrive while the first one is still
+    waiting on the LLM share its call instead of making their own. Failed calls
+    are not cached. Counters are exposed through `stats()`.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 3600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # key -> (response, time stored)
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(prompt: str, model: str, temperature: Optional[float] = None, system_prompt: str = "") -> str:
+        request = json.dumps([normalize_prompt(prompt), model, temperature, system_prompt])
+        return hashlib.blake2b(request.encode("utf-8"), digest_size=32).hexdigest()
+
+    def _lookup(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        response, stored_at = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return response
+
+    def _store(self, key: str, response: str):
+        self._entries[key] = (response, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_create(self, key: str, generate: Callable[[], Awaitable[str]]) -> str:
+        response = self._lookup(key)
+        if response is not None:
+            self.hits += 1
+            return response
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # A task of its own, so a caller that disconnects doesn't cancel it for the others
+            pending = asyncio.ensure_future(generate())
+            self._in_flight[key] = pending
+            pending.add_done_callback(lambda future: self._settle(key, future))
+        return await asyncio.shield(pending)
+
+    def _settle(self, key: str, future: asyncio.Future):
+        self._in_flight.pop(key, None)
+        if not future.cancelled() and future.exception() is None:
+            self._store(key, future.result())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.coalesced + self.misses
+        return {
+            "hits": self.hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "in_flight": len(self._in_flight),
+        }